@@ -2,6 +2,7 @@ from tools.contentapi.get_countries import get_countries
 from tools.contentapi.get_destinations import get_destinations
 from tools.contentapi.get_hotel_list import get_hotel_list
 from tools.contentapi.get_hotel_details import get_hotel_details
+from tools.contentapi.search_hotels import search_hotels
 from tools.contentapi.get_meal_types import get_meal_types
 from tools.contentapi.get_bed_types import get_bed_types
 from tools.contentapi.get_window_types import get_window_types
@@ -10,9 +11,12 @@ from tools.contentapi.get_view_types import get_view_types
 from tools.otherapi.get_weather import get_weather
 from tools.otherapi.get_environment import get_environment
 from tools.bookingapi.get_lowest_price import get_lowest_price
+from tools.bookingapi.get_price_matrix import get_price_matrix
 from tools.bookingapi.price_confirm import price_confirm
 from tools.bookingapi.booking_confirm import booking_confirm
+from tools.bookingapi.booking_flow import prepare_booking, complete_booking
 from tools.bookingapi.booking_search import booking_search
+from tools.bookingapi.booking_search_stream import booking_search_stream
 from tools.bookingapi.booking_pre_cancel import booking_pre_cancel
 from tools.bookingapi.booking_cancel_confirm import booking_cancel_confirm
 from agentscope.tool import Toolkit
@@ -41,6 +45,7 @@ toolkit.register_tool_function(get_countries)
 toolkit.register_tool_function(get_destinations)
 toolkit.register_tool_function(get_hotel_list)
 toolkit.register_tool_function(get_hotel_details)
+toolkit.register_tool_function(search_hotels)
 toolkit.register_tool_function(get_meal_types)
 toolkit.register_tool_function(get_bed_types)
 toolkit.register_tool_function(get_window_types)
@@ -49,9 +54,13 @@ toolkit.register_tool_function(get_view_types)
 toolkit.register_tool_function(get_weather)
 toolkit.register_tool_function(get_environment)
 toolkit.register_tool_function(get_lowest_price)
+toolkit.register_tool_function(get_price_matrix)
 toolkit.register_tool_function(price_confirm)
 toolkit.register_tool_function(booking_confirm)
+toolkit.register_tool_function(prepare_booking)
+toolkit.register_tool_function(complete_booking)
 toolkit.register_tool_function(booking_search)
+toolkit.register_tool_function(booking_search_stream)
 toolkit.register_tool_function(booking_pre_cancel)
 toolkit.register_tool_function(booking_cancel_confirm)
 
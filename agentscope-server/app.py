@@ -6,7 +6,7 @@ from agentscope_runtime.engine import AgentApp
 from agentscope_runtime.engine.agents.agentscope_agent import AgentScopeAgent
 from agentscope_runtime.sandbox.tools import FunctionTool, MCPTool, SandboxTool, create_function_tool
 from agentscope_runtime.engine.deployers import LocalDeployManager
-from agentscope.model import DashScopeChatModel
+from agentscope_runtime.engine.services.context_manager import ContextManager
 from agentscope.agent import ReActAgent, StudioUserInput, UserAgent
 from agentscope.tool import Toolkit, execute_python_code
 # "execute_python_code",
@@ -23,15 +23,13 @@ from agentscope.tool import Toolkit, execute_python_code
 # "openai_create_image_variation",
 # "openai_image_to_text",
 # "openai_audio_to_text",
-from agentscope.model import DashScopeChatModel
 from agentscope.message import Msg
-from agentscope.memory import InMemoryMemory
-from agentscope.formatter import DashScopeChatFormatter
 
 from tools.contentapi.get_countries import get_countries
 from tools.contentapi.get_destinations import get_destinations
 from tools.contentapi.get_hotel_list import get_hotel_list
 from tools.contentapi.get_hotel_details import get_hotel_details
+from tools.contentapi.search_hotels import search_hotels
 from tools.contentapi.get_meal_types import get_meal_types
 from tools.contentapi.get_bed_types import get_bed_types
 from tools.contentapi.get_window_types import get_window_types
@@ -39,9 +37,12 @@ from tools.contentapi.get_smoking_types import get_smoking_types
 from tools.contentapi.get_view_types import get_view_types
 from tools.otherapi.get_environment import get_environment
 from tools.bookingapi.get_lowest_price import get_lowest_price
+from tools.bookingapi.get_price_matrix import get_price_matrix
 from tools.bookingapi.price_confirm import price_confirm
 from tools.bookingapi.booking_confirm import booking_confirm
+from tools.bookingapi.booking_flow import prepare_booking, complete_booking
 from tools.bookingapi.booking_search import booking_search
+from tools.bookingapi.booking_search_stream import booking_search_stream
 from tools.bookingapi.booking_pre_cancel import booking_pre_cancel
 from tools.bookingapi.booking_cancel_confirm import booking_cancel_confirm
 
@@ -55,6 +56,21 @@ from tools.otherapi.get_qweather_warning import get_qweather_warning
 from tools.otherapi.get_qweather_air_quality import get_qweather_air_quality, get_qweather_air_forecast
 from tools.otherapi.get_qweather_astronomy import get_qweather_sun_moon, get_qweather_moon_phase
 from tools.otherapi.get_qweather_historical import get_qweather_historical_weather, get_qweather_historical_air
+from tools.otherapi.get_qweather_bundle import get_qweather_bundle
+from utils.catalog_sync import start_catalog_sync, stop_catalog_sync
+from utils.booking_flow import booking_flow
+from utils.request import close_clients
+from utils.session_memory import SessionStore, SessionStoreMemoryService
+from utils.prompt_prefix import StablePrefixContextComposer
+from utils.context_compression import CONTEXT_SUMMARY_MODEL, ContextCompressingFormatter, ContextCompressor
+from utils.instrumentation import (
+    InstrumentedDashScopeChatModel,
+    InstrumentedToolkit,
+    instrument_app,
+)
+from utils.tool_routing import TOOL_GROUP_DESCRIPTIONS, ToolRoutingReActAgent
+from utils.tracing import OTEL_TRACES_ENDPOINT
+from utils.warmup import warmup, WARMUP_ENABLED
 
 # 创建FunctionTool实例
 # tools = [
@@ -65,45 +81,65 @@ from tools.otherapi.get_qweather_historical import get_qweather_historical_weath
 # 加载环境变量
 load_dotenv('.env')
 
-toolkit = Toolkit()
-formatter = DashScopeChatFormatter()
-memory = InMemoryMemory()
-
-toolkit.register_tool_function(get_countries)
-toolkit.register_tool_function(get_destinations)
-toolkit.register_tool_function(get_hotel_list)
-toolkit.register_tool_function(get_hotel_details)
-toolkit.register_tool_function(get_meal_types)
-toolkit.register_tool_function(get_bed_types)
-toolkit.register_tool_function(get_window_types)
-toolkit.register_tool_function(get_smoking_types)
-toolkit.register_tool_function(get_view_types)
+toolkit = InstrumentedToolkit()
+# 每次推理前压缩较早轮次的上下文：工具结果替换为结构化摘要，更早的轮次由摘要模型在后台折叠为滚动摘要
+formatter = ContextCompressingFormatter(ContextCompressor(
+    summary_model=InstrumentedDashScopeChatModel(
+        model_name=CONTEXT_SUMMARY_MODEL,
+        api_key=os.environ["DASHSCOPE_API_KEY"],
+        stream=False,
+        enable_thinking=False
+    ) if CONTEXT_SUMMARY_MODEL else None
+))
+# 会话历史按 user_id/session_id 保存在有上限的 SessionStore 中；agent_config 不传 memory，
+# 每个请求构建智能体时新建 InMemoryMemory 并从会话历史加载，并发会话互不干扰
+session_store = SessionStore()
+
+# 工具按业务分组，每次推理由 ToolRoutingReActAgent 按用户意图只暴露相关分组；get_environment 属于始终可用的 basic 分组
+for group_name, description in TOOL_GROUP_DESCRIPTIONS.items():
+    toolkit.create_tool_group(group_name, description, active=True)
+
+toolkit.register_tool_function(get_countries, group_name="content")
+toolkit.register_tool_function(get_destinations, group_name="content")
+toolkit.register_tool_function(get_hotel_list, group_name="content")
+toolkit.register_tool_function(get_hotel_details, group_name="content")
+toolkit.register_tool_function(search_hotels, group_name="content")
+toolkit.register_tool_function(get_meal_types, group_name="content")
+toolkit.register_tool_function(get_bed_types, group_name="content")
+toolkit.register_tool_function(get_window_types, group_name="content")
+toolkit.register_tool_function(get_smoking_types, group_name="content")
+toolkit.register_tool_function(get_view_types, group_name="content")
 toolkit.register_tool_function(get_environment)
-toolkit.register_tool_function(get_lowest_price)
-toolkit.register_tool_function(price_confirm)
-toolkit.register_tool_function(booking_confirm)
-toolkit.register_tool_function(booking_search)
-toolkit.register_tool_function(booking_pre_cancel)
-toolkit.register_tool_function(booking_cancel_confirm)
-
-toolkit.register_tool_function(search_qweather_city_code)
-toolkit.register_tool_function(get_qweather_indices)
-toolkit.register_tool_function(get_qweather_forecast)
-toolkit.register_tool_function(get_qweather_daily_forecast)
-toolkit.register_tool_function(get_qweather_hourly_forecast)
-toolkit.register_tool_function(get_qweather_minutely)
-toolkit.register_tool_function(get_qweather_warning)
-toolkit.register_tool_function(get_qweather_air_quality)
-toolkit.register_tool_function(get_qweather_air_forecast)
-toolkit.register_tool_function(get_qweather_sun_moon)
-toolkit.register_tool_function(get_qweather_moon_phase)
-toolkit.register_tool_function(get_qweather_historical_weather)
-toolkit.register_tool_function(get_qweather_historical_air)
+toolkit.register_tool_function(get_lowest_price, group_name="booking")
+toolkit.register_tool_function(get_price_matrix, group_name="booking")
+toolkit.register_tool_function(price_confirm, group_name="booking")
+toolkit.register_tool_function(booking_confirm, group_name="booking")
+toolkit.register_tool_function(prepare_booking, group_name="booking")
+toolkit.register_tool_function(complete_booking, group_name="booking")
+toolkit.register_tool_function(booking_search, group_name="booking")
+toolkit.register_tool_function(booking_search_stream, group_name="booking")
+toolkit.register_tool_function(booking_pre_cancel, group_name="booking")
+toolkit.register_tool_function(booking_cancel_confirm, group_name="booking")
+
+toolkit.register_tool_function(search_qweather_city_code, group_name="weather")
+toolkit.register_tool_function(get_qweather_indices, group_name="weather")
+toolkit.register_tool_function(get_qweather_forecast, group_name="weather")
+toolkit.register_tool_function(get_qweather_daily_forecast, group_name="weather")
+toolkit.register_tool_function(get_qweather_hourly_forecast, group_name="weather")
+toolkit.register_tool_function(get_qweather_minutely, group_name="weather")
+toolkit.register_tool_function(get_qweather_warning, group_name="weather")
+toolkit.register_tool_function(get_qweather_air_quality, group_name="weather")
+toolkit.register_tool_function(get_qweather_air_forecast, group_name="weather")
+toolkit.register_tool_function(get_qweather_sun_moon, group_name="weather")
+toolkit.register_tool_function(get_qweather_moon_phase, group_name="weather")
+toolkit.register_tool_function(get_qweather_historical_weather, group_name="weather")
+toolkit.register_tool_function(get_qweather_historical_air, group_name="weather")
+toolkit.register_tool_function(get_qweather_bundle, group_name="weather")
 
 # 创建 Agent
 agent = AgentScopeAgent(
     name="DemoApp",
-    model=DashScopeChatModel(
+    model=InstrumentedDashScopeChatModel(
         model_name="qwen-plus",
         api_key=os.environ["DASHSCOPE_API_KEY"],
         enable_thinking=False
@@ -122,16 +158,21 @@ agent = AgentScopeAgent(
 ## 🛠️ 可用工具类别
 ### 旅游内容服务工具
 - 国家列表查询、目的地信息、酒店列表和详情
+- 本地酒店检索（按名称/地址关键词、位置半径、星级、品牌快速筛选酒店ID）
 - 数据字典服务（用餐类型、床型、窗型、吸烟类型、景观类型）
 
 ### 酒店预订服务工具  
 - 价格查询、价格确认、预订确认、预订查询
+- 灵活日期比价：用户日期不固定（如“三月哪个周末最便宜”）时调用一次 get_price_matrix 获取价格日历，不要逐日调用 get_lowest_price
+- 快捷预订：用户选定价格计划后立即调用 prepare_booking 锁定报价（参考号自动续期），收集联系人后用 complete_booking 一步下单
 - 预订取消（预取消+确认取消）等完整预订流程
+- 批量订单查询：大日期范围使用 booking_search_stream 分页流式返回，可导出CSV/JSONL用于对账
 
 ### 天气信息服务工具
 - OpenWeatherMap基础天气查询
 - 和风天气专业服务：实时天气、多日预报、逐小时预报、分钟级降水
 - 空气质量、天文数据、生活指数、天气预警、历史数据
+- 多城市综合天气：get_qweather_bundle 一次调用并发获取多个城市的预报、空气质量、预警与生活指数
 
 ### 系统环境工具
 - 时间日期、系统状态、运行环境信息
@@ -155,18 +196,19 @@ agent = AgentScopeAgent(
 当有的工具允许传入多个ID去拉取数据时（比如：get_hotel_details），请尽量这样做。
 当需要实时数据（如当前时间、系统状态）时，请调用get_environment工具获取。""",
         'formatter': formatter,
-        'memory': memory,
         'toolkit': toolkit,
         'parallel_tool_calls': True,
     },
-    agent_builder=ReActAgent,
+    agent_builder=ToolRoutingReActAgent,
 )
 
 
 agentscope.init(
     studio_url=os.environ["AGENTSCOPE_STUDIO_URL"],
     project="DIDA-AIDA-Project2",
-    name="DemoRuntimeApp"
+    name="DemoRuntimeApp",
+    # 配置了 OTEL_EXPORTER_OTLP_ENDPOINT 时把追踪发送到 OpenTelemetry collector，否则发送到 Studio
+    tracing_url=OTEL_TRACES_ENDPOINT
 )
 
 
@@ -180,10 +222,19 @@ print('studio_input', studio_input)
 
 async def init_resources(app, **kwargs):
     print("🚀 服务启动中，初始化资源...")
+    instrument_app(app)
+    if WARMUP_ENABLED:
+        await warmup(toolkit)
+    # 本地酒店目录增量同步（未配置 HOTEL_CATALOG_PATH 时不启动）
+    start_catalog_sync()
 
 
 async def cleanup_resources(app, **kwargs):
     print("🛑 服务即将关闭，释放资源...")
+    await stop_catalog_sync()
+    await booking_flow.close()
+    await close_clients()
+    print(f"会话存储用量: {session_store.stats()}")
 
 
 # 创建并运行 AgentApp
@@ -192,6 +243,12 @@ app = AgentApp(
     endpoint_path="/process",
     response_type="sse",
     stream=True,
+    context_manager=ContextManager(
+        session_history_service=session_store,
+        memory_service=SessionStoreMemoryService(session_store),
+        # 检索到的记忆附在当前输入上，系统提示词之后的会话历史各轮保持为稳定前缀，便于命中提示词缓存
+        context_composer_cls=StablePrefixContextComposer,
+    ),
     before_start=init_resources,
     after_finish=cleanup_resources)
 
@@ -0,0 +1,163 @@
+"""本地 DashScope 文本生成接口替身，用于离线验证提示词前缀的稳定性
+
+实现 /api/v1/services/aigc/text-generation/generation（SSE 与 JSON 两种响应），记录收到的每个请求，
+并按前缀逐块比对模拟服务端的隐式缓存：与此前请求相同的最长前缀（工具定义、消息逐条比较）计为 cached_tokens。
+回复是脚本化的：带工具的请求在用户新消息后调用 get_environment，拿到工具结果后给出文本回答；
+不带工具的请求（如对话摘要）直接返回一段摘要文本。
+"""
+import json
+import os
+import sys
+import uuid
+
+from typing import Any
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+from utils.render import estimate_tokens
+
+GENERATION_PATH = "/api/v1/services/aigc/text-generation/generation"
+
+
+def strip_cache_control(message: dict[str, Any]) -> dict[str, Any]:
+    """去掉显式缓存标记并把单个文本块还原为字符串，便于比较消息本身是否变化"""
+    content = message.get("content")
+    if isinstance(content, list):
+        content = [{key: value for key, value in block.items() if key != "cache_control"} if isinstance(block, dict)
+                   else block for block in content]
+        if len(content) == 1 and isinstance(content[0], dict) and set(content[0]) == {"type", "text"}:
+            content = content[0]["text"]
+    return {**message, "content": content}
+
+
+def prefix_blocks(body: dict[str, Any]) -> list[str]:
+    """按服务端拼接提示词的顺序切分请求：系统消息 → 工具定义 → 其余消息"""
+    messages = body["input"]["messages"]
+    tools = body.get("parameters", {}).get("tools") or []
+    system = [message for message in messages if message.get("role") == "system"]
+    rest = [message for message in messages if message.get("role") != "system"]
+    blocks = [json.dumps(strip_cache_control(message), ensure_ascii=False, sort_keys=True) for message in system]
+    blocks.append(json.dumps(tools, ensure_ascii=False, sort_keys=True))
+    blocks.extend(json.dumps(strip_cache_control(message), ensure_ascii=False, sort_keys=True) for message in rest)
+    return blocks
+
+
+class StandInState:
+    """替身服务收到的请求与模拟的缓存命中"""
+
+    def __init__(self) -> None:
+        self.requests: list[dict[str, Any]] = []
+        self.usages: list[dict[str, Any]] = []
+        self._seen: list[list[str]] = []
+
+    def usage(self, body: dict[str, Any]) -> dict[str, Any]:
+        blocks = prefix_blocks(body)
+        input_tokens = sum(estimate_tokens(block) for block in blocks)
+        common = max((next((index for index, (a, b) in enumerate(zip(blocks, seen)) if a != b), min(len(blocks), len(seen)))
+                      for seen in self._seen), default=0)
+        cached = sum(estimate_tokens(block) for block in blocks[:common])
+        self._seen.append(blocks)
+        marked = any(isinstance(message.get("content"), list) and any(
+            isinstance(block, dict) and "cache_control" in block for block in message["content"])
+            for message in body["input"]["messages"])
+        return {
+            "input_tokens": input_tokens,
+            "output_tokens": 16,
+            "prompt_tokens_details": {
+                "cached_tokens": cached,
+                "cache_creation_input_tokens": input_tokens - cached if marked else 0,
+            },
+        }
+
+
+def _reply(body: dict[str, Any]) -> dict[str, Any]:
+    messages = body["input"]["messages"]
+    if not body.get("parameters", {}).get("tools"):
+        return {"role": "assistant", "content": "用户此前查询了当前时间与环境信息。"}
+    if messages[-1].get("role") == "user":
+        return {"role": "assistant", "content": "", "tool_calls": [{
+            "index": 0, "id": f"call_{uuid.uuid4().hex[:8]}", "type": "function",
+            "function": {"name": "get_environment", "arguments": json.dumps({"include_process_info": False})},
+        }]}
+    return {"role": "assistant", "content": "已获取当前环境信息，现在可以继续为您查询酒店。"}
+
+
+def create_app(state: StandInState) -> FastAPI:
+    app = FastAPI()
+
+    @app.post(GENERATION_PATH)
+    async def generation(request: Request):
+        body = await request.json()
+        state.requests.append(body)
+        usage = state.usage(body)
+        state.usages.append(usage)
+        message = _reply(body)
+        request_id = uuid.uuid4().hex
+
+        def _payload(delta: dict[str, Any], finish_reason: str) -> dict[str, Any]:
+            return {"request_id": request_id, "usage": usage,
+                    "output": {"choices": [{"finish_reason": finish_reason, "message": delta}]}}
+
+        if request.headers.get("X-DashScope-SSE") != "enable":
+            finish_reason = "tool_calls" if message.get("tool_calls") else "stop"
+            return JSONResponse(_payload(message, finish_reason))
+
+        async def _events():
+            text = message["content"]
+            half = len(text) // 2
+            deltas = [{"role": "assistant", "content": text[:half]},
+                      {**message, "content": text[half:]}]
+            for index, delta in enumerate(deltas, 1):
+                finish_reason = "null" if index < len(deltas) else ("tool_calls" if message.get("tool_calls") else "stop")
+                yield (f"id:{index}\nevent:result\n:HTTP_STATUS/200\n"
+                       f"data:{json.dumps(_payload(delta, finish_reason), ensure_ascii=False)}\n\n")
+
+        return StreamingResponse(_events(), media_type="text/event-stream")
+
+    return app
+
+
+def check_prefix(requests: list[dict[str, Any]]) -> list[str]:
+    """检查带工具的请求是否保持稳定的前缀顺序，返回发现的问题
+
+    - 系统消息在最前面，且所有请求的系统消息逐字节相同
+    - 暴露相同工具集合的请求，工具定义逐字节相同（顺序也相同）
+    - 对话摘要（若有）紧跟在系统消息之后
+    - 同一轮内后一步请求的消息以前一步请求的全部消息为前缀（不计显式缓存标记的位置）
+    """
+    problems: list[str] = []
+    system_prefix = None
+    tools_by_names: dict[tuple[str, ...], str] = {}
+    previous: list[str] | None = None
+    for number, body in enumerate(request for request in requests if request.get("parameters", {}).get("tools")):
+        messages = body["input"]["messages"]
+        roles = [message.get("role") for message in messages]
+        system_count = roles.count("system")
+        if roles[:system_count] != ["system"] * system_count:
+            problems.append(f"请求 {number}: 系统消息不在最前面")
+        system = json.dumps([strip_cache_control(message) for message in messages[:system_count]], ensure_ascii=False)
+        if system_prefix is None:
+            system_prefix = system
+        elif system != system_prefix:
+            problems.append(f"请求 {number}: 系统消息与首个请求不同")
+
+        tools = body["parameters"]["tools"]
+        names = tuple(sorted(tool["function"]["name"] for tool in tools))
+        encoded = json.dumps(tools, ensure_ascii=False)
+        if tools_by_names.setdefault(names, encoded) != encoded:
+            problems.append(f"请求 {number}: 相同工具集合的工具定义发生变化")
+
+        for index, message in enumerate(messages):
+            text = strip_cache_control(message).get("content")
+            if isinstance(text, str) and text.startswith("[此前对话摘要]") and index != system_count:
+                problems.append(f"请求 {number}: 对话摘要没有紧跟系统消息")
+
+        current = [json.dumps(strip_cache_control(message), ensure_ascii=False) for message in messages]
+        # 以工具结果结尾的请求属于同一轮的后续步骤
+        if previous is not None and messages[-1].get("role") == "tool" and current[:len(previous)] != previous:
+            problems.append(f"请求 {number}: 同一轮内的请求没有以上一步的消息为前缀")
+        previous = current
+    return problems
@@ -0,0 +1,161 @@
+"""工具schema缓存与增量格式化的微基准
+
+模拟一个带长历史的请求：每个请求深拷贝工具集，随后的每个ReAct步骤获取工具schema、
+新增一次工具调用与结果，并格式化全部消息。对比 agentscope 原生 Toolkit/DashScopeChatFormatter
+与 CachedSchemaToolkit/IncrementalDashScopeChatFormatter 的单步耗时；再对比线上实际使用的
+ContextCompressingFormatter 链路在压缩器不复用摘要对象（max_cached=0）与默认复用时的单步耗时。
+
+用法:
+    python benchmarks/prompt_cache_bench.py [--turns 20] [--steps 6] [--requests 20]
+"""
+import argparse
+import asyncio
+import copy
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agentscope.formatter import DashScopeChatFormatter
+from agentscope.message import Msg, ToolResultBlock, ToolUseBlock
+from agentscope.tool import Toolkit
+
+from tools.contentapi.get_countries import get_countries
+from tools.contentapi.get_destinations import get_destinations
+from tools.contentapi.get_hotel_list import get_hotel_list
+from tools.contentapi.get_hotel_details import get_hotel_details
+from tools.contentapi.search_hotels import search_hotels
+from tools.contentapi.get_meal_types import get_meal_types
+from tools.contentapi.get_bed_types import get_bed_types
+from tools.contentapi.get_window_types import get_window_types
+from tools.contentapi.get_smoking_types import get_smoking_types
+from tools.contentapi.get_view_types import get_view_types
+from tools.otherapi.get_environment import get_environment
+from tools.bookingapi.get_lowest_price import get_lowest_price
+from tools.bookingapi.get_price_matrix import get_price_matrix
+from tools.bookingapi.price_confirm import price_confirm
+from tools.bookingapi.booking_confirm import booking_confirm
+from tools.bookingapi.booking_flow import prepare_booking, complete_booking
+from tools.bookingapi.booking_search import booking_search
+from tools.bookingapi.booking_search_stream import booking_search_stream
+from tools.bookingapi.booking_pre_cancel import booking_pre_cancel
+from tools.bookingapi.booking_cancel_confirm import booking_cancel_confirm
+from tools.otherapi.search_qweather_city_code import search_qweather_city_code
+from tools.otherapi.get_qweather_indices import get_qweather_indices
+from tools.otherapi.get_qweather_forecast import get_qweather_forecast
+from tools.otherapi.get_qweather_daily_forecast import get_qweather_daily_forecast
+from tools.otherapi.get_qweather_hourly_forecast import get_qweather_hourly_forecast
+from tools.otherapi.get_qweather_minutely import get_qweather_minutely
+from tools.otherapi.get_qweather_warning import get_qweather_warning
+from tools.otherapi.get_qweather_air_quality import get_qweather_air_quality, get_qweather_air_forecast
+from tools.otherapi.get_qweather_astronomy import get_qweather_sun_moon, get_qweather_moon_phase
+from tools.otherapi.get_qweather_historical import get_qweather_historical_weather, get_qweather_historical_air
+from tools.otherapi.get_qweather_bundle import get_qweather_bundle
+from utils.context_compression import ContextCompressingFormatter, ContextCompressor
+from utils.prompt_cache import CachedSchemaToolkit, IncrementalDashScopeChatFormatter
+from utils.tool_routing import TOOL_GROUP_DESCRIPTIONS
+
+TOOLS = {
+    "content": [get_countries, get_destinations, get_hotel_list, get_hotel_details, search_hotels, get_meal_types,
+                get_bed_types, get_window_types, get_smoking_types, get_view_types],
+    "booking": [get_lowest_price, get_price_matrix, price_confirm, booking_confirm, prepare_booking, complete_booking,
+                booking_search, booking_search_stream, booking_pre_cancel, booking_cancel_confirm],
+    "weather": [search_qweather_city_code, get_qweather_indices, get_qweather_forecast, get_qweather_daily_forecast,
+                get_qweather_hourly_forecast, get_qweather_minutely, get_qweather_warning, get_qweather_air_quality,
+                get_qweather_air_forecast, get_qweather_sun_moon, get_qweather_moon_phase,
+                get_qweather_historical_weather, get_qweather_historical_air, get_qweather_bundle],
+}
+
+# 一个典型的价格表工具结果（约4KB）
+_TABLE = "HotelList[40] (TSV):\nHotelID\tHotelName\tLowestPrice.Value\tLowestPrice.Currency\n" + "\n".join(
+    f"{1000 + i}\t示例酒店 {i} 新宿店\t{300 + i}.00\tCNY" for i in range(40))
+
+
+def build_toolkit(toolkit_cls: type[Toolkit]) -> Toolkit:
+    toolkit = toolkit_cls()
+    for group, functions in TOOLS.items():
+        toolkit.create_tool_group(group, TOOL_GROUP_DESCRIPTIONS[group], active=True)
+        for function in functions:
+            toolkit.register_tool_function(function, group_name=group)
+    toolkit.register_tool_function(get_environment)
+    return toolkit
+
+
+def tool_step(turn: int, step: int) -> list[Msg]:
+    call_id = f"call_{turn}_{step}"
+    return [
+        Msg("DidaAgent", [ToolUseBlock(type="tool_use", id=call_id, name="get_lowest_price",
+                                       input={"city_code": "602651", "check_in_date": "2026-03-01"})], "assistant"),
+        Msg("system", [ToolResultBlock(type="tool_result", id=call_id, name="get_lowest_price",
+                                       output=[{"type": "text", "text": _TABLE}])], "system"),
+    ]
+
+
+def history(turns: int) -> list[Msg]:
+    msgs = [Msg("system", "你是DidaAgent。" * 200, "system")]
+    for turn in range(turns):
+        msgs.append(Msg("user", f"第{turn}轮：帮我查一下东京新宿的酒店价格", "user"))
+        msgs.extend(tool_step(turn, 0))
+        msgs.append(Msg("DidaAgent", f"第{turn}轮回复：最便宜的是示例酒店 0 新宿店。", "assistant"))
+    return msgs
+
+
+async def run(toolkit: Toolkit, formatter: DashScopeChatFormatter, turns: int, steps: int,
+              requests: int) -> tuple[float, float, float, list]:
+    """返回 (平均每个请求深拷贝工具集耗时, 平均每步获取schema耗时, 平均每步格式化耗时, 最后一次格式化结果)"""
+    copy_seconds = schema_seconds = format_seconds = 0.0
+    formatted: list = []
+    for _ in range(requests):
+        started = time.perf_counter()
+        request_toolkit = copy.deepcopy(toolkit)
+        copy_seconds += time.perf_counter() - started
+
+        # 会话历史每个请求都会重新转换为新的 Msg 对象
+        msgs = history(turns)
+        msgs.append(Msg("user", "再看看下周的价格", "user"))
+        for step in range(steps):
+            started = time.perf_counter()
+            request_toolkit.get_json_schemas()
+            schema_seconds += time.perf_counter() - started
+
+            started = time.perf_counter()
+            formatted = await formatter.format(msgs=msgs)
+            format_seconds += time.perf_counter() - started
+            msgs.extend(tool_step(turns, step))
+
+    total_steps = requests * steps
+    return copy_seconds / requests, schema_seconds / total_steps, format_seconds / total_steps, formatted
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--turns", type=int, default=20, help="历史对话轮数")
+    parser.add_argument("--steps", type=int, default=6, help="每个请求的ReAct步数")
+    parser.add_argument("--requests", type=int, default=20, help="模拟的请求数")
+    args = parser.parse_args()
+
+    results = {}
+    for label, toolkit_cls, formatter in (
+        ("原生", Toolkit, DashScopeChatFormatter()),
+        ("缓存", CachedSchemaToolkit, IncrementalDashScopeChatFormatter()),
+        ("链路无复用", CachedSchemaToolkit, ContextCompressingFormatter(ContextCompressor(summary_model=None,
+                                                                                   max_cached=0))),
+        ("链路", CachedSchemaToolkit, ContextCompressingFormatter(ContextCompressor(summary_model=None))),
+    ):
+        results[label] = await run(build_toolkit(toolkit_cls), formatter, args.turns, args.steps, args.requests)
+
+    assert results["原生"][3] == results["缓存"][3], "增量格式化结果与原生格式化不一致"
+    assert results["链路无复用"][3] == results["链路"][3], "压缩器复用摘要对象后格式化结果不一致"
+
+    print(f"历史 {args.turns} 轮，每个请求 {args.steps} 步，共 {args.requests} 个请求")
+    print(f"{'':8}{'深拷贝工具集/请求':>16}{'获取schema/步':>16}{'格式化/步':>14}")
+    for label, (copy_seconds, schema_seconds, format_seconds, _) in results.items():
+        print(f"{label:8}{copy_seconds * 1000:>14.3f}ms{schema_seconds * 1000:>14.3f}ms{format_seconds * 1000:>12.3f}ms")
+    for label, base, cached in (("加速", results["原生"], results["缓存"]),
+                                ("链路加速", results["链路无复用"], results["链路"])):
+        print(f"{label:8}{base[0] / cached[0]:>15.1f}x{base[1] / cached[1]:>15.1f}x{base[2] / cached[2]:>13.1f}x")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
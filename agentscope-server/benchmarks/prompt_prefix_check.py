@@ -0,0 +1,102 @@
+"""用本地 DashScope 替身验证多轮对话中提示词前缀保持稳定
+
+在后台线程启动 benchmarks/dashscope_standin.py 的替身服务，模型的 base_http_api_url 指向它，
+用与线上相同的智能体（工具路由、上下文压缩、提示词缓存模型）跑若干轮对话，
+检查每个请求的前缀顺序（系统提示词 → 工具定义 → 对话摘要 → 历史），并打印模拟的缓存命中率与显式缓存创建量。
+
+用法:
+    python benchmarks/prompt_prefix_check.py [--turns 8] [--mode implicit]
+"""
+import argparse
+import asyncio
+import copy
+import os
+import socket
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import uvicorn
+
+from agentscope.memory import InMemoryMemory
+from agentscope.message import Msg
+
+from benchmarks.dashscope_standin import StandInState, check_prefix, create_app
+from benchmarks.prompt_cache_bench import build_toolkit
+from utils.context_compression import ContextCompressingFormatter, ContextCompressor
+from utils.instrumentation import InstrumentedDashScopeChatModel, InstrumentedToolkit
+from utils.prompt_prefix import PROMPT_CACHE_MODE
+from utils.tool_routing import ToolRoutingReActAgent
+
+QUESTIONS = [
+    "帮我找一下东京新宿附近的四星酒店",
+    "这家酒店下周五入住的最低价是多少",
+    "东京下周的天气怎么样，需要带伞吗",
+    "帮我预订刚才那家酒店，两晚",
+    "查一下我的订单状态",
+    "东京明天的空气质量如何",
+]
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def serve(state: StandInState) -> str:
+    port = _free_port()
+    server = uvicorn.Server(uvicorn.Config(create_app(state), host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return f"http://127.0.0.1:{port}/api/v1"
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--turns", type=int, default=8, help="对话轮数")
+    parser.add_argument("--mode", default=PROMPT_CACHE_MODE, choices=("explicit", "implicit", "off"), help="提示词缓存方式")
+    args = parser.parse_args()
+
+    state = StandInState()
+    base_url = serve(state)
+
+    def _model(stream: bool) -> InstrumentedDashScopeChatModel:
+        return InstrumentedDashScopeChatModel(model_name="qwen-plus", api_key="stand-in", stream=stream,
+                                              enable_thinking=False, base_http_api_url=base_url,
+                                              cache_mode=args.mode)
+
+    formatter = ContextCompressingFormatter(ContextCompressor(summary_model=_model(False), keep_turns=2,
+                                                              digest_turns=1))
+    toolkit = build_toolkit(InstrumentedToolkit)
+    memory = InMemoryMemory()
+    sys_prompt = "你是DidaAgent，道旅集团的智能旅游助手。" * 100
+    for turn in range(args.turns):
+        # 与线上一样每个请求新建智能体并使用工具集副本，会话历史保存在 memory 中
+        agent = ToolRoutingReActAgent(name="DidaAgent", sys_prompt=sys_prompt, model=_model(True),
+                                      formatter=formatter, toolkit=copy.deepcopy(toolkit), memory=memory)
+        await agent(Msg("user", QUESTIONS[turn % len(QUESTIONS)], "user"))
+        # 让后台摘要任务在下一轮之前完成
+        await asyncio.gather(*formatter.compressor._tasks)
+
+    problems = check_prefix(state.requests)
+    chat = [(body, usage) for body, usage in zip(state.requests, state.usages) if body.get("parameters", {}).get("tools")]
+    input_tokens = sum(usage["input_tokens"] for _, usage in chat)
+    cached_tokens = sum(usage["prompt_tokens_details"]["cached_tokens"] for _, usage in chat)
+    created_tokens = sum(usage["prompt_tokens_details"]["cache_creation_input_tokens"] for _, usage in chat)
+    print(f"{args.turns} 轮对话，{len(chat)} 次推理请求，{len(state.requests) - len(chat)} 次摘要请求（缓存方式: {args.mode}）")
+    print(f"输入 {input_tokens} tokens，模拟缓存命中 {cached_tokens} tokens（{cached_tokens / max(input_tokens, 1):.1%}），"
+          f"显式缓存创建 {created_tokens} tokens")
+    if problems:
+        print("前缀不稳定:")
+        for problem in problems:
+            print(f"  {problem}")
+        sys.exit(1)
+    print("前缀顺序稳定：系统提示词 → 工具定义 → 对话摘要 → 历史")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
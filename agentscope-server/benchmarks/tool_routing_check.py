@@ -0,0 +1,56 @@
+"""用一组典型问题检查工具路由的分组选择
+
+用与线上相同的工具分组（分组描述取自 TOOL_GROUP_DESCRIPTIONS，工具描述取自 tools.json）构建工具集，
+逐条问题打印各分组得分与选中的分组，检查期望的分组都被选中；期望为 None 的问题应回退到全部工具。
+
+用法:
+    python benchmarks/tool_routing_check.py
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agentscope.tool import Toolkit
+
+from benchmarks.prompt_cache_bench import build_toolkit
+from utils.tool_routing import ToolRouter
+
+# (问题, 必须选中的分组；None 表示意图不明确，应使用全部工具)
+CASES: list[tuple[str, set[str] | None]] = [
+    ("帮我找一下东京新宿附近的四星酒店", {"content"}),
+    ("这家酒店有没有早餐", {"content"}),
+    ("介绍一下这家酒店的设施", {"content"}),
+    ("这家酒店下周五入住的最低价是多少", {"booking"}),
+    ("我要预订", {"booking"}),
+    ("帮我订一间房，住两晚", {"booking"}),
+    ("查一下我的订单状态", {"booking"}),
+    ("取消我的订单", {"booking"}),
+    ("明天上海会下雨吗", {"weather"}),
+    ("东京下周的天气怎么样，需要带伞吗", {"weather"}),
+    ("明天冷不冷", {"weather"}),
+    ("东京明天的空气质量如何", {"weather"}),
+    ("你好", None),
+    ("谢谢", None),
+]
+
+
+def main() -> None:
+    toolkit = build_toolkit(Toolkit)
+    router = ToolRouter()
+    failures = 0
+    for query, expected in CASES:
+        scores = router.score(toolkit, query)
+        selected = router.select(toolkit, [query], set())
+        ok = selected is None if expected is None else selected is not None and expected <= set(selected)
+        failures += not ok
+        detail = " ".join(f"{name}={value:.2f}" for name, value in scores.items())
+        print(f"{'通过' if ok else '失败'}  {query:<20} 期望 {sorted(expected) if expected else '全部'}  "
+              f"选中 {selected or '全部'}  ({detail})")
+    print(f"{len(CASES) - failures}/{len(CASES)} 条问题路由符合预期")
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -38,7 +38,7 @@ ClientID = os.environ["DIDA_CLIENT_ID"]
 # }
 
 
-def booking_cancel_confirm(
+async def booking_cancel_confirm(
     booking_id: str,
     confirm_id: str,
     description: Optional[str] = None
@@ -89,8 +89,9 @@ def booking_cancel_confirm(
 
     try:
         # 调用API
-        res: dict[str, Any] | None = Post("booking", '/api/booking/HotelBookingCancelConfirm',
-                                          params={"$format": "json"}, data=request_data)
+        res: dict[str, Any] | None = await Post("booking", '/api/booking/HotelBookingCancelConfirm',
+                                                params={"$format": "json"}, data=request_data,
+                                                idempotency_key=f"{booking_id}:{confirm_id}")
 
         if res is None:
             return ToolResponse(
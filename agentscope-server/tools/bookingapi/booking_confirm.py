@@ -59,7 +59,7 @@ ClientID = os.environ["DIDA_CLIENT_ID"]
 # }
 
 
-def booking_confirm(
+async def booking_confirm(
     reference_no: str,
     check_in_date: str,
     check_out_date: str,
@@ -202,8 +202,10 @@ def booking_confirm(
 
     try:
         # 调用API
-        res = Post("booking", '/api/booking/HotelBookingConfirm',
-                   params={"$format": "json"}, data=request_data)
+        # 有客户订单号时以其为幂等键，超时后可以安全重试；没有时只在请求确定未发出时重试
+        res = await Post("booking", '/api/booking/HotelBookingConfirm',
+                         params={"$format": "json"}, data=request_data,
+                         idempotency_key=client_reference or None)
 
         if res is None:
             return ToolResponse(
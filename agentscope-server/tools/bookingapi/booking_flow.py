@@ -0,0 +1,295 @@
+from datetime import datetime
+from typing import Any
+
+from agentscope.message import TextBlock
+from agentscope.tool import ToolResponse
+from utils.booking_flow import booking_flow
+from utils.booking_search import STATUS_MAP
+
+# {
+#   "type": "function",
+#   "function": {
+#     "name": "prepare_booking",
+#     "description": "用户选定价格计划后立即调用：确认价格并持有订单参考号（ReferenceNo），参考号到期前系统会自动续期。返回的报价ID用于 complete_booking 一步完成下单。",
+#     "parameters": {
+#       "properties": {
+#         "search_code": {
+#           "description": "来自价格查询API响应中的SearchCode",
+#           "type": "string"
+#         },
+#         "hotel_id": {
+#           "description": "酒店ID",
+#           "type": "integer"
+#         },
+#         "rate_plan_id": {
+#           "description": "价格计划ID",
+#           "type": "string"
+#         },
+#         "check_in_date": {
+#           "description": "入住日期，格式：YYYY-MM-DD",
+#           "type": "string"
+#         },
+#         "check_out_date": {
+#           "description": "离店日期，格式：YYYY-MM-DD",
+#           "type": "string"
+#         },
+#         "num_of_rooms": {
+#           "description": "房间数量",
+#           "type": "integer"
+#         },
+#         "guest_list": {
+#           "description": "住客信息列表，按房间分组。格式：[{\"room_num\": 1, \"guest_info\": [{\"name\": {\"first\": \"名字\", \"last\": \"姓氏\"}, \"is_adult\": true, \"age\": 25, \"gender\": \"M\"}]}]",
+#           "type": "array"
+#         },
+#         "currency": {
+#           "description": "期望返回价格的货币代码，如：USD、CNY、JPY等，默认为USD",
+#           "type": "string"
+#         }
+#       },
+#       "required": ["search_code", "hotel_id", "rate_plan_id", "check_in_date", "check_out_date", "num_of_rooms", "guest_list"],
+#       "type": "object"
+#     }
+#   }
+# }
+
+
+async def prepare_booking(
+    search_code: str,
+    hotel_id: int,
+    rate_plan_id: str,
+    check_in_date: str,
+    check_out_date: str,
+    num_of_rooms: int,
+    guest_list: list[dict[str, Any]],
+    currency: str = "USD"
+) -> ToolResponse:
+    """用户选定价格计划后立即调用：确认价格并持有订单参考号（ReferenceNo），参考号到期前系统会自动续期。返回的报价ID用于 complete_booking 一步完成下单。
+
+    Args:
+        search_code (str): 来自价格查询API响应中的SearchCode
+        hotel_id (int): 酒店ID
+        rate_plan_id (str): 价格计划ID
+        check_in_date (str): 入住日期，格式：YYYY-MM-DD
+        check_out_date (str): 离店日期，格式：YYYY-MM-DD
+        num_of_rooms (int): 房间数量
+        guest_list (list[dict[str, Any]]): 住客信息列表，按房间分组，住客可包含性别（gender）
+        currency (str): 期望返回价格的货币代码，默认为USD
+    """
+
+    # 验证日期格式
+    try:
+        datetime.strptime(check_in_date, "%Y-%m-%d")
+        datetime.strptime(check_out_date, "%Y-%m-%d")
+    except ValueError:
+        return ToolResponse(
+            content=[
+                TextBlock(
+                    type="text",
+                    text="错误: 日期格式不正确，请使用YYYY-MM-DD格式",
+                ),
+            ],
+        )
+
+    # 验证入住日期不能晚于离店日期
+    if check_in_date >= check_out_date:
+        return ToolResponse(
+            content=[
+                TextBlock(
+                    type="text",
+                    text="错误: 入住日期必须早于离店日期",
+                ),
+            ],
+        )
+
+    # 验证房间数量
+    if num_of_rooms <= 0:
+        return ToolResponse(
+            content=[
+                TextBlock(
+                    type="text",
+                    text="错误: 房间数量必须大于0",
+                ),
+            ],
+        )
+
+    # 验证住客信息
+    if not guest_list:
+        return ToolResponse(
+            content=[
+                TextBlock(
+                    type="text",
+                    text="错误: 必须提供住客信息",
+                ),
+            ],
+        )
+
+    print(f"准备预订 - 酒店ID: {hotel_id}, 入住: {check_in_date}, 离店: {check_out_date}, RatePlanID: {rate_plan_id}")
+
+    try:
+        quote, error = await booking_flow.prepare(
+            search_code, hotel_id, rate_plan_id, check_in_date, check_out_date,
+            num_of_rooms, guest_list, currency)
+    except Exception as e:
+        return ToolResponse(
+            content=[
+                TextBlock(
+                    type="text",
+                    text=f"价格确认过程中发生异常: {str(e)}",
+                ),
+            ],
+        )
+
+    if quote is None:
+        return ToolResponse(
+            content=[
+                TextBlock(
+                    type="text",
+                    text=error,
+                ),
+            ],
+        )
+
+    result_text = f"价格确认成功，报价已锁定!\n"
+    result_text += f"报价ID: {quote.quote_id}\n"
+    result_text += f"订单参考号: {quote.reference_no}\n"
+    result_text += f"酒店名称: {quote.hotel_name}\n"
+    result_text += f"入住日期: {check_in_date}\n"
+    result_text += f"离店日期: {check_out_date}\n"
+    result_text += f"总价: {quote.total_price} {quote.currency}\n"
+    result_text += f"房间数: {num_of_rooms}\n\n"
+    result_text += "参考号到期前系统会自动续期。请向用户确认价格并收集联系人信息，然后使用报价ID调用 complete_booking 下单。"
+
+    return ToolResponse(
+        content=[
+            TextBlock(
+                type="text",
+                text=result_text,
+            ),
+        ],
+    )
+
+
+# {
+#   "type": "function",
+#   "function": {
+#     "name": "complete_booking",
+#     "description": "使用 prepare_booking 返回的报价ID创建酒店预订订单。参考号即将过期时会自动重新确认价格；同一客户订单号重复提交不会重复下单。",
+#     "parameters": {
+#       "properties": {
+#         "quote_id": {
+#           "description": "prepare_booking 返回的报价ID",
+#           "type": "string"
+#         },
+#         "contact": {
+#           "description": "联系人信息。格式：{\"name\": {\"first\": \"名字\", \"last\": \"姓氏\"}, \"email\": \"邮箱\", \"phone\": \"电话\"}",
+#           "type": "object"
+#         },
+#         "client_reference": {
+#           "description": "您系统内的订单号（可选），需保证唯一性；不提供时使用报价生成的随机订单号",
+#           "type": "string"
+#         },
+#         "customer_request": {
+#           "description": "特殊需求（可选），酒店会尽力满足但不保证",
+#           "type": "string"
+#         },
+#         "accept_price_change": {
+#           "description": "续期后价格发生变化时，用户已同意新价格则设为true",
+#           "type": "boolean"
+#         }
+#       },
+#       "required": ["quote_id", "contact"],
+#       "type": "object"
+#     }
+#   }
+# }
+
+
+async def complete_booking(
+    quote_id: str,
+    contact: dict[str, Any],
+    client_reference: str | None = None,
+    customer_request: str | None = None,
+    accept_price_change: bool = False
+) -> ToolResponse:
+    """使用 prepare_booking 返回的报价ID创建酒店预订订单。参考号即将过期时会自动重新确认价格；同一客户订单号重复提交不会重复下单。
+
+    Args:
+        quote_id (str): prepare_booking 返回的报价ID
+        contact (dict[str, Any]): 联系人信息
+        client_reference (str, optional): 您系统内的订单号，需保证唯一性；不提供时使用报价生成的随机订单号
+        customer_request (str, optional): 特殊需求，酒店会尽力满足但不保证
+        accept_price_change (bool): 续期后价格发生变化时，用户已同意新价格则设为true
+    """
+
+    # 验证联系人信息
+    if not contact or "name" not in contact or "email" not in contact or "phone" not in contact:
+        return ToolResponse(
+            content=[
+                TextBlock(
+                    type="text",
+                    text="错误: 联系人信息必须包含姓名、邮箱和电话",
+                ),
+            ],
+        )
+
+    print(f"完成预订 - 报价ID: {quote_id}, 客户订单号: {client_reference}")
+
+    try:
+        result = await booking_flow.complete(quote_id, contact, client_reference, customer_request, accept_price_change)
+    except Exception as e:
+        return ToolResponse(
+            content=[
+                TextBlock(
+                    type="text",
+                    text=f"预订订单创建过程中发生异常: {str(e)}",
+                ),
+            ],
+        )
+
+    if not result["ok"]:
+        return ToolResponse(
+            content=[
+                TextBlock(
+                    type="text",
+                    text=result["error"],
+                ),
+            ],
+        )
+
+    booking_details = result["booking"]
+    quote = result.get("quote", {})
+    status = booking_details.get("Status", -1)
+    confirmation_code = booking_details.get("ConfirmationCode", "")
+
+    result_text = "该订单此前已创建，以下为原订单结果\n" if result["repeated"] else ""
+    result_text += f"预订订单创建成功!\n"
+    result_text += f"道旅订单号: {booking_details.get('BookingID', '')}\n"
+    result_text += f"订单状态: {STATUS_MAP.get(status, f'未知状态({status})')}\n"
+
+    if confirmation_code:
+        result_text += f"酒店确认号: {confirmation_code}\n"
+    else:
+        result_text += "酒店确认号: 暂未返回（建议入住前3天通过订单查询接口查询）\n"
+
+    result_text += f"酒店名称: {quote.get('hotel_name', '')}\n"
+    result_text += f"入住日期: {quote.get('check_in_date', '')}\n"
+    result_text += f"离店日期: {quote.get('check_out_date', '')}\n"
+    result_text += f"总价: {booking_details.get('TotalPrice', quote.get('total_price', 0))} {quote.get('currency', '')}\n"
+    result_text += f"客户订单号: {result['client_reference']}\n"
+
+    # 根据状态提供相应提示
+    if status in [2]:
+        result_text += "\n✅ 订单已确认，预订成功！"
+    elif status in [5, 6]:
+        result_text += f"\n⏳ 订单正在处理中，请稍后通过订单查询接口查询最终状态"
+    elif status in [3, 4]:
+        result_text += "\n❌ 订单创建失败或已取消"
+
+    return ToolResponse(
+        content=[
+            TextBlock(
+                type="text",
+                text=result_text,
+            ),
+        ],
+    )
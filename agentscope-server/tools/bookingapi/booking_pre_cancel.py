@@ -30,7 +30,7 @@ ClientID = os.environ["DIDA_CLIENT_ID"]
 # }
 
 
-def booking_pre_cancel(booking_id: str) -> ToolResponse:
+async def booking_pre_cancel(booking_id: str) -> ToolResponse:
     """预取消订单。接口将返回取消金额以及取消确认ID。注意：这是预取消，只调用这个API不足以真正取消订单，需要配合取消确认API使用。
 
     Args:
@@ -60,8 +60,9 @@ def booking_pre_cancel(booking_id: str) -> ToolResponse:
 
     try:
         # 调用API
-        res = Post("booking", '/api/booking/HotelBookingCancel',
-                   params={"$format": "json"}, data=request_data)
+        # 预取消只查询取消费用与确认ID，不改变订单状态，可以安全重试
+        res = await Post("booking", '/api/booking/HotelBookingCancel',
+                         params={"$format": "json"}, data=request_data, idempotent=True)
 
         if res is None:
             return ToolResponse(
@@ -1,16 +1,9 @@
-import os
 from datetime import datetime
-from typing import Any, Optional
+from typing import Optional
 
 from agentscope.message import TextBlock
 from agentscope.tool import ToolResponse
-from utils.request import Post
-from dotenv import load_dotenv
-
-load_dotenv('debug.env')
-
-LicenseKey = os.environ["DIDA_LICENSE_KEY"]
-ClientID = os.environ["DIDA_CLIENT_ID"]
+from utils.booking_search import build_search_by, search_bookings, STATUS_MAP
 
 # {
 #   "type": "function",
@@ -83,7 +76,7 @@ ClientID = os.environ["DIDA_CLIENT_ID"]
 # }
 
 
-def booking_search(
+async def booking_search(
     booking_id: Optional[str] = None,
     client_reference: Optional[str] = None,
     check_in_date_from: Optional[str] = None,
@@ -161,78 +154,15 @@ def booking_search(
     if client_reference:
         print(f"客户订单号: {client_reference}")
 
-    # 构建请求数据
-    request_data: Any = {
-        "Header": {
-            "ClientID": ClientID,
-            "LicenseKey": LicenseKey
-        },
-        "SearchBy": {}
-    }
-
-    # 如果提供了道旅订单号，优先使用（最精确的查询方式）
-    if booking_id:
-        request_data["SearchBy"]["BookingID"] = booking_id
-    else:
-        # 构建其他查询条件
-        booking_info = {}
-
-        if client_reference:
-            booking_info["ClientReference"] = client_reference
-
-        if check_in_date_from or check_in_date_to:
-            check_in_range = {}
-            if check_in_date_from:
-                check_in_range["from"] = check_in_date_from
-            if check_in_date_to:
-                check_in_range["to"] = check_in_date_to
-            booking_info["CheckInDateRange"] = check_in_range
-
-        if check_out_date_from or check_out_date_to:
-            check_out_range = {}
-            if check_out_date_from:
-                check_out_range["from"] = check_out_date_from
-            if check_out_date_to:
-                check_out_range["to"] = check_out_date_to
-            booking_info["CheckOutDateRange"] = check_out_range
-
-        if book_date_from or book_date_to:
-            book_date_range = {}
-            if book_date_from:
-                book_date_range["from"] = book_date_from
-            if book_date_to:
-                book_date_range["to"] = book_date_to
-            booking_info["BookDateRange"] = book_date_range
-
-        if guest_first_name or guest_last_name:
-            guest_name = {}
-            if guest_first_name:
-                guest_name["First"] = guest_first_name
-            if guest_last_name:
-                guest_name["Last"] = guest_last_name
-            booking_info["GuestName"] = guest_name
-
-        if contact_first_name or contact_last_name:
-            contact_name = {}
-            if contact_first_name:
-                contact_name["First"] = contact_first_name
-            if contact_last_name:
-                contact_name["Last"] = contact_last_name
-            booking_info["ContactName"] = contact_name
-
-        if status is not None:
-            booking_info["Status"] = status
-
-        if city_code:
-            booking_info["CityCode"] = city_code
-
-        if booking_info:
-            request_data["SearchBy"]["BookingInfo"] = booking_info
+    search_by = build_search_by(
+        booking_id, client_reference, check_in_date_from, check_in_date_to,
+        check_out_date_from, check_out_date_to, book_date_from, book_date_to,
+        guest_first_name, guest_last_name, contact_first_name, contact_last_name,
+        status, city_code)
 
     try:
         # 调用API
-        res = Post("booking", '/api/booking/HotelBookingSearch',
-                   params={"$format": "json"}, data=request_data)
+        res = await search_bookings(search_by)
 
         if res is None:
             return ToolResponse(
@@ -259,16 +189,6 @@ def booking_search(
                     ],
                 )
 
-            # 状态映射
-            status_map = {
-                0: "PreBook（预订）",
-                2: "Confirmed（已确认）",
-                3: "Canceled（已取消）",
-                4: "Failed（失败）",
-                5: "Pending（处理中）",
-                6: "OnRequest（申请中）"
-            }
-
             result_text = f"找到 {len(booking_list)} 个订单:\n\n"
 
             for i, booking in enumerate(booking_list, 1):
@@ -296,7 +216,7 @@ def booking_search(
                 contact_phone = contact.get("Phone", "")
                 contact_email = contact.get("Email", "")
 
-                status_text = status_map.get(
+                status_text = STATUS_MAP.get(
                     status_result, f"未知状态({status_result})")
 
                 result_text += f"=== 订单 {i} ===\n"
@@ -0,0 +1,228 @@
+import asyncio
+from datetime import datetime
+from typing import AsyncGenerator, Optional
+
+from agentscope.message import TextBlock
+from agentscope.tool import ToolResponse
+from utils.booking_search import (
+    BOOKING_SEARCH_PAGE_DAYS,
+    BookingExporter,
+    booking_row,
+    build_search_by,
+    iter_booking_pages,
+    page_window,
+    plan_pages,
+)
+from utils.render import estimate_tokens, render_result, TOOL_TOKEN_BUDGET, TOOL_TOKEN_BUDGETS
+
+# {
+#   "type": "function",
+#   "function": {
+#     "name": "booking_search_stream",
+#     "description": "按日期范围分页查询大量订单，逐页流式返回结果；可导出为CSV或JSONL文件用于对账。单个订单请使用 booking_search。",
+#     "parameters": {
+#       "properties": {
+#         "book_date_from": {
+#           "description": "订单创建日期范围开始，格式：YYYY-MM-DD",
+#           "type": "string"
+#         },
+#         "book_date_to": {
+#           "description": "订单创建日期范围结束，格式：YYYY-MM-DD，默认为今天",
+#           "type": "string"
+#         },
+#         "check_in_date_from": {
+#           "description": "入住日期范围开始，格式：YYYY-MM-DD",
+#           "type": "string"
+#         },
+#         "check_in_date_to": {
+#           "description": "入住日期范围结束，格式：YYYY-MM-DD",
+#           "type": "string"
+#         },
+#         "check_out_date_from": {
+#           "description": "离店日期范围开始，格式：YYYY-MM-DD",
+#           "type": "string"
+#         },
+#         "check_out_date_to": {
+#           "description": "离店日期范围结束，格式：YYYY-MM-DD",
+#           "type": "string"
+#         },
+#         "status": {
+#           "description": "订单状态：0=PreBook, 2=Confirmed, 3=Canceled, 4=Failed, 5=Pending, 6=OnRequest",
+#           "type": "integer"
+#         },
+#         "city_code": {
+#           "description": "城市代码",
+#           "type": "string"
+#         },
+#         "page_days": {
+#           "description": "每页覆盖的天数，默认7",
+#           "type": "integer"
+#         },
+#         "export_format": {
+#           "description": "导出格式：csv 或 jsonl，提供时结果写入文件并返回文件路径",
+#           "type": "string"
+#         }
+#       },
+#       "required": [],
+#       "type": "object"
+#     }
+#   }
+# }
+
+
+async def booking_search_stream(
+    book_date_from: Optional[str] = None,
+    book_date_to: Optional[str] = None,
+    check_in_date_from: Optional[str] = None,
+    check_in_date_to: Optional[str] = None,
+    check_out_date_from: Optional[str] = None,
+    check_out_date_to: Optional[str] = None,
+    status: Optional[int] = None,
+    city_code: Optional[str] = None,
+    page_days: int = BOOKING_SEARCH_PAGE_DAYS,
+    export_format: Optional[str] = None
+) -> AsyncGenerator[ToolResponse, None]:
+    """按日期范围分页查询大量订单，逐页流式返回结果；可导出为CSV或JSONL文件用于对账。单个订单请使用 booking_search。
+
+    Args:
+        book_date_from (str, optional): 订单创建日期范围开始，格式：YYYY-MM-DD
+        book_date_to (str, optional): 订单创建日期范围结束，格式：YYYY-MM-DD，默认为今天
+        check_in_date_from (str, optional): 入住日期范围开始，格式：YYYY-MM-DD
+        check_in_date_to (str, optional): 入住日期范围结束，格式：YYYY-MM-DD
+        check_out_date_from (str, optional): 离店日期范围开始，格式：YYYY-MM-DD
+        check_out_date_to (str, optional): 离店日期范围结束，格式：YYYY-MM-DD
+        status (int, optional): 订单状态：0=PreBook, 2=Confirmed, 3=Canceled, 4=Failed, 5=Pending, 6=OnRequest
+        city_code (str, optional): 城市代码
+        page_days (int): 每页覆盖的天数，默认7
+        export_format (str, optional): 导出格式：csv 或 jsonl，提供时结果写入文件并返回文件路径
+    """
+
+    # 验证日期格式
+    date_fields = [
+        (check_in_date_from, "入住日期开始"),
+        (check_in_date_to, "入住日期结束"),
+        (check_out_date_from, "离店日期开始"),
+        (check_out_date_to, "离店日期结束"),
+        (book_date_from, "订单创建日期开始"),
+        (book_date_to, "订单创建日期结束")
+    ]
+
+    for date_value, field_name in date_fields:
+        if date_value:
+            try:
+                datetime.strptime(date_value, "%Y-%m-%d")
+            except ValueError:
+                yield ToolResponse(
+                    content=[
+                        TextBlock(
+                            type="text",
+                            text=f"错误: {field_name}格式不正确，请使用YYYY-MM-DD格式",
+                        ),
+                    ],
+                )
+                return
+
+    if not (book_date_from or check_in_date_from or check_out_date_from):
+        yield ToolResponse(
+            content=[
+                TextBlock(
+                    type="text",
+                    text="错误: 必须提供订单创建、入住或离店日期范围的开始日期",
+                ),
+            ],
+        )
+        return
+
+    # 验证日期范围
+    date_ranges = [
+        (check_in_date_from, check_in_date_to, "入住日期"),
+        (check_out_date_from, check_out_date_to, "离店日期"),
+        (book_date_from, book_date_to, "订单创建日期"),
+    ]
+
+    for date_from, date_to, field_name in date_ranges:
+        if date_from and date_to and date_from > date_to:
+            yield ToolResponse(
+                content=[
+                    TextBlock(
+                        type="text",
+                        text=f"错误: {field_name}开始 {date_from} 晚于结束 {date_to}",
+                    ),
+                ],
+            )
+            return
+
+    if export_format is not None and export_format not in ("csv", "jsonl"):
+        yield ToolResponse(
+            content=[
+                TextBlock(
+                    type="text",
+                    text=f"错误: 不支持的导出格式 {export_format}，可选 csv、jsonl",
+                ),
+            ],
+        )
+        return
+
+    search_by = build_search_by(
+        check_in_date_from=check_in_date_from, check_in_date_to=check_in_date_to,
+        check_out_date_from=check_out_date_from, check_out_date_to=check_out_date_to,
+        book_date_from=book_date_from, book_date_to=book_date_to,
+        status=status, city_code=city_code)
+    total_pages = len(plan_pages(search_by, page_days))
+    print(f"分页查询订单 - 条件: {search_by}, 共 {total_pages} 页, 导出: {export_format}")
+    if total_pages == 0:
+        # 只有订单创建日期开始且晚于今天时分页为空
+        yield ToolResponse(
+            content=[
+                TextBlock(
+                    type="text",
+                    text=f"共找到 0 个订单：订单创建日期开始 {book_date_from} 晚于今天，查询范围内没有订单",
+                ),
+            ],
+        )
+        return
+
+    # AgentScope 以最后一个分块作为工具结果，因此每个分块携带截至当前的全部内容
+    budget = TOOL_TOKEN_BUDGETS.get("booking_search_stream", TOOL_TOKEN_BUDGET)
+    used_tokens = 0
+    blocks: list[TextBlock] = []
+    exporter = BookingExporter(export_format) if export_format else None
+    total = 0
+    error: str | None = None
+
+    try:
+        page_number = 0
+        async for page, bookings in iter_booking_pages(search_by, page_days):
+            page_number += 1
+            total += len(bookings)
+            header = f"第 {page_number}/{total_pages} 页 ({page_window(page)}): {len(bookings)} 个订单"
+
+            if exporter is not None:
+                await asyncio.to_thread(exporter.write, bookings)
+                blocks = [TextBlock(type="text", text=f"正在导出: {header}，累计 {total} 个订单")]
+            elif not bookings:
+                blocks.append(TextBlock(type="text", text=header))
+            elif used_tokens < budget:
+                text = render_result("booking_search_stream", [booking_row(booking) for booking in bookings],
+                                     header=header, budget=budget - used_tokens)
+                used_tokens += estimate_tokens(text)
+                blocks.append(TextBlock(type="text", text=text))
+            else:
+                blocks.append(TextBlock(type="text", text=f"{header}（超出展示预算未列出，可使用 export_format 导出）"))
+
+            yield ToolResponse(content=list(blocks), stream=True, is_last=False)
+    except (RuntimeError, ValueError) as e:
+        error = str(e)
+    finally:
+        if exporter is not None:
+            exporter.close()
+
+    if exporter is not None:
+        summary = f"已导出 {exporter.rows} 个订单到 {exporter.path}（{export_format.upper()}）"
+        blocks = [TextBlock(type="text", text=summary)]
+    else:
+        blocks.insert(0, TextBlock(type="text", text=f"共找到 {total} 个订单，{page_number}/{total_pages} 页"))
+    if error is not None:
+        blocks.append(TextBlock(type="text", text=f"查询中断: {error}"))
+
+    yield ToolResponse(content=blocks, stream=True, is_last=True)
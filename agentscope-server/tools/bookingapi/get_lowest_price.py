@@ -5,14 +5,11 @@ from typing import Any, List, Optional
 
 from agentscope.message import TextBlock
 from agentscope.tool import ToolResponse
-from utils.request import Post
+from utils.rate_cache import search_lowest_prices
 from dotenv import load_dotenv
 
 load_dotenv('debug.env')
 
-LicenseKey = os.environ["DIDA_LICENSE_KEY"]
-ClientID = os.environ["DIDA_CLIENT_ID"]
-
 # {
 #   "type": "function",
 #   "function": {
@@ -55,7 +52,7 @@ ClientID = os.environ["DIDA_CLIENT_ID"]
 # }
 
 
-def get_lowest_price(
+async def get_lowest_price(
     check_in_date: str,
     check_out_date: str,
     currency: str,
@@ -127,31 +124,11 @@ def get_lowest_price(
     if hotel_ids:
         print(f"查询酒店ID: {hotel_ids}")
 
-    # 构建请求数据
-    request_data: Any = {
-        "Header": {
-            "ClientID": ClientID,
-            "LicenseKey": LicenseKey
-        },
-        "CheckInDate": check_in_date,
-        "CheckOutDate": check_out_date,
-        "LowestPriceOnly": True,  # 必须设置为true，表示只返回最低价
-        "Nationality": nationality,
-        "Currency": currency
-    }
-
-    # 添加目的地或酒店ID参数
-    if city_code:
-        request_data["Destination"] = {
-            "CityCode": city_code
-        }
-    elif hotel_ids:
-        request_data["HotelIDList"] = hotel_ids
-
     try:
-        # 调用API
-        res = Post("booking", '/api/rate/pricesearch',
-                   params={"$format": "json"}, data=request_data)
+        # 调用API（按酒店缓存，只对未缓存的酒店询价）
+        res, cache_stats = await search_lowest_prices(check_in_date, check_out_date, currency, nationality,
+                                                      city_code=city_code, hotel_ids=hotel_ids)
+        print(f"价格缓存: 命中 {cache_stats['cached']}, 过期返回 {cache_stats['stale']}, 新询价 {cache_stats['fetched']}")
 
         if res is None:
             return ToolResponse(
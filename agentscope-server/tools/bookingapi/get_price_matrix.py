@@ -0,0 +1,295 @@
+import asyncio
+import os
+import time
+from datetime import datetime, timedelta
+from typing import Any, Optional
+
+from agentscope.message import TextBlock
+from agentscope.tool import ToolResponse
+from dotenv import load_dotenv
+from utils.rate_cache import search_lowest_prices
+from utils.render import render_result, TOOL_TOKEN_BUDGET, TOOL_TOKEN_BUDGETS
+
+
+load_dotenv('.env')
+
+# 单次调用最多查询的入住日期数，以及同时进行中的日期组合询价数
+PRICE_MATRIX_MAX_DATES = int(os.environ.get("PRICE_MATRIX_MAX_DATES", "31"))
+PRICE_MATRIX_CONCURRENCY = int(os.environ.get("PRICE_MATRIX_CONCURRENCY", "4"))
+
+_WEEKDAYS = ["周一", "周二", "周三", "周四", "周五", "周六", "周日"]
+
+# {
+#   "type": "function",
+#   "function": {
+#     "name": "get_price_matrix",
+#     "description": "灵活日期比价：在入住日期范围内按固定入住晚数并发查询每个入住日期的最低价，返回价格日历（每个日期的最低价、最便宜酒店与价格等级1-5）；按酒店ID查询时还返回酒店×日期的价格矩阵。适用于“三月哪个周末东京最便宜”之类的问题，替代逐日调用 get_lowest_price。",
+#     "parameters": {
+#       "properties": {
+#         "check_in_from": {
+#           "description": "入住日期范围开始，格式：YYYY-MM-DD",
+#           "type": "string"
+#         },
+#         "check_in_to": {
+#           "description": "入住日期范围结束（含），格式：YYYY-MM-DD",
+#           "type": "string"
+#         },
+#         "currency": {
+#           "description": "期望返回价格的币种，如：CNY、USD、JPY等",
+#           "type": "string"
+#         },
+#         "nights": {
+#           "description": "入住晚数，默认1",
+#           "type": "integer"
+#         },
+#         "city_code": {
+#           "description": "目的地城市/区域代码，如：602651。与hotel_ids二选一",
+#           "type": "string"
+#         },
+#         "hotel_ids": {
+#           "description": "酒店ID列表。与city_code二选一",
+#           "type": "array",
+#           "items": {
+#             "type": "integer"
+#           }
+#         },
+#         "weekdays": {
+#           "description": "只查询这些星期几入住的日期，1=周一 ... 7=周日，如周末入住为 [5, 6]；默认不限",
+#           "type": "array",
+#           "items": {
+#             "type": "integer"
+#           }
+#         },
+#         "nationality": {
+#           "description": "客人国籍，使用ISO 3166-1 alpha-2标准（2个字母），默认为CN",
+#           "type": "string"
+#         }
+#       },
+#       "required": ["check_in_from", "check_in_to", "currency"],
+#       "type": "object"
+#     }
+#   }
+# }
+
+
+def _price(hotel: dict[str, Any]) -> float | None:
+    value = (hotel.get("LowestPrice") or {}).get("Value")
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _level(price: float, lowest: float, highest: float) -> int:
+    """价格等级 1-5，1 为范围内最便宜"""
+    if highest <= lowest:
+        return 1
+    return 1 + min(int(5 * (price - lowest) / (highest - lowest)), 4)
+
+
+async def get_price_matrix(
+    check_in_from: str,
+    check_in_to: str,
+    currency: str,
+    nights: int = 1,
+    city_code: Optional[str] = None,
+    hotel_ids: Optional[list[int]] = None,
+    weekdays: Optional[list[int]] = None,
+    nationality: str = "CN"
+) -> ToolResponse:
+    """灵活日期比价：在入住日期范围内按固定入住晚数并发查询每个入住日期的最低价，返回价格日历（每个日期的最低价、最便宜酒店与价格等级1-5）；按酒店ID查询时还返回酒店×日期的价格矩阵。适用于“三月哪个周末东京最便宜”之类的问题，替代逐日调用 get_lowest_price。
+
+    Args:
+        check_in_from (str): 入住日期范围开始，格式：YYYY-MM-DD
+        check_in_to (str): 入住日期范围结束（含），格式：YYYY-MM-DD
+        currency (str): 期望返回价格的币种，如：CNY、USD、JPY等
+        nights (int): 入住晚数，默认1
+        city_code (str, optional): 目的地城市/区域代码，如：602651。与hotel_ids二选一
+        hotel_ids (List[int], optional): 酒店ID列表。与city_code二选一
+        weekdays (List[int], optional): 只查询这些星期几入住的日期，1=周一 ... 7=周日，如周末入住为 [5, 6]；默认不限
+        nationality (str): 客人国籍，使用ISO 3166-1 alpha-2标准（2个字母），默认为CN
+    """
+
+    # 参数验证
+    if not city_code and not hotel_ids:
+        return ToolResponse(
+            content=[
+                TextBlock(
+                    type="text",
+                    text="错误: 必须提供city_code或hotel_ids中的一个参数",
+                ),
+            ],
+        )
+
+    if city_code and hotel_ids:
+        return ToolResponse(
+            content=[
+                TextBlock(
+                    type="text",
+                    text="错误: city_code和hotel_ids不能同时提供，请选择其中一个",
+                ),
+            ],
+        )
+
+    # 验证日期格式
+    try:
+        start = datetime.strptime(check_in_from, "%Y-%m-%d").date()
+        end = datetime.strptime(check_in_to, "%Y-%m-%d").date()
+    except ValueError:
+        return ToolResponse(
+            content=[
+                TextBlock(
+                    type="text",
+                    text="错误: 日期格式不正确，请使用YYYY-MM-DD格式",
+                ),
+            ],
+        )
+
+    if start > end:
+        return ToolResponse(
+            content=[
+                TextBlock(
+                    type="text",
+                    text="错误: 入住日期范围开始不能晚于结束",
+                ),
+            ],
+        )
+
+    if nights <= 0:
+        return ToolResponse(
+            content=[
+                TextBlock(
+                    type="text",
+                    text="错误: 入住晚数必须大于0",
+                ),
+            ],
+        )
+
+    check_in_dates = [start + timedelta(days=offset) for offset in range((end - start).days + 1)]
+    if weekdays:
+        check_in_dates = [day for day in check_in_dates if day.isoweekday() in weekdays]
+    if not check_in_dates:
+        return ToolResponse(
+            content=[
+                TextBlock(
+                    type="text",
+                    text=f"错误: {check_in_from} 至 {check_in_to} 之间没有符合星期条件 {weekdays} 的入住日期",
+                ),
+            ],
+        )
+
+    if len(check_in_dates) > PRICE_MATRIX_MAX_DATES:
+        return ToolResponse(
+            content=[
+                TextBlock(
+                    type="text",
+                    text=f"错误: 单次最多查询 {PRICE_MATRIX_MAX_DATES} 个入住日期（当前 {len(check_in_dates)} 个），请缩小日期范围或限定星期",
+                ),
+            ],
+        )
+
+    stays = [(day.isoformat(), (day + timedelta(days=nights)).isoformat()) for day in check_in_dates]
+    print(f"价格日历 - 入住 {check_in_from}~{check_in_to}, {nights} 晚, {len(stays)} 个日期, 币种: {currency}, "
+          f"目的地: {city_code}, 酒店ID: {hotel_ids}")
+
+    started = time.perf_counter()
+    semaphore = asyncio.Semaphore(PRICE_MATRIX_CONCURRENCY)
+
+    async def _search(check_in_date: str, check_out_date: str) -> tuple[dict[str, Any] | None, dict[str, int]]:
+        # 每个日期组合走带缓存的最低价查询，已询过价的酒店与日期不会重复请求上游
+        async with semaphore:
+            return await search_lowest_prices(check_in_date, check_out_date, currency, nationality,
+                                              city_code=city_code, hotel_ids=hotel_ids)
+
+    results = await asyncio.gather(*(_search(check_in_date, check_out_date) for check_in_date, check_out_date in stays),
+                                   return_exceptions=True)
+
+    calendar: list[dict[str, Any]] = []
+    matrix: dict[Any, dict[str, Any]] = {}
+    failed: list[str] = []
+    totals = {"cached": 0, "stale": 0, "fetched": 0}
+    for (check_in_date, check_out_date), result in zip(stays, results):
+        if isinstance(result, BaseException):
+            print(f"价格日历 {check_in_date} 询价异常: {result}")
+            failed.append(check_in_date)
+            continue
+        res, cache_stats = result
+        for key in totals:
+            totals[key] += cache_stats.get(key, 0)
+        if res is None or "Success" not in res:
+            failed.append(check_in_date)
+            continue
+
+        priced = [(price, hotel) for hotel in res["Success"].get("PriceDetails", {}).get("HotelList", [])
+                  if (price := _price(hotel)) is not None]
+        row: dict[str, Any] = {
+            "CheckIn": check_in_date,
+            "Weekday": _WEEKDAYS[datetime.strptime(check_in_date, "%Y-%m-%d").weekday()],
+            "CheckOut": check_out_date,
+            "LowestPrice": None,
+            "PerNight": None,
+            "HotelID": None,
+            "HotelName": "",
+            "Hotels": len(priced),
+        }
+        if priced:
+            price, hotel = min(priced, key=lambda item: item[0])
+            row.update(LowestPrice=price, PerNight=round(price / nights, 2),
+                       HotelID=hotel.get("HotelID"), HotelName=hotel.get("HotelName", ""))
+        calendar.append(row)
+
+        if hotel_ids:
+            for price, hotel in priced:
+                matrix.setdefault(hotel.get("HotelID"), {"HotelID": hotel.get("HotelID"),
+                                                         "HotelName": hotel.get("HotelName", "")})[check_in_date] = price
+
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    print(f"价格日历完成: {len(stays)} 个日期, 失败 {len(failed)}, 缓存命中 {totals['cached']}, "
+          f"过期返回 {totals['stale']}, 新询价 {totals['fetched']}, 耗时 {elapsed_ms:.1f}ms")
+
+    prices = [row["LowestPrice"] for row in calendar if row["LowestPrice"] is not None]
+    if not prices:
+        text = f"未找到符合条件的酒店价格信息。入住: {check_in_from}~{check_in_to}, {nights} 晚"
+        if failed:
+            text += f"\n询价失败的入住日期: {failed}"
+        return ToolResponse(
+            content=[
+                TextBlock(
+                    type="text",
+                    text=text,
+                ),
+            ],
+        )
+
+    lowest, highest = min(prices), max(prices)
+    for row in calendar:
+        row["Level"] = _level(row["LowestPrice"], lowest, highest) if row["LowestPrice"] is not None else None
+    best = min((row for row in calendar if row["LowestPrice"] is not None), key=lambda row: row["LowestPrice"])
+
+    header = f"价格日历 (币种: {currency}, 入住 {nights} 晚, {len(calendar)} 个入住日期, 价格等级1最便宜-5最贵):\n"
+    header += (f"最低: {best['CheckIn']}({best['Weekday']})入住 {best['LowestPrice']} {currency}"
+               f" - {best['HotelName']} (ID: {best['HotelID']})；最高日期最低价: {highest} {currency}")
+    if failed:
+        header += f"\n询价失败的入住日期: {failed}"
+
+    budget = TOOL_TOKEN_BUDGETS.get("get_price_matrix", TOOL_TOKEN_BUDGET)
+    sections = []
+    if matrix and len(matrix) > 1:
+        # 按酒店查询时额外给出 酒店×入住日期(MM-DD) 的价格矩阵，日历与矩阵平分token预算
+        sections.append(render_result("get_price_matrix", calendar, header=header, budget=budget // 2))
+        hotel_rows = [{"HotelID": prices_by_date["HotelID"], "HotelName": prices_by_date["HotelName"],
+                       **{row["CheckIn"][5:]: prices_by_date.get(row["CheckIn"]) for row in calendar}}
+                      for prices_by_date in matrix.values()]
+        sections.append(render_result("get_price_matrix", hotel_rows,
+                                      header="酒店×入住日期价格矩阵:", budget=budget // 2))
+    else:
+        sections.append(render_result("get_price_matrix", calendar, header=header, budget=budget))
+
+    return ToolResponse(
+        content=[
+            TextBlock(
+                type="text",
+                text="\n\n".join(sections),
+            ),
+        ],
+    )
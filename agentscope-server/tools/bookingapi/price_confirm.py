@@ -59,7 +59,7 @@ ClientID = os.environ["DIDA_CLIENT_ID"]
 # }
 
 
-def price_confirm(
+async def price_confirm(
     search_code: str,
     hotel_id: int,
     rate_plan_id: str,
@@ -175,8 +175,8 @@ def price_confirm(
 
     try:
         # 调用API
-        res = Post("booking", '/api/booking/HotelPriceConfirm',
-                   params={"$format": "json"}, data=request_data)
+        res = await Post("booking", '/api/booking/HotelPriceConfirm',
+                         params={"$format": "json"}, data=request_data, idempotent=True)
 
         if res is None:
             return ToolResponse(
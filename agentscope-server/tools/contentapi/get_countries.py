@@ -6,7 +6,8 @@ import agentscope
 from pydantic import BaseModel, Field
 from agentscope.message import TextBlock, ToolUseBlock
 from agentscope.tool import ToolResponse, Toolkit, execute_python_code
-from utils.request import Get, Post
+from utils.reference_data import GetReference
+from utils.render import render_result
 
 # {
 #   "type": "function",
@@ -27,7 +28,7 @@ from utils.request import Get, Post
 # }
 
 
-def get_countries(language: str) -> ToolResponse:
+async def get_countries(language: str) -> ToolResponse:
     """此API用于检索DIDA平台支持的的全部国家列表，返回JSON格式的数据。
 
     Args:
@@ -37,22 +38,13 @@ def get_countries(language: str) -> ToolResponse:
 
     print(f"当前语言 '{language}'")
 
-    res = Get("content", '/api/v1/region/countries',
-              params={"language": language})
+    res = await GetReference('/api/v1/region/countries', language)
 
-    # 格式化数据为字符串
-    result_summary: str = f"当前语言 '{language}', 响应数据: \n\n"
-
-    # 检查响应数据结构
+    # 检查响应数据结构，国家列表 [{'code': 'ZM', 'name': '赞比亚'}, ...] 渲染为 code/name 表格
     if res and "data" in res:
-        # 格式 {'code': 'ZM', 'name': '赞比亚'}
-        for i, country in enumerate(res["data"]):
-            if isinstance(country, dict) and "code" in country and "name" in country:
-                result_summary += f"{i+1}: {country['code']}, {country['name']}\n"
-            else:
-                result_summary += f"{i+1}: {country}\n"
+        result_summary = render_result("get_countries", res, header=f"当前语言 '{language}', 共 {len(res['data'])} 个国家")
     else:
-        result_summary += f"API响应格式异常: {res}"
+        result_summary = f"当前语言 '{language}', API响应格式异常: {res}"
 
     return ToolResponse(
         content=[
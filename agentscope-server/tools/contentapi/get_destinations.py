@@ -1,9 +1,10 @@
 from agentscope.message import TextBlock
 from agentscope.tool import ToolResponse
-from utils.request import Get
+from utils.reference_data import GetReference
+from utils.render import render_result
 
 
-def get_destinations(countryCode: str, language: str = "en-US") -> ToolResponse:
+async def get_destinations(countryCode: str, language: str = "en-US") -> ToolResponse:
     """此API用于检索特定国家的目的地列表。
 
     Args:
@@ -15,19 +16,18 @@ def get_destinations(countryCode: str, language: str = "en-US") -> ToolResponse:
 
     print(f"查询国家代码 '{countryCode}' 的目的地，语言: '{language}'")
 
-    res = Get("content", '/api/v1/region/destinations',
-              params={"countryCode": countryCode, "language": language})
+    cached = await GetReference('/api/v1/region/destinations', language, countryCode=countryCode)
 
-    # 仅保留前十个目的地
+    # 仅保留前十个目的地（复制一份，避免修改缓存中的数据）
     limit = 10
-    res["data"] = res["data"][:limit]
+    res = {**cached, "data": cached["data"][:limit]}
     print(f"响应数据: {res}")
 
     return ToolResponse(
         content=[
             TextBlock(
                 type="text",
-                text=f"国家代码 '{countryCode}', 语言 '{language}', 当前限制返回目的地数量 {len(res['data'])}, 响应数据: {res}",
+                text=render_result("get_destinations", res, header=f"国家代码 '{countryCode}', 语言 '{language}', 当前限制返回目的地数量 {len(res['data'])}"),
             ),
         ],
     )
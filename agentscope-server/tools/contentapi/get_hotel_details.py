@@ -1,6 +1,7 @@
 from agentscope.message import TextBlock
 from agentscope.tool import ToolResponse
-from utils.request import Post
+from utils.hotel_content import fetch_hotel_details
+from utils.render import render_result
 
 # {
 #   "type": "function",
@@ -10,7 +11,7 @@ from utils.request import Post
 #     "parameters": {
 #       "properties": {
 #         "hotelIds": {
-#           "description": "酒店ID列表，最多支持50个ID",
+#           "description": "酒店ID列表，超过50个ID时自动分批并发查询",
 #           "type": "array",
 #           "items": {
 #             "type": "integer"
@@ -28,63 +29,53 @@ from utils.request import Post
 # }
 
 
-def get_hotel_details(hotelIds: list[int], language: str = "en-US") -> ToolResponse:
+async def get_hotel_details(hotelIds: list[int], language: str = "en-US") -> ToolResponse:
     """根据酒店ID列表获取酒店详细信息（包括基本信息、政策、设施等），返回JSON格式的数据。
 
     Args:
-        hotelIds (List[int]): 酒店ID列表，最多支持50个ID
+        hotelIds (List[int]): 酒店ID列表，超过50个ID时自动分批并发查询
         language (str): 返回内容的语言代码，默认为 en-US
     """
 
     print(f"查询酒店详情，酒店ID: {hotelIds}, 语言: '{language}'")
 
-    # 验证酒店ID数量限制
-    if len(hotelIds) > 50:
+    # 验证酒店ID格式
+    if not all(isinstance(hotel_id, int) and hotel_id > 0 for hotel_id in hotelIds):
         return ToolResponse(
             content=[
                 TextBlock(
                     type="text",
-                    text="错误: 酒店ID列表最多支持50个ID，当前提供了 {} 个ID".format(
-                        len(hotelIds)),
+                    text="错误: 酒店ID必须为正整数",
                 ),
             ],
         )
 
-    # 验证酒店ID格式
-    if not all(isinstance(hotel_id, int) and hotel_id > 0 for hotel_id in hotelIds):
+    # 缓存命中的酒店直接返回，其余按50个一批并发查询；
+    # policy、facilities、images、rooms、description 等字段在解析时即被丢弃
+    hotels, stats = await fetch_hotel_details(hotelIds, language)
+    for hotel in hotels:
+        print(f"酒店详情: {hotel}")
+    print(f"酒店详情统计: {stats}")
+    if stats["failed_batches"] and not hotels:
         return ToolResponse(
             content=[
                 TextBlock(
                     type="text",
-                    text="错误: 酒店ID必须为正整数",
+                    text="API请求失败，请检查网络连接和参数设置",
                 ),
             ],
         )
+    res = {"data": hotels}
 
-    # 构建请求数据
-    request_data = {
-        "language": language,
-        "hotelIds": hotelIds
-    }
-
-    res = Post("content", '/api/v1/hotel/details',
-               params={}, data=request_data)
-
-    # 移除每个酒店详情字段的description、policy、facilities、images、rooms
-    for hotel in res["data"]:
-        del hotel["policy"]
-        del hotel["facilities"]
-        del hotel["images"]
-        del hotel["rooms"]
-        del hotel["description"]
-        del hotel["zipCode"]
-        print(f"酒店详情: {hotel}")
+    header = f"查询酒店详情，酒店ID: {hotelIds}, 语言: '{language}'"
+    if stats["failed_ids"]:
+        header += f"\n注意: 以下酒店ID的详情请求失败，未包含在结果中，可稍后重试: {stats['failed_ids']}"
 
     return ToolResponse(
         content=[
             TextBlock(
                 type="text",
-                text=f"查询酒店详情，酒店ID: {hotelIds}, 语言: '{language}', 响应数据: {res}",
+                text=render_result("get_hotel_details", res, header=header),
             ),
         ],
     )
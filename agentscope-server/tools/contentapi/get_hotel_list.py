@@ -1,6 +1,14 @@
+import asyncio
+import json
+
+from typing import Any
 from agentscope.message import TextBlock
 from agentscope.tool import ToolResponse
-from utils.request import Get
+from utils.hotel_catalog import hotel_catalog
+from utils.request import GetStream
+
+# 返回给模型的ID数量默认上限，国家级列表可能有数十万个ID
+HOTEL_LIST_DEFAULT_LIMIT = 1000
 
 # {
 #   "type": "function",
@@ -20,6 +28,10 @@ from utils.request import Get
 #         "language": {
 #           "description": "响应的语言，如：en-US、zh-CN、ja-JP等",
 #           "type": "string"
+#         },
+#         "limit": {
+#           "description": "最多返回的酒店ID数量，默认1000；总数仍会完整统计",
+#           "type": "integer"
 #         }
 #       },
 #       "required": ["countryCode"],
@@ -29,7 +41,8 @@ from utils.request import Get
 # }
 
 
-def get_hotel_list(countryCode: str, lastUpdateTime: str | None = None, language: str = "en-US") -> ToolResponse:
+async def get_hotel_list(countryCode: str, lastUpdateTime: str | None = None, language: str = "en-US",
+                         limit: int = HOTEL_LIST_DEFAULT_LIMIT) -> ToolResponse:
     """获取您在特定国家代码下被授权访问的酒店ID列表，返回JSON格式的数据。
 
     Args:
@@ -37,12 +50,24 @@ def get_hotel_list(countryCode: str, lastUpdateTime: str | None = None, language
         lastUpdateTime (str, optional): 精确到秒的Unix时间戳（不能小于1732982400，即2024-12-01）。
                                        如果提供此值，API将仅返回在此时间之后更改的酒店列表
         language (str): 响应的语言，默认为 en-US
+        limit (int): 最多返回的酒店ID数量，默认1000；总数仍会完整统计
     """
 
     print(f"查询国家代码 '{countryCode}' 的酒店列表")
     if lastUpdateTime:
         print(f"仅获取 {lastUpdateTime} 之后更新的酒店")
 
+    # 优先从本地酒店目录读取（需已同步且水位足够新，带 lastUpdateTime 时还需不早于最近一次全量同步）
+    # SQLite 读取放到线程中执行，不阻塞事件循环
+    if hotel_catalog is not None:
+        state = await asyncio.to_thread(hotel_catalog.get_fresh_state, countryCode)
+        since = int(lastUpdateTime) if lastUpdateTime and lastUpdateTime.isdigit() else None
+        if state is not None and (not lastUpdateTime or (since is not None and since >= state["full_synced_at"])):
+            total = await asyncio.to_thread(hotel_catalog.count_hotel_ids, countryCode, since)
+            hotel_ids = await asyncio.to_thread(hotel_catalog.list_hotel_ids, countryCode, since, limit)
+            print(f"酒店列表来自本地目录，水位: {state['high_water_mark']}")
+            return _render(countryCode, language, total, hotel_ids)
+
     # 构建请求参数
     params = {
         "countryCode": countryCode,
@@ -53,13 +78,35 @@ def get_hotel_list(countryCode: str, lastUpdateTime: str | None = None, language
     if lastUpdateTime:
         params["lastUpdateTime"] = lastUpdateTime
 
-    res = Get("content", '/api/v1/hotel/list', params=params)
+    # 流式解析 data 数组，只保留前 limit 个ID，其余仅计数
+    hotel_ids: list[Any] = []
+    total = 0
+    try:
+        async for hotel_id in GetStream("content", '/api/v1/hotel/list', params=params):
+            total += 1
+            if len(hotel_ids) < limit:
+                hotel_ids.append(hotel_id)
+    except Exception as e:
+        return ToolResponse(
+            content=[
+                TextBlock(
+                    type="text",
+                    text=f"国家代码 '{countryCode}' 的酒店列表获取失败（已解析 {total} 个ID）: {e}",
+                ),
+            ],
+        )
+
+    return _render(countryCode, language, total, hotel_ids)
+
 
+def _render(countryCode: str, language: str, total: int, hotel_ids: list[Any]) -> ToolResponse:
+    note = f"，仅显示前 {len(hotel_ids)} 个" if total > len(hotel_ids) else ""
     return ToolResponse(
         content=[
             TextBlock(
                 type="text",
-                text=f"国家代码 '{countryCode}', 语言 '{language}', 响应数据: {res}",
+                text=f"国家代码 '{countryCode}', 语言 '{language}', 共 {total} 个酒店ID{note}: "
+                     f"{json.dumps(hotel_ids, separators=(',', ':'))}",
             ),
         ],
     )
@@ -1,6 +1,7 @@
 from agentscope.message import TextBlock
 from agentscope.tool import ToolResponse
-from utils.request import Get
+from utils.reference_data import GetReference
+from utils.render import render_result
 
 # {
 #   "type": "function",
@@ -21,7 +22,7 @@ from utils.request import Get
 # }
 
 
-def get_window_types(language: str = "zh-CN") -> ToolResponse:
+async def get_window_types(language: str = "zh-CN") -> ToolResponse:
     """获取所有API接口中可能返回的窗户类型（窗型）名称及对应代码，返回JSON格式的数据。
 
     Args:
@@ -30,14 +31,13 @@ def get_window_types(language: str = "zh-CN") -> ToolResponse:
 
     print(f"查询窗户类型（窗型）数据字典，语言: '{language}'")
 
-    res = Get("content", '/api/v1/dictionary/window-types',
-              params={"language": language})
+    res = await GetReference('/api/v1/dictionary/window-types', language)
 
     return ToolResponse(
         content=[
             TextBlock(
                 type="text",
-                text=f"窗户类型（窗型）数据字典，语言: '{language}', 响应数据: {res}",
+                text=render_result("get_window_types", res, header=f"窗户类型（窗型）数据字典，语言: '{language}'"),
             ),
         ],
     )
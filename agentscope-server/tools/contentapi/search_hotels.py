@@ -0,0 +1,178 @@
+import asyncio
+import json
+import time
+
+from agentscope.message import TextBlock
+from agentscope.tool import ToolResponse
+from utils.hotel_catalog import hotel_catalog
+from utils.render import render_result
+
+# {
+#   "type": "function",
+#   "function": {
+#     "name": "search_hotels",
+#     "description": "在本地酒店目录中按名称/地址关键词、经纬度半径或矩形范围、星级、品牌检索酒店，毫秒级返回排序后的酒店ID及基本信息。",
+#     "parameters": {
+#       "properties": {
+#         "query": {
+#           "description": "酒店名称、地址或目的地关键词，多个词用空格分隔（如：Bund、外滩 希尔顿）",
+#           "type": "string"
+#         },
+#         "latitude": {
+#           "description": "中心点纬度，与longitude一起使用时按距离排序",
+#           "type": "number"
+#         },
+#         "longitude": {
+#           "description": "中心点经度",
+#           "type": "number"
+#         },
+#         "radiusKm": {
+#           "description": "以中心点为圆心的检索半径（公里），默认5",
+#           "type": "number"
+#         },
+#         "bbox": {
+#           "description": "矩形范围 [最小纬度, 最小经度, 最大纬度, 最大经度]",
+#           "type": "array",
+#           "items": {
+#             "type": "number"
+#           }
+#         },
+#         "minStarRating": {
+#           "description": "最低星级",
+#           "type": "number"
+#         },
+#         "maxStarRating": {
+#           "description": "最高星级",
+#           "type": "number"
+#         },
+#         "brand": {
+#           "description": "品牌或酒店类别名称（模糊匹配）",
+#           "type": "string"
+#         },
+#         "countryCode": {
+#           "description": "国家代码（如：CN、JP、US等）",
+#           "type": "string"
+#         },
+#         "destinationCode": {
+#           "description": "目的地代码，可通过get_destinations获取",
+#           "type": "string"
+#         },
+#         "language": {
+#           "description": "酒店信息的语言，需为目录已同步的语言，如：en-US、zh-CN",
+#           "type": "string"
+#         },
+#         "limit": {
+#           "description": "最多返回的酒店数量，默认20",
+#           "type": "integer"
+#         }
+#       },
+#       "type": "object"
+#     }
+#   }
+# }
+
+
+async def search_hotels(
+    query: str | None = None,
+    latitude: float | None = None,
+    longitude: float | None = None,
+    radiusKm: float | None = None,
+    bbox: list[float] | None = None,
+    minStarRating: float | None = None,
+    maxStarRating: float | None = None,
+    brand: str | None = None,
+    countryCode: str | None = None,
+    destinationCode: str | None = None,
+    language: str = "en-US",
+    limit: int = 20,
+) -> ToolResponse:
+    """在本地酒店目录中按名称/地址关键词、经纬度半径或矩形范围、星级、品牌检索酒店，毫秒级返回排序后的酒店ID及基本信息。
+
+    结果可直接作为 get_lowest_price 的 hotel_ids 查询价格，或作为 get_hotel_details 的 hotelIds 查询详情。
+
+    Args:
+        query (str, optional): 酒店名称、地址或目的地关键词，多个词用空格分隔（如：Bund、外滩 希尔顿）
+        latitude (float, optional): 中心点纬度，与longitude一起使用时按距离排序
+        longitude (float, optional): 中心点经度
+        radiusKm (float, optional): 以中心点为圆心的检索半径（公里），默认5
+        bbox (list[float], optional): 矩形范围 [最小纬度, 最小经度, 最大纬度, 最大经度]
+        minStarRating (float, optional): 最低星级
+        maxStarRating (float, optional): 最高星级
+        brand (str, optional): 品牌或酒店类别名称（模糊匹配）
+        countryCode (str, optional): 国家代码（如：CN、JP、US等）
+        destinationCode (str, optional): 目的地代码，可通过get_destinations获取
+        language (str): 酒店信息的语言，需为目录已同步的语言，默认为 en-US
+        limit (int): 最多返回的酒店数量，默认20
+    """
+
+    print(f"检索酒店 - 关键词: {query}, 中心点: {latitude},{longitude}, 半径: {radiusKm}, 范围: {bbox}")
+
+    if hotel_catalog is None:
+        return ToolResponse(
+            content=[
+                TextBlock(
+                    type="text",
+                    text="本地酒店目录未启用（未配置 HOTEL_CATALOG_PATH），请改用 get_hotel_list 和 get_hotel_details 查询",
+                ),
+            ],
+        )
+
+    if (latitude is None) != (longitude is None):
+        return ToolResponse(
+            content=[
+                TextBlock(
+                    type="text",
+                    text="错误: latitude 和 longitude 需要同时提供",
+                ),
+            ],
+        )
+
+    if bbox is not None and len(bbox) != 4:
+        return ToolResponse(
+            content=[
+                TextBlock(
+                    type="text",
+                    text="错误: bbox 需要4个数值 [最小纬度, 最小经度, 最大纬度, 最大经度]",
+                ),
+            ],
+        )
+
+    started = time.perf_counter()
+    hotels = await asyncio.to_thread(
+        hotel_catalog.search,
+        language,
+        query=query,
+        latitude=latitude,
+        longitude=longitude,
+        radius_km=radiusKm,
+        bbox=tuple(bbox) if bbox is not None else None,
+        min_star=minStarRating,
+        max_star=maxStarRating,
+        brand=brand,
+        country_code=countryCode,
+        destination_code=destinationCode,
+        limit=limit,
+    )
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    print(f"酒店检索完成，命中 {len(hotels)} 家，耗时 {elapsed_ms:.1f}ms")
+
+    if not hotels:
+        return ToolResponse(
+            content=[
+                TextBlock(
+                    type="text",
+                    text="本地酒店目录中未找到符合条件的酒店，可放宽条件或改用 get_hotel_list 查询",
+                ),
+            ],
+        )
+
+    hotel_ids = [hotel["id"] for hotel in hotels]
+    return ToolResponse(
+        content=[
+            TextBlock(
+                type="text",
+                text=render_result("search_hotels", hotels,
+                                   header=f"找到 {len(hotels)} 家酒店（已排序），酒店ID: {json.dumps(hotel_ids)}"),
+            ),
+        ],
+    )
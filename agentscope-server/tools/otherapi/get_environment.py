@@ -2,12 +2,12 @@ import os
 import sys
 import platform
 import psutil
-import json
 from datetime import datetime, timezone
 from typing import Any
 
 from agentscope.message import TextBlock
 from agentscope.tool import ToolResponse
+from utils.render import render_result
 
 # {
 #   "type": "function",
@@ -78,7 +78,7 @@ def get_environment(
             content=[
                 TextBlock(
                     type="text",
-                    text=f"系统环境信息收集完成:\n{json.dumps(env_info, ensure_ascii=False, indent=2)}",
+                    text=render_result("get_environment", env_info, header="系统环境信息收集完成:"),
                 ),
             ],
         )
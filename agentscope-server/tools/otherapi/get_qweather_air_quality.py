@@ -1,9 +1,40 @@
+from typing import Any
 from agentscope.message import TextBlock
 from agentscope.tool import ToolResponse
-from utils.request import GetQWeather
+from utils.qweather_cache import GetQWeatherCached
+from utils.render import render_result
 
 
-def get_qweather_air_quality(location_id: str, lang: str = "zh") -> ToolResponse:
+async def fetch_air_quality(location_id: str, lang: str = "zh") -> dict[str, Any] | None:
+    """获取实时空气质量并提取常用字段，失败时返回 None"""
+    params = {
+        'location': location_id,
+        'lang': lang
+    }
+
+    data = await GetQWeatherCached('/v7/air/now', params)
+
+    if not (data and data.get('now')):
+        return None
+
+    air_data = data['now']
+    air_info = {
+        'pubTime': air_data.get('pubTime', ''),     # 空气质量数据发布时间
+        'aqi': air_data.get('aqi', ''),             # 空气质量指数
+        'level': air_data.get('level', ''),         # 空气质量指数等级
+        'category': air_data.get('category', ''),   # 空气质量指数级别
+        'primary': air_data.get('primary', ''),     # 空气质量的主要污染物
+        'pm10': air_data.get('pm10', ''),           # PM10
+        'pm2p5': air_data.get('pm2p5', ''),         # PM2.5
+        'no2': air_data.get('no2', ''),             # 二氧化氮
+        'so2': air_data.get('so2', ''),             # 二氧化硫
+        'co': air_data.get('co', ''),               # 一氧化碳
+        'o3': air_data.get('o3', '')                # 臭氧
+    }
+    return air_info
+
+
+async def get_qweather_air_quality(location_id: str, lang: str = "zh") -> ToolResponse:
     """获取指定城市的和风天气实时空气质量数据。
 
     Args:
@@ -13,34 +44,14 @@ def get_qweather_air_quality(location_id: str, lang: str = "zh") -> ToolResponse
 
     print(f"获取实时空气质量: 城市ID '{location_id}', 语言: '{lang}'")
 
-    params = {
-        'location': location_id,
-        'lang': lang
-    }
+    air_info = await fetch_air_quality(location_id, lang)
 
-    data = GetQWeather('/v7/air/now', params)
-    
-    if data and data.get('now'):
-        air_data = data['now']
-        air_info = {
-            'pubTime': air_data.get('pubTime', ''),     # 空气质量数据发布时间
-            'aqi': air_data.get('aqi', ''),             # 空气质量指数
-            'level': air_data.get('level', ''),         # 空气质量指数等级
-            'category': air_data.get('category', ''),   # 空气质量指数级别
-            'primary': air_data.get('primary', ''),     # 空气质量的主要污染物
-            'pm10': air_data.get('pm10', ''),           # PM10
-            'pm2p5': air_data.get('pm2p5', ''),         # PM2.5
-            'no2': air_data.get('no2', ''),             # 二氧化氮
-            'so2': air_data.get('so2', ''),             # 二氧化硫
-            'co': air_data.get('co', ''),               # 一氧化碳
-            'o3': air_data.get('o3', '')                # 臭氧
-        }
-        
+    if air_info is not None:
         return ToolResponse(
             content=[
                 TextBlock(
                     type="text",
-                    text=f"城市ID '{location_id}' 的实时空气质量数据: {air_info}",
+                    text=render_result("get_qweather_air_quality", air_info, header=f"城市ID '{location_id}' 的实时空气质量数据"),
                 ),
             ],
         )
@@ -55,7 +66,7 @@ def get_qweather_air_quality(location_id: str, lang: str = "zh") -> ToolResponse
         )
 
 
-def get_qweather_air_forecast(location_id: str, days: int = 5, lang: str = "zh") -> ToolResponse:
+async def get_qweather_air_forecast(location_id: str, days: int = 5, lang: str = "zh") -> ToolResponse:
     """获取指定城市的和风天气空气质量预报数据。
 
     Args:
@@ -71,7 +82,7 @@ def get_qweather_air_forecast(location_id: str, days: int = 5, lang: str = "zh")
         'lang': lang
     }
 
-    data = GetQWeather('/v7/air/5d', params)
+    data = await GetQWeatherCached('/v7/air/5d', params)
     
     if data and data.get('daily'):
         daily_data = data['daily'][:days]  # 限制返回天数
@@ -90,7 +101,7 @@ def get_qweather_air_forecast(location_id: str, days: int = 5, lang: str = "zh")
             content=[
                 TextBlock(
                     type="text",
-                    text=f"城市ID '{location_id}' 的{days}日空气质量预报: {forecast_info}",
+                    text=render_result("get_qweather_air_forecast", forecast_info, header=f"城市ID '{location_id}' 的{days}日空气质量预报"),
                 ),
             ],
         )
@@ -1,9 +1,10 @@
 from agentscope.message import TextBlock
 from agentscope.tool import ToolResponse
-from utils.request import GetQWeather
+from utils.qweather_cache import GetQWeatherCached
+from utils.render import render_result
 
 
-def get_qweather_sun_moon(location_id: str, date: str = "", lang: str = "zh") -> ToolResponse:
+async def get_qweather_sun_moon(location_id: str, date: str = "", lang: str = "zh") -> ToolResponse:
     """获取指定城市的和风天气日出日落、月升月落时间。
 
     Args:
@@ -22,7 +23,7 @@ def get_qweather_sun_moon(location_id: str, date: str = "", lang: str = "zh") ->
     if date:
         params['date'] = date
 
-    data = GetQWeather('/v7/astronomy/sun', params)
+    data = await GetQWeatherCached('/v7/astronomy/sun', params)
     
     if data:
         sun_data = data
@@ -42,7 +43,7 @@ def get_qweather_sun_moon(location_id: str, date: str = "", lang: str = "zh") ->
             content=[
                 TextBlock(
                     type="text",
-                    text=f"城市ID '{location_id}' 的天文数据: {astronomy_info}",
+                    text=render_result("get_qweather_sun_moon", astronomy_info, header=f"城市ID '{location_id}' 的天文数据"),
                 ),
             ],
         )
@@ -57,7 +58,7 @@ def get_qweather_sun_moon(location_id: str, date: str = "", lang: str = "zh") ->
         )
 
 
-def get_qweather_moon_phase(location_id: str, lang: str = "zh") -> ToolResponse:
+async def get_qweather_moon_phase(location_id: str, lang: str = "zh") -> ToolResponse:
     """获取指定城市的和风天气月相数据。
 
     Args:
@@ -72,7 +73,7 @@ def get_qweather_moon_phase(location_id: str, lang: str = "zh") -> ToolResponse:
         'lang': lang
     }
 
-    data = GetQWeather('/v7/astronomy/moon', params)
+    data = await GetQWeatherCached('/v7/astronomy/moon', params)
     
     if data:
         moon_data = data
@@ -85,7 +86,7 @@ def get_qweather_moon_phase(location_id: str, lang: str = "zh") -> ToolResponse:
             content=[
                 TextBlock(
                     type="text",
-                    text=f"城市ID '{location_id}' 的月相数据: {moon_info}",
+                    text=render_result("get_qweather_moon_phase", moon_info, header=f"城市ID '{location_id}' 的月相数据"),
                 ),
             ],
         )
@@ -0,0 +1,179 @@
+import asyncio
+import os
+import re
+import time
+
+from typing import Any, Awaitable
+from dotenv import load_dotenv
+from agentscope.message import TextBlock
+from agentscope.tool import ToolResponse
+from utils.render import render_result, TOOL_TOKEN_BUDGET, TOOL_TOKEN_BUDGETS
+from tools.otherapi.search_qweather_city_code import lookup_city
+from tools.otherapi.get_qweather_forecast import fetch_weather_now
+from tools.otherapi.get_qweather_daily_forecast import fetch_daily_forecast
+from tools.otherapi.get_qweather_hourly_forecast import fetch_hourly_forecast
+from tools.otherapi.get_qweather_air_quality import fetch_air_quality
+from tools.otherapi.get_qweather_warning import fetch_warnings
+from tools.otherapi.get_qweather_indices import fetch_indices
+from tools.otherapi.get_qweather_minutely import fetch_minutely
+
+
+load_dotenv('.env')
+
+# 单次调用最多查询的城市数，以及同时进行中的和风天气请求数
+QWEATHER_BUNDLE_MAX_CITIES = int(os.environ.get("QWEATHER_BUNDLE_MAX_CITIES", "10"))
+QWEATHER_BUNDLE_CONCURRENCY = int(os.environ.get("QWEATHER_BUNDLE_CONCURRENCY", "16"))
+
+BUNDLE_FACETS = ("now", "daily", "hourly", "air", "warning", "indices", "minutely")
+DEFAULT_BUNDLE_FACETS = ("daily", "hourly", "air", "warning", "indices")
+
+# 和风天气LocationID（如101010100）或 "经度,纬度" 坐标，直接使用而不再查询城市
+_LOCATION_ID = re.compile(r"^\d+$|^-?\d+(\.\d+)?,-?\d+(\.\d+)?$")
+
+
+def _facet_call(facet: str, location_id: str, days: int, hours: int, lang: str) -> Awaitable[Any]:
+    if facet == "now":
+        return fetch_weather_now(location_id, lang)
+    if facet == "daily":
+        return fetch_daily_forecast(location_id, days, lang)
+    if facet == "hourly":
+        return fetch_hourly_forecast(location_id, hours, lang)
+    if facet == "air":
+        return fetch_air_quality(location_id, lang)
+    if facet == "warning":
+        return fetch_warnings(location_id, lang)
+    if facet == "indices":
+        return fetch_indices(location_id, "0", 1)
+    return fetch_minutely(location_id, lang)
+
+
+def _prune(value: Any) -> Any:
+    """去掉空字符串字段，合并结果中只保留有值的信息"""
+    if isinstance(value, dict):
+        return {key: _prune(item) for key, item in value.items() if item not in ('', None)}
+    if isinstance(value, list):
+        return [_prune(item) for item in value]
+    return value
+
+
+async def _resolve(location: str, lang: str) -> dict[str, Any] | None:
+    if _LOCATION_ID.match(location):
+        return {'id': location, 'name': location}
+    return await lookup_city(location, lang)
+
+
+async def get_qweather_bundle(
+    locations: list[str],
+    facets: list[str] | None = None,
+    days: int = 3,
+    hours: int = 24,
+    lang: str = "zh",
+) -> ToolResponse:
+    """一次性并发查询多个城市的多项天气信息（实时、逐天、逐小时、空气质量、预警、生活指数、分钟级降水），合并为一个紧凑结果。
+
+    适用于行程规划等需要同时了解多个城市天气的场景，替代逐个调用 search_qweather_city_code 与各项天气工具。
+
+    Args:
+        locations (list[str]): 城市名称或和风天气城市ID（也可以是"经度,纬度"），例如：["北京", "101020100", "Tokyo"]
+        facets (list[str], optional): 需要的天气信息，可选 now、daily、hourly、air、warning、indices、minutely，默认 daily、hourly、air、warning、indices
+        days (int): 逐天预报天数，可选3、7、10、15、30，默认为3
+        hours (int): 逐小时预报小时数，可选24、72、168，默认为24
+        lang (str): 多语言设置，默认中文(zh)
+    """
+
+    facets = list(dict.fromkeys(facets or DEFAULT_BUNDLE_FACETS))
+    locations = list(dict.fromkeys(location.strip() for location in locations if location.strip()))
+    print(f"批量获取天气: 城市 {locations}, 信息 {facets}, 语言: '{lang}'")
+
+    unknown = [facet for facet in facets if facet not in BUNDLE_FACETS]
+    if unknown:
+        return ToolResponse(
+            content=[
+                TextBlock(
+                    type="text",
+                    text=f"错误: 不支持的天气信息 {unknown}，可选 {list(BUNDLE_FACETS)}",
+                ),
+            ],
+        )
+
+    if not locations:
+        return ToolResponse(
+            content=[
+                TextBlock(
+                    type="text",
+                    text="错误: 请至少提供一个城市名称或城市ID",
+                ),
+            ],
+        )
+
+    if len(locations) > QWEATHER_BUNDLE_MAX_CITIES:
+        return ToolResponse(
+            content=[
+                TextBlock(
+                    type="text",
+                    text=f"错误: 单次最多查询 {QWEATHER_BUNDLE_MAX_CITIES} 个城市，请分批查询",
+                ),
+            ],
+        )
+
+    started = time.perf_counter()
+    semaphore = asyncio.Semaphore(QWEATHER_BUNDLE_CONCURRENCY)
+
+    async def limited(call: Awaitable[Any]) -> Any:
+        async with semaphore:
+            return await call
+
+    cities = await asyncio.gather(*(limited(_resolve(location, lang)) for location in locations))
+    not_found = [location for location, city in zip(locations, cities) if city is None]
+
+    # 名称和ID指向同一城市时只查询一次，保留信息更完整的城市记录
+    bundles: dict[str, dict[str, Any]] = {}
+    for city in cities:
+        if city is not None and len(city) > len(bundles.get(city['id'], {})):
+            bundles[city['id']] = _prune(city)
+
+    # 所有城市的所有天气信息一起并发请求，共享连接池，相同请求自动合并
+    jobs = [(location_id, facet) for location_id in bundles for facet in facets]
+    results = await asyncio.gather(
+        *(limited(_facet_call(facet, location_id, days, hours, lang)) for location_id, facet in jobs))
+
+    for (location_id, facet), result in zip(jobs, results):
+        if result is None:
+            bundles[location_id].setdefault('failed', []).append(facet)
+        else:
+            bundles[location_id][facet] = _prune(result)
+
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    print(f"批量天气查询完成: {len(bundles)} 个城市, {len(jobs)} 个请求, 耗时 {elapsed_ms:.1f}ms")
+
+    if not bundles:
+        return ToolResponse(
+            content=[
+                TextBlock(
+                    type="text",
+                    text=f"未找到城市: {not_found}，请检查城市名称是否正确",
+                ),
+            ],
+        )
+
+    # token预算在城市之间平均分配
+    budget = TOOL_TOKEN_BUDGETS.get("get_qweather_bundle", TOOL_TOKEN_BUDGET)
+    city_budget = max(budget // len(bundles), 300)
+    sections = []
+    for location_id, bundle in bundles.items():
+        failed = bundle.pop('failed', None)
+        header = f"## {bundle.get('name', location_id)} (城市ID {location_id})"
+        if failed:
+            header += f"，获取失败: {failed}"
+        sections.append(render_result("get_qweather_bundle", bundle, header=header, budget=city_budget))
+    if not_found:
+        sections.append(f"未找到城市: {not_found}")
+
+    return ToolResponse(
+        content=[
+            TextBlock(
+                type="text",
+                text="\n\n".join(sections),
+            ),
+        ],
+    )
@@ -1,9 +1,10 @@
 from agentscope.message import TextBlock
 from agentscope.tool import ToolResponse
-from utils.request import GetQWeather
+from utils.qweather_cache import GetQWeatherCached
+from utils.render import render_result
 
 
-def get_qweather_historical_weather(location_id: str, date: str, lang: str = "zh") -> ToolResponse:
+async def get_qweather_historical_weather(location_id: str, date: str, lang: str = "zh") -> ToolResponse:
     """获取指定城市的和风天气历史天气数据（最近10天）。
 
     Args:
@@ -20,7 +21,7 @@ def get_qweather_historical_weather(location_id: str, date: str, lang: str = "zh
         'lang': lang
     }
 
-    data = GetQWeather('/v7/historical/weather', params)
+    data = await GetQWeatherCached('/v7/historical/weather', params)
     
     if data and data.get('weatherHourly'):
         hourly_data = data['weatherHourly']
@@ -46,7 +47,7 @@ def get_qweather_historical_weather(location_id: str, date: str, lang: str = "zh
             content=[
                 TextBlock(
                     type="text",
-                    text=f"城市ID '{location_id}' 在 {date} 的历史天气数据: {historical_info}",
+                    text=render_result("get_qweather_historical_weather", historical_info, header=f"城市ID '{location_id}' 在 {date} 的历史天气数据"),
                 ),
             ],
         )
@@ -61,7 +62,7 @@ def get_qweather_historical_weather(location_id: str, date: str, lang: str = "zh
         )
 
 
-def get_qweather_historical_air(location_id: str, date: str, lang: str = "zh") -> ToolResponse:
+async def get_qweather_historical_air(location_id: str, date: str, lang: str = "zh") -> ToolResponse:
     """获取指定城市的和风天气历史空气质量数据（最近10天）。
 
     Args:
@@ -78,7 +79,7 @@ def get_qweather_historical_air(location_id: str, date: str, lang: str = "zh") -
         'lang': lang
     }
 
-    data = GetQWeather('/v7/historical/air', params)
+    data = await GetQWeatherCached('/v7/historical/air', params)
     
     if data and data.get('airHourly'):
         hourly_data = data['airHourly']
@@ -103,7 +104,7 @@ def get_qweather_historical_air(location_id: str, date: str, lang: str = "zh") -
             content=[
                 TextBlock(
                     type="text",
-                    text=f"城市ID '{location_id}' 在 {date} 的历史空气质量数据: {historical_info}",
+                    text=render_result("get_qweather_historical_air", historical_info, header=f"城市ID '{location_id}' 在 {date} 的历史空气质量数据"),
                 ),
             ],
         )
@@ -1,9 +1,40 @@
+from typing import Any
 from agentscope.message import TextBlock
 from agentscope.tool import ToolResponse
-from utils.request import GetQWeather
+from utils.qweather_cache import GetQWeatherCached
+from utils.render import render_result
 
 
-def get_qweather_minutely(location_id: str, lang: str = "zh") -> ToolResponse:
+async def fetch_minutely(location_id: str, lang: str = "zh") -> dict[str, Any] | None:
+    """获取分钟级降水预报，失败时返回 None"""
+    params = {
+        'location': location_id,
+        'lang': lang
+    }
+
+    data = await GetQWeatherCached('/v7/minutely/5m', params)
+
+    if not data:
+        return None
+
+    minutely_data = data.get('minutely', [])
+    summary = data.get('summary', '')
+    
+    minutely_info = {
+        'summary': summary,  # 分钟降水描述
+        'minutely': []
+    }
+    
+    for minute in minutely_data:
+        minutely_info['minutely'].append({
+            'fxTime': minute.get('fxTime', ''),     # 预报时间
+            'precip': minute.get('precip', ''),     # 5分钟累计降水量
+            'type': minute.get('type', '')          # 降水类型
+        })
+    return minutely_info
+
+
+async def get_qweather_minutely(location_id: str, lang: str = "zh") -> ToolResponse:
     """获取指定城市的和风天气分钟级降水预报（仅支持中国地区）。
 
     Args:
@@ -13,34 +44,14 @@ def get_qweather_minutely(location_id: str, lang: str = "zh") -> ToolResponse:
 
     print(f"获取分钟级降水预报: 城市ID '{location_id}', 语言: '{lang}'")
 
-    params = {
-        'location': location_id,
-        'lang': lang
-    }
+    minutely_info = await fetch_minutely(location_id, lang)
 
-    data = GetQWeather('/v7/minutely/5m', params)
-    
-    if data:
-        minutely_data = data.get('minutely', [])
-        summary = data.get('summary', '')
-        
-        minutely_info = {
-            'summary': summary,  # 分钟降水描述
-            'minutely': []
-        }
-        
-        for minute in minutely_data:
-            minutely_info['minutely'].append({
-                'fxTime': minute.get('fxTime', ''),     # 预报时间
-                'precip': minute.get('precip', ''),     # 5分钟累计降水量
-                'type': minute.get('type', '')          # 降水类型
-            })
-        
+    if minutely_info is not None:
         return ToolResponse(
             content=[
                 TextBlock(
                     type="text",
-                    text=f"城市ID '{location_id}' 的分钟级降水预报: {minutely_info}",
+                    text=render_result("get_qweather_minutely", minutely_info, header=f"城市ID '{location_id}' 的分钟级降水预报"),
                 ),
             ],
         )
@@ -1,9 +1,46 @@
+from typing import Any
 from agentscope.message import TextBlock
 from agentscope.tool import ToolResponse
-from utils.request import GetQWeather
+from utils.qweather_cache import GetQWeatherCached
+from utils.render import render_result
 
 
-def get_qweather_warning(location_id: str, lang: str = "zh") -> ToolResponse:
+async def fetch_warnings(location_id: str, lang: str = "zh") -> list[dict[str, Any]] | None:
+    """获取当前生效的天气预警，无预警时返回空列表，失败时返回 None"""
+    params = {
+        'location': location_id,
+        'lang': lang
+    }
+
+    data = await GetQWeatherCached('/v7/warning/now', params)
+
+    if not data:
+        return None
+
+    warning_info = []
+    for warning in data.get('warning', []):
+        warning_info.append({
+            'id': warning.get('id', ''),           # 预警ID
+            'sender': warning.get('sender', ''),   # 预警发布单位
+            'pubTime': warning.get('pubTime', ''), # 预警发布时间
+            'title': warning.get('title', ''),     # 预警信息标题
+            'startTime': warning.get('startTime', ''), # 预警开始时间
+            'endTime': warning.get('endTime', ''), # 预警结束时间
+            'status': warning.get('status', ''),   # 预警状态
+            'level': warning.get('level', ''),     # 预警等级
+            'severity': warning.get('severity', ''), # 预警严重程度
+            'severityColor': warning.get('severityColor', ''), # 预警颜色
+            'type': warning.get('type', ''),       # 预警类型ID
+            'typeName': warning.get('typeName', ''), # 预警类型名称
+            'urgency': warning.get('urgency', ''), # 紧急程度
+            'certainty': warning.get('certainty', ''), # 确定性
+            'text': warning.get('text', ''),       # 预警详细文字描述
+            'related': warning.get('related', '')  # 与该预警相关的预警ID
+        })
+    return warning_info
+
+
+async def get_qweather_warning(location_id: str, lang: str = "zh") -> ToolResponse:
     """获取指定城市的和风天气灾害预警信息。
 
     Args:
@@ -13,43 +50,15 @@ def get_qweather_warning(location_id: str, lang: str = "zh") -> ToolResponse:
 
     print(f"获取天气预警信息: 城市ID '{location_id}', 语言: '{lang}'")
 
-    params = {
-        'location': location_id,
-        'lang': lang
-    }
+    warning_info = await fetch_warnings(location_id, lang)
 
-    data = GetQWeather('/v7/warning/now', params)
-    
-    if data:
-        warning_data = data.get('warning', [])
-        
-        if warning_data:
-            warning_info = []
-            for warning in warning_data:
-                warning_info.append({
-                    'id': warning.get('id', ''),           # 预警ID
-                    'sender': warning.get('sender', ''),   # 预警发布单位
-                    'pubTime': warning.get('pubTime', ''), # 预警发布时间
-                    'title': warning.get('title', ''),     # 预警信息标题
-                    'startTime': warning.get('startTime', ''), # 预警开始时间
-                    'endTime': warning.get('endTime', ''), # 预警结束时间
-                    'status': warning.get('status', ''),   # 预警状态
-                    'level': warning.get('level', ''),     # 预警等级
-                    'severity': warning.get('severity', ''), # 预警严重程度
-                    'severityColor': warning.get('severityColor', ''), # 预警颜色
-                    'type': warning.get('type', ''),       # 预警类型ID
-                    'typeName': warning.get('typeName', ''), # 预警类型名称
-                    'urgency': warning.get('urgency', ''), # 紧急程度
-                    'certainty': warning.get('certainty', ''), # 确定性
-                    'text': warning.get('text', ''),       # 预警详细文字描述
-                    'related': warning.get('related', '')  # 与该预警相关的预警ID
-                })
-            
+    if warning_info is not None:
+        if warning_info:
             return ToolResponse(
                 content=[
                     TextBlock(
                         type="text",
-                        text=f"城市ID '{location_id}' 的天气预警信息: {warning_info}",
+                        text=render_result("get_qweather_warning", warning_info, header=f"城市ID '{location_id}' 的天气预警信息"),
                     ),
                 ],
             )
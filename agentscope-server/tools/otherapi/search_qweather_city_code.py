@@ -1,9 +1,50 @@
+from typing import Any
 from agentscope.message import TextBlock
 from agentscope.tool import ToolResponse
 from utils.request import GetQWeather
+from utils.render import render_result
+from utils.cache import MISSING
+from utils.geocode import get_cached_city, remember_city
 
 
-def search_qweather_city_code(location_name: str, lang: str = "zh") -> ToolResponse:
+async def lookup_city(location_name: str, lang: str = "zh") -> dict[str, Any] | None:
+    """查询城市名称对应的和风天气城市信息（取第一个匹配结果），未找到或失败时返回 None
+
+    先查本地城市编码缓存（名称规范化、中英文别名、查无此城市的负缓存），未命中才请求上游。
+    """
+    cached = await get_cached_city(location_name)
+    if cached is not MISSING:
+        return cached
+
+    params = {
+        'location': location_name,
+    }
+
+    # '404' 表示上游确认查无此城市，可以负缓存；其他失败不写缓存
+    data = await GetQWeather('/geo/v2/city/lookup', params, ok_codes=('200', '404'))
+
+    if data is None:
+        return None
+
+    if not data.get('location'):
+        remember_city(location_name, None)
+        return None
+
+    city_info = data['location'][0]
+    city = {
+        'id': city_info['id'],
+        'name': city_info['name'],
+        'country': city_info.get('country', ''),
+        'adm1': city_info.get('adm1', ''),
+        'adm2': city_info.get('adm2', ''),
+        'lat': city_info.get('lat', ''),
+        'lon': city_info.get('lon', '')
+    }
+    remember_city(location_name, city)
+    return city
+
+
+async def search_qweather_city_code(location_name: str, lang: str = "zh") -> ToolResponse:
     """搜索和风天气城市编码，用于后续天气查询。
 
     Args:
@@ -13,29 +54,14 @@ def search_qweather_city_code(location_name: str, lang: str = "zh") -> ToolRespo
 
     print(f"搜索城市编码: '{location_name}', 语言: '{lang}'")
 
-    params = {
-        'location': location_name,
-    }
+    city_data = await lookup_city(location_name, lang)
 
-    data = GetQWeather('/geo/v2/city/lookup', params)
-    
-    if data and data.get('location'):
-        city_info = data['location'][0]
-        city_data = {
-            'id': city_info['id'],
-            'name': city_info['name'],
-            'country': city_info.get('country', ''),
-            'adm1': city_info.get('adm1', ''),
-            'adm2': city_info.get('adm2', ''),
-            'lat': city_info.get('lat', ''),
-            'lon': city_info.get('lon', '')
-        }
-        
+    if city_data is not None:
         return ToolResponse(
             content=[
                 TextBlock(
                     type="text",
-                    text=f"城市搜索成功: {location_name}, 城市信息: {city_data}",
+                    text=render_result("search_qweather_city_code", city_data, header=f"城市搜索成功: {location_name}, 城市信息"),
                 ),
             ],
         )
@@ -0,0 +1,35 @@
+import asyncio
+
+from typing import Any, Awaitable, Callable, Sequence, TypeVar
+
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+def chunked(items: Sequence[T], size: int) -> list[list[T]]:
+    """按 size 切分列表"""
+    return [list(items[i:i + size]) for i in range(0, len(items), size)]
+
+
+async def gather_chunks(
+    items: Sequence[T],
+    size: int,
+    fetch: Callable[[list[T]], Awaitable[R]],
+    concurrency: int = 4,
+) -> list[R]:
+    """将 items 切分为大小为 size 的批次，在并发上限内执行 fetch，按批次顺序返回结果
+
+    Args:
+        items (Sequence): 待处理元素
+        size (int): 每批最大元素数（例如DIDA接口的50个ID上限）
+        fetch (Callable): 处理单个批次的协程函数
+        concurrency (int): 同时进行的批次数上限
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def _run(chunk: list[T]) -> Any:
+        async with semaphore:
+            return await fetch(chunk)
+
+    return await asyncio.gather(*(_run(chunk) for chunk in chunked(items, size)))
@@ -0,0 +1,347 @@
+import asyncio
+import hashlib
+import json
+import os
+import time
+import uuid
+
+from typing import Any
+from dotenv import load_dotenv
+from utils.cache import TTLCache, MISSING
+from utils.metrics import metrics
+from utils.request import Post, ClientID, LicenseKey
+from utils.singleflight import SingleFlight
+
+
+load_dotenv('.env')
+
+# 订单参考号（ReferenceNo）有效期按最短的10分钟计算，到期前 BOOKING_REFRESH_MARGIN 秒自动重新确认价格
+BOOKING_REFERENCE_TTL = float(os.environ.get("BOOKING_REFERENCE_TTL", "600"))
+BOOKING_REFRESH_MARGIN = float(os.environ.get("BOOKING_REFRESH_MARGIN", "120"))
+# 报价最长保留时间，超过后停止自动续期并丢弃
+BOOKING_QUOTE_MAX_HOLD = float(os.environ.get("BOOKING_QUOTE_MAX_HOLD", "1800"))
+# 已完成预订的结果按 client_reference 与联系人保留，重复提交直接返回原结果
+BOOKING_RESULT_TTL = float(os.environ.get("BOOKING_RESULT_TTL", str(24 * 3600)))
+
+
+def guest_list_body(guest_list: list[dict[str, Any]], with_gender: bool = False) -> list[dict[str, Any]]:
+    """把工具参数中的住客列表转换为DIDA接口格式"""
+    rooms = []
+    for room_info in guest_list:
+        room_data = {
+            "RoomNum": room_info.get("room_num", 1),
+            "GuestInfo": []
+        }
+        for guest in room_info.get("guest_info", []):
+            guest_data = {
+                "Name": {
+                    "First": guest.get("name", {}).get("first", ""),
+                    "Last": guest.get("name", {}).get("last", "")
+                },
+                "IsAdult": guest.get("is_adult", True)
+            }
+            # 如果是儿童，添加年龄
+            if not guest.get("is_adult", True) and "age" in guest:
+                guest_data["Age"] = guest["age"]
+            if with_gender and "gender" in guest:
+                guest_data["Gender"] = guest["gender"]
+            room_data["GuestInfo"].append(guest_data)
+        rooms.append(room_data)
+    return rooms
+
+
+class BookingQuote:
+    """一次价格确认得到的报价，持有 ReferenceNo 及其到期时间"""
+
+    def __init__(self, request: dict[str, Any], guest_list: list[dict[str, Any]]):
+        # 报价ID与默认客户订单号每次 prepare 随机生成，不同会话预订相同的房型日期不会共用
+        self.quote_id = uuid.uuid4().hex[:16]
+        self.client_reference = f"AS{uuid.uuid4().hex[:16]}"
+        self.request = request
+        self.guest_list = guest_list
+        self.created_at = time.time()
+        self.reference_no = ""
+        self.hotel_name = ""
+        self.total_price: Any = None
+        self.currency = request.get("Currency", "")
+        # 首次确认的价格，即用户看到的价格；续期后价格变化时需要用户确认
+        self.quoted_price: Any = None
+        self.confirmed_at = 0.0
+        self.expires_at = 0.0
+        self.refreshes = 0
+        self.error: str | None = None
+        self.lock = asyncio.Lock()
+
+    def remaining(self) -> float:
+        return self.expires_at - time.time()
+
+    def summary(self) -> dict[str, Any]:
+        return {
+            "quote_id": self.quote_id,
+            "reference_no": self.reference_no,
+            "hotel_name": self.hotel_name,
+            "hotel_id": self.request.get("HotelID"),
+            "check_in_date": self.request.get("CheckInDate"),
+            "check_out_date": self.request.get("CheckOutDate"),
+            "num_of_rooms": self.request.get("NumOfRooms"),
+            "total_price": self.total_price,
+            "quoted_price": self.quoted_price,
+            "currency": self.currency,
+            "expires_in": max(int(self.remaining()), 0),
+            "refreshes": self.refreshes,
+        }
+
+
+class BookingFlow:
+    """预订流程引擎：价格确认 → 持有并自动续期 ReferenceNo → 创建订单
+
+    - prepare 在用户选定价格计划后立即确认价格，并在后台按 ReferenceNo 有效期自动续期，
+      LLM 推理与收集联系人信息期间参考号不会过期
+    - complete 使用持有的参考号下单；参考号即将过期时先同步续期，续期后价格变化则要求用户确认
+    - 同一 client_reference 与联系人的并发提交只下单一次，完成后的重复提交直接返回原结果
+    """
+
+    def __init__(self):
+        self._quotes: dict[str, BookingQuote] = {}
+        self._timers: dict[str, asyncio.Task] = {}
+        self._results = TTLCache(name="booking_results", maxsize=10000, ttl=BOOKING_RESULT_TTL)
+        # 报价ID -> 默认客户订单号，下单后报价已释放时重复提交仍能找到原结果
+        self._references = TTLCache(name="booking_references", maxsize=10000, ttl=BOOKING_RESULT_TTL)
+        self._inflight = SingleFlight("booking")
+
+    @staticmethod
+    def result_key(client_reference: str, contact: dict[str, Any]) -> str:
+        """已完成预订按客户订单号与联系人区分，其他联系人使用相同订单号时不会拿到他人的订单"""
+        contact_key = hashlib.sha1(json.dumps(contact, sort_keys=True, ensure_ascii=False).encode()).hexdigest()[:16]
+        return f"{client_reference}#{contact_key}"
+
+    async def prepare(
+        self,
+        search_code: str,
+        hotel_id: int,
+        rate_plan_id: str,
+        check_in_date: str,
+        check_out_date: str,
+        num_of_rooms: int,
+        guest_list: list[dict[str, Any]],
+        currency: str,
+    ) -> tuple[BookingQuote | None, str | None]:
+        """确认价格并开始持有报价，返回 (报价, 错误信息)"""
+        request = {
+            "Header": {
+                "ClientID": ClientID,
+                "LicenseKey": LicenseKey
+            },
+            "SearchCode": search_code,
+            "HotelID": hotel_id,
+            "RatePlanID": rate_plan_id,
+            "CheckInDate": check_in_date,
+            "CheckOutDate": check_out_date,
+            "NumOfRooms": num_of_rooms,
+            "GuestList": guest_list_body(guest_list),
+            "Currency": currency
+        }
+        quote = BookingQuote(request, guest_list)
+        error = await self._confirm(quote)
+        if error is not None:
+            return None, error
+
+        self._quotes[quote.quote_id] = quote
+        self._references.set(quote.quote_id, quote.client_reference)
+        self._schedule(quote)
+        return quote, None
+
+    def get_quote(self, quote_id: str) -> BookingQuote | None:
+        return self._quotes.get(quote_id)
+
+    async def _confirm(self, quote: BookingQuote) -> str | None:
+        """调用价格确认接口刷新报价，成功返回 None，失败返回错误信息"""
+        is_refresh = quote.quoted_price is not None
+        async with quote.lock:
+            started = time.time()
+            res = await Post("booking", '/api/booking/HotelPriceConfirm',
+                             params={"$format": "json"}, data=quote.request, idempotent=True)
+            if res is None:
+                quote.error = "价格确认请求失败，请检查网络连接和参数设置"
+            elif "Success" in res:
+                success_data = res["Success"]
+                quote.reference_no = success_data.get("ReferenceNo", "")
+                quote.total_price = success_data.get("TotalPrice", 0)
+                quote.currency = success_data.get("Currency", quote.currency)
+                quote.hotel_name = success_data.get("Hotel", {}).get("HotelName", "") or quote.hotel_name
+                if is_refresh:
+                    quote.refreshes += 1
+                else:
+                    quote.quoted_price = quote.total_price
+                quote.confirmed_at = started
+                quote.expires_at = started + BOOKING_REFERENCE_TTL
+                quote.error = None
+            elif "Error" in res:
+                error_info = res["Error"]
+                quote.error = f"价格确认失败: [{error_info.get('Code', 'UNKNOWN')}] {error_info.get('Message', '未知错误')}"
+            else:
+                quote.error = "价格确认API响应格式异常，请检查请求参数"
+
+        metrics.inc("booking_price_confirm", result="ok" if quote.error is None else "failed",
+                    refresh=str(is_refresh).lower())
+        if quote.error is not None:
+            print(f"报价 {quote.quote_id} {quote.error}")
+        return quote.error
+
+    def _schedule(self, quote: BookingQuote) -> None:
+        timer = self._timers.get(quote.quote_id)
+        if timer is not None and not timer.done():
+            timer.cancel()
+        self._timers[quote.quote_id] = asyncio.create_task(self._hold(quote))
+
+    async def _hold(self, quote: BookingQuote) -> None:
+        """在参考号到期前自动续期，直到下单、续期失败或超过最长保留时间"""
+        try:
+            while True:
+                await asyncio.sleep(max(quote.remaining() - BOOKING_REFRESH_MARGIN, 0))
+                if time.time() - quote.created_at >= BOOKING_QUOTE_MAX_HOLD:
+                    print(f"报价 {quote.quote_id} 超过最长保留时间，停止续期")
+                    self._quotes.pop(quote.quote_id, None)
+                    return
+                if quote.remaining() > BOOKING_REFRESH_MARGIN:
+                    # 下单流程已经同步续期过
+                    continue
+                if await self._confirm(quote) is not None:
+                    # 保留报价与错误信息供下单时重新确认，到最长保留时间仍未下单则丢弃
+                    await asyncio.sleep(max(quote.created_at + BOOKING_QUOTE_MAX_HOLD - time.time(), 0))
+                    print(f"报价 {quote.quote_id} 续期失败且超过最长保留时间，已丢弃")
+                    self._quotes.pop(quote.quote_id, None)
+                    return
+                print(f"报价 {quote.quote_id} 已自动续期，参考号: {quote.reference_no}, 价格: {quote.total_price} {quote.currency}")
+        except asyncio.CancelledError:
+            pass
+        finally:
+            if self._timers.get(quote.quote_id) is asyncio.current_task():
+                del self._timers[quote.quote_id]
+
+    def _release(self, quote_id: str) -> None:
+        self._quotes.pop(quote_id, None)
+        timer = self._timers.pop(quote_id, None)
+        if timer is not None and not timer.done():
+            timer.cancel()
+
+    async def complete(
+        self,
+        quote_id: str,
+        contact: dict[str, Any],
+        client_reference: str | None = None,
+        customer_request: str | None = None,
+        accept_price_change: bool = False,
+    ) -> dict[str, Any]:
+        """使用持有的报价创建订单
+
+        未提供 client_reference 时使用报价生成时的随机客户订单号，同一报价的重复提交不会重复下单。
+
+        Returns:
+            dict: {"ok", "client_reference", "repeated", 以及 "booking" 或 "error"/"quote"}
+        """
+        if not client_reference:
+            client_reference = self._references.get(quote_id)
+            if client_reference is MISSING:
+                return {"ok": False, "client_reference": "", "repeated": False,
+                        "error": "报价不存在或已过期，请重新调用 prepare_booking 确认价格"}
+        key = self.result_key(client_reference, contact)
+        done = self._results.get(key)
+        if done is not MISSING:
+            metrics.inc("booking_complete", result="repeated")
+            return {**done, "repeated": True}
+        return await self._inflight.do(
+            key,
+            lambda: self._book(quote_id, contact, client_reference, customer_request, accept_price_change),
+        )
+
+    async def _book(
+        self,
+        quote_id: str,
+        contact: dict[str, Any],
+        client_reference: str,
+        customer_request: str | None,
+        accept_price_change: bool,
+    ) -> dict[str, Any]:
+        result: dict[str, Any] = {"ok": False, "client_reference": client_reference, "repeated": False}
+        quote = self._quotes.get(quote_id)
+        if quote is None:
+            result["error"] = "报价不存在或已过期，请重新调用 prepare_booking 确认价格"
+            return result
+
+        if quote.error is not None or quote.remaining() <= BOOKING_REFRESH_MARGIN:
+            error = await self._confirm(quote)
+            if error is not None:
+                result["error"] = error
+                return result
+            self._schedule(quote)
+
+        result["quote"] = quote.summary()
+        if quote.total_price != quote.quoted_price and not accept_price_change:
+            metrics.inc("booking_complete", result="price_changed")
+            result["error"] = (f"价格已从 {quote.quoted_price} 变为 {quote.total_price} {quote.currency}，"
+                               f"请告知用户，用户同意后设置 accept_price_change=true 重新提交")
+            return result
+
+        request_data: Any = {
+            "Header": {
+                "ClientID": ClientID,
+                "LicenseKey": LicenseKey
+            },
+            "ReferenceNo": quote.reference_no,
+            "CheckInDate": quote.request["CheckInDate"],
+            "CheckOutDate": quote.request["CheckOutDate"],
+            "NumOfRooms": quote.request["NumOfRooms"],
+            "GuestList": guest_list_body(quote.guest_list, with_gender=True),
+            "Contact": {
+                "Name": {
+                    "First": contact.get("name", {}).get("first", ""),
+                    "Last": contact.get("name", {}).get("last", "")
+                },
+                "Email": contact.get("email", ""),
+                "Phone": contact.get("phone", "")
+            },
+            "ClientReference": client_reference
+        }
+        if customer_request:
+            request_data["CustomerRequest"] = customer_request
+
+        print(f"预订流程下单 - 报价: {quote_id}, 参考号: {quote.reference_no}, 客户订单号: {client_reference}")
+        res = await Post("booking", '/api/booking/HotelBookingConfirm',
+                         params={"$format": "json"}, data=request_data, idempotency_key=client_reference)
+
+        if res is None:
+            # 无法确定上游是否已创建订单，记录结果避免重复下单，由调用方按客户订单号查询
+            result["error"] = (f"下单请求失败，订单状态未知。请使用 booking_search 按客户订单号 {client_reference} 查询，"
+                               f"不要重复下单")
+            self._results.set(self.result_key(client_reference, contact), result)
+            self._release(quote_id)
+            metrics.inc("booking_complete", result="unknown")
+            return result
+
+        if "Success" in res:
+            result["ok"] = True
+            result["booking"] = res["Success"].get("BookingDetails", {})
+            self._results.set(self.result_key(client_reference, contact), result)
+            self._release(quote_id)
+            metrics.inc("booking_complete", result="ok")
+            return result
+
+        if "Error" in res:
+            error_info = res["Error"]
+            result["error"] = f"预订订单创建失败: [{error_info.get('Code', 'UNKNOWN')}] {error_info.get('Message', '未知错误')}"
+        else:
+            result["error"] = "API响应格式异常，请检查请求参数"
+        metrics.inc("booking_complete", result="failed")
+        return result
+
+    async def close(self) -> None:
+        """停止所有续期任务，在服务关闭时调用"""
+        timers = list(self._timers.values())
+        for timer in timers:
+            timer.cancel()
+        await asyncio.gather(*timers, return_exceptions=True)
+        self._timers.clear()
+
+
+booking_flow = BookingFlow()
@@ -0,0 +1,259 @@
+import asyncio
+import csv
+import json
+import os
+import time
+
+from datetime import date, datetime, timedelta
+from typing import Any, AsyncIterator
+from dotenv import load_dotenv
+from utils.metrics import metrics
+from utils.request import Post, ClientID, LicenseKey
+
+
+load_dotenv('.env')
+
+# 大范围订单查询按日期窗口分页，每页覆盖的天数
+BOOKING_SEARCH_PAGE_DAYS = int(os.environ.get("BOOKING_SEARCH_PAGE_DAYS", "7"))
+# 单次导出最多的页数，避免误操作拉取多年数据
+BOOKING_SEARCH_MAX_PAGES = int(os.environ.get("BOOKING_SEARCH_MAX_PAGES", "120"))
+# 导出文件目录
+BOOKING_EXPORT_DIR = os.environ.get("BOOKING_EXPORT_DIR", ".cache/exports")
+
+# 订单状态映射
+STATUS_MAP = {
+    0: "PreBook（预订）",
+    2: "Confirmed（已确认）",
+    3: "Canceled（已取消）",
+    4: "Failed（失败）",
+    5: "Pending（处理中）",
+    6: "OnRequest（申请中）"
+}
+
+# 导出与分页展示使用的订单字段
+BOOKING_COLUMNS = [
+    "BookingID", "Status", "StatusText", "ClientReference", "ConfirmationCode",
+    "HotelID", "HotelName", "CheckInDate", "CheckOutDate", "OrderDate",
+    "NumOfRooms", "TotalPrice", "ContactName", "ContactPhone", "ContactEmail",
+]
+
+# 按优先级选择用于分页的日期范围
+_PAGED_RANGES = ["BookDateRange", "CheckInDateRange", "CheckOutDateRange"]
+
+
+def _date_range(date_from: str | None, date_to: str | None) -> dict[str, str] | None:
+    if not (date_from or date_to):
+        return None
+    value = {}
+    if date_from:
+        value["from"] = date_from
+    if date_to:
+        value["to"] = date_to
+    return value
+
+
+def build_search_by(
+    booking_id: str | None = None,
+    client_reference: str | None = None,
+    check_in_date_from: str | None = None,
+    check_in_date_to: str | None = None,
+    check_out_date_from: str | None = None,
+    check_out_date_to: str | None = None,
+    book_date_from: str | None = None,
+    book_date_to: str | None = None,
+    guest_first_name: str | None = None,
+    guest_last_name: str | None = None,
+    contact_first_name: str | None = None,
+    contact_last_name: str | None = None,
+    status: int | None = None,
+    city_code: str | None = None,
+) -> dict[str, Any]:
+    """构建订单查询接口的 SearchBy；提供了道旅订单号时只按订单号查询（最精确）"""
+    if booking_id:
+        return {"BookingID": booking_id}
+
+    booking_info: dict[str, Any] = {}
+    if client_reference:
+        booking_info["ClientReference"] = client_reference
+    for key, value in (
+        ("CheckInDateRange", _date_range(check_in_date_from, check_in_date_to)),
+        ("CheckOutDateRange", _date_range(check_out_date_from, check_out_date_to)),
+        ("BookDateRange", _date_range(book_date_from, book_date_to)),
+    ):
+        if value:
+            booking_info[key] = value
+    guest_name = {key: value for key, value in (("First", guest_first_name), ("Last", guest_last_name)) if value}
+    if guest_name:
+        booking_info["GuestName"] = guest_name
+    contact_name = {key: value for key, value in (("First", contact_first_name), ("Last", contact_last_name)) if value}
+    if contact_name:
+        booking_info["ContactName"] = contact_name
+    if status is not None:
+        booking_info["Status"] = status
+    if city_code:
+        booking_info["CityCode"] = city_code
+
+    return {"BookingInfo": booking_info} if booking_info else {}
+
+
+async def search_bookings(search_by: dict[str, Any]) -> dict[str, Any] | None:
+    """调用订单查询接口，返回原始响应或None"""
+    request_data: Any = {
+        "Header": {
+            "ClientID": ClientID,
+            "LicenseKey": LicenseKey
+        },
+        "SearchBy": search_by
+    }
+    return await Post("booking", '/api/booking/HotelBookingSearch',
+                      params={"$format": "json"}, data=request_data, coalesce=True)
+
+
+def _split_range(date_from: str, date_to: str, days: int) -> list[tuple[str, str]]:
+    """把 [date_from, date_to] 切分为每段 days 天的连续窗口（闭区间，互不重叠）"""
+    start = datetime.strptime(date_from, "%Y-%m-%d").date()
+    end = datetime.strptime(date_to, "%Y-%m-%d").date()
+    windows = []
+    while start <= end:
+        stop = min(start + timedelta(days=max(days, 1) - 1), end)
+        windows.append((start.isoformat(), stop.isoformat()))
+        start = stop + timedelta(days=1)
+    return windows
+
+
+def plan_pages(search_by: dict[str, Any], page_days: int = BOOKING_SEARCH_PAGE_DAYS) -> list[dict[str, Any]]:
+    """把一次查询拆成按日期窗口分页的多个查询
+
+    订单号查询只有一页；否则取第一个同时有起止日期的范围（订单创建日期 > 入住 > 离店）按 page_days 切分，
+    只有开始日期的订单创建日期范围以今天为结束日期。
+    """
+    booking_info = search_by.get("BookingInfo")
+    if not booking_info:
+        return [search_by]
+
+    for field in _PAGED_RANGES:
+        value = booking_info.get(field)
+        if not value or "from" not in value:
+            continue
+        date_to = value.get("to") or (date.today().isoformat() if field == "BookDateRange" else None)
+        if date_to is None:
+            continue
+        pages = []
+        for window_from, window_to in _split_range(value["from"], date_to, page_days):
+            page_info = dict(booking_info)
+            page_info[field] = {"from": window_from, "to": window_to}
+            pages.append({"BookingInfo": page_info})
+        return pages
+    return [search_by]
+
+
+def page_window(page: dict[str, Any]) -> str:
+    """分页查询条件对应的日期窗口描述，例如 BookDateRange 2026-03-01~2026-03-07"""
+    booking_info = page.get("BookingInfo") or {}
+    for field in _PAGED_RANGES:
+        value = booking_info.get(field)
+        if value:
+            return f"{field} {value.get('from', '')}~{value.get('to', '')}"
+    return ""
+
+
+async def iter_booking_pages(
+    search_by: dict[str, Any],
+    page_days: int = BOOKING_SEARCH_PAGE_DAYS,
+) -> AsyncIterator[tuple[dict[str, Any], list[dict[str, Any]]]]:
+    """按日期窗口逐页查询订单，产出 (本页查询条件, 本页订单列表)
+
+    下一页在当前页被消费时已开始请求；不同窗口返回的相同订单只产出一次。
+    某一页失败时抛出 RuntimeError（已产出的页仍然有效）；日期范围为空时不产出任何页。
+    """
+    pages = plan_pages(search_by, page_days)
+    if not pages:
+        return
+    if len(pages) > BOOKING_SEARCH_MAX_PAGES:
+        raise ValueError(f"查询范围过大（{len(pages)} 页），单次最多 {BOOKING_SEARCH_MAX_PAGES} 页，请缩小日期范围或增大每页天数")
+
+    seen: set[Any] = set()
+    pending = asyncio.create_task(search_bookings(pages[0]))
+    try:
+        for index, page in enumerate(pages):
+            started = time.perf_counter()
+            res = await pending
+            pending = asyncio.create_task(search_bookings(pages[index + 1])) if index + 1 < len(pages) else None
+            metrics.observe("booking_search_page_seconds", time.perf_counter() - started)
+
+            if res is None:
+                raise RuntimeError(f"第 {index + 1} 页查询失败，请检查网络连接和参数设置")
+            if "Error" in res:
+                error_info = res["Error"]
+                raise RuntimeError(f"第 {index + 1} 页查询失败: [{error_info.get('Code', 'UNKNOWN')}] {error_info.get('Message', '未知错误')}")
+
+            bookings = []
+            for booking in res.get("Success", {}).get("BookingDetailsList", []) or []:
+                booking_id = booking.get("BookingID")
+                if booking_id is not None:
+                    if booking_id in seen:
+                        continue
+                    seen.add(booking_id)
+                bookings.append(booking)
+            yield page, bookings
+    finally:
+        if pending is not None and not pending.done():
+            pending.cancel()
+
+
+def booking_row(booking: dict[str, Any]) -> dict[str, Any]:
+    """把订单详情整理为扁平的一行，用于表格展示与CSV导出"""
+    hotel = booking.get("Hotel", {}) or {}
+    contact = booking.get("Contact", {}) or {}
+    contact_name = contact.get("Name", {}) or {}
+    status = booking.get("Status", -1)
+    return {
+        "BookingID": booking.get("BookingID", ""),
+        "Status": status,
+        "StatusText": STATUS_MAP.get(status, f"未知状态({status})"),
+        "ClientReference": booking.get("ClientReference", ""),
+        "ConfirmationCode": booking.get("ConfirmationCode", ""),
+        "HotelID": hotel.get("HotelID", ""),
+        "HotelName": hotel.get("HotelName", ""),
+        "CheckInDate": (booking.get("CheckInDate") or "").split(" ")[0],
+        "CheckOutDate": (booking.get("CheckOutDate") or "").split(" ")[0],
+        "OrderDate": (booking.get("OrderDate") or "").split(" ")[0],
+        "NumOfRooms": booking.get("NumOfRooms", 0),
+        "TotalPrice": booking.get("TotalPrice", 0),
+        "ContactName": f"{contact_name.get('First', '')} {contact_name.get('Last', '')}".strip(),
+        "ContactPhone": contact.get("Phone", ""),
+        "ContactEmail": contact.get("Email", ""),
+    }
+
+
+class BookingExporter:
+    """逐页追加写入订单导出文件
+
+    - csv: 每个订单一行，列为 BOOKING_COLUMNS
+    - jsonl: 每行一个完整的订单JSON，保留所有原始字段，适合对账程序处理
+    """
+
+    def __init__(self, export_format: str, directory: str = BOOKING_EXPORT_DIR):
+        if export_format not in ("csv", "jsonl"):
+            raise ValueError(f"不支持的导出格式: {export_format}，可选 csv、jsonl")
+        os.makedirs(directory, exist_ok=True)
+        self.format = export_format
+        self.path = os.path.join(directory, f"bookings-{datetime.now():%Y%m%d-%H%M%S}-{os.getpid()}.{export_format}")
+        self.rows = 0
+        # utf-8-sig 便于 Excel 直接打开含中文的CSV
+        self._file = open(self.path, "w", newline="", encoding="utf-8-sig" if export_format == "csv" else "utf-8")
+        self._writer = csv.DictWriter(self._file, fieldnames=BOOKING_COLUMNS) if export_format == "csv" else None
+        if self._writer is not None:
+            self._writer.writeheader()
+
+    def write(self, bookings: list[dict[str, Any]]) -> None:
+        for booking in bookings:
+            if self._writer is not None:
+                self._writer.writerow(booking_row(booking))
+            else:
+                self._file.write(json.dumps(booking, ensure_ascii=False, separators=(",", ":")) + "\n")
+        self._file.flush()
+        self.rows += len(bookings)
+
+    def close(self) -> None:
+        self._file.close()
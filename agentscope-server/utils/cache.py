@@ -0,0 +1,267 @@
+import asyncio
+import atexit
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from collections import OrderedDict
+from typing import Any, Hashable
+
+
+# 缓存未命中的哨兵值（缓存值本身可能为 None/空列表）
+MISSING = object()
+# 待写入记录中表示删除的标记
+_DELETED = object()
+
+
+def _encode_key(key: Hashable) -> str:
+    """把元组等可哈希的键编码为稳定的字符串，用于持久化存储"""
+    return json.dumps(key, ensure_ascii=False, sort_keys=True, default=str)
+
+
+class SQLiteStore:
+    """基于SQLite的本地键值存储，供缓存落盘使用
+
+    所有缓存共享同一张表，通过 namespace 区分，值以JSON文本保存。
+    写入与删除先记入待写入表并立即返回，由后台写线程合并为一个事务提交，调用方（事件循环）不等待磁盘；
+    尚未提交的记录对 get 可见。进程退出时会等待待写入记录提交。
+    """
+
+    def __init__(self, path: str):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            " namespace TEXT NOT NULL,"
+            " key TEXT NOT NULL,"
+            " value TEXT NOT NULL,"
+            " expires_at REAL,"
+            " PRIMARY KEY (namespace, key))"
+        )
+        self._conn.commit()
+
+        # (namespace, key) -> (value, expires_at) 或 _DELETED；_writing 为写线程正在提交的一批
+        self._pending: dict[tuple[str, str], Any] = {}
+        self._writing: dict[tuple[str, str], Any] = {}
+        self._changed = threading.Condition()
+        self._closed = False
+        self._writer = threading.Thread(target=self._write_loop, name=f"sqlite-store:{os.path.basename(path)}",
+                                        daemon=True)
+        self._writer.start()
+        atexit.register(self.flush)
+
+    def get(self, namespace: str, key: str) -> tuple[Any, float | None] | None:
+        """读取未过期的记录，返回 (value, expires_at)，不存在或已过期时返回 None"""
+        with self._changed:
+            entry = self._pending.get((namespace, key), MISSING)
+            if entry is MISSING:
+                entry = self._writing.get((namespace, key), MISSING)
+        if entry is _DELETED:
+            return None
+        if entry is MISSING:
+            with self._lock:
+                row = self._conn.execute(
+                    "SELECT value, expires_at FROM cache WHERE namespace = ? AND key = ?",
+                    (namespace, key),
+                ).fetchone()
+            if row is None:
+                return None
+            entry = json.loads(row[0]), row[1]
+        if entry[1] is not None and entry[1] <= time.time():
+            self.delete(namespace, key)
+            return None
+        return entry
+
+    def set(self, namespace: str, key: str, value: Any, expires_at: float | None) -> None:
+        self._enqueue({(namespace, key): (value, expires_at)})
+
+    def set_many(self, namespace: str, items: list[tuple[str, Any, float | None]]) -> None:
+        """批量写入 (key, value, expires_at)，用于大批量预加载"""
+        self._enqueue({(namespace, key): (value, expires_at) for key, value, expires_at in items})
+
+    def delete(self, namespace: str, key: str) -> None:
+        self._enqueue({(namespace, key): _DELETED})
+
+    def _enqueue(self, entries: dict[tuple[str, str], Any]) -> None:
+        with self._changed:
+            if self._closed:
+                return
+            self._pending.update(entries)
+            self._changed.notify_all()
+
+    def _write_loop(self) -> None:
+        while True:
+            with self._changed:
+                while not self._pending and not self._closed:
+                    self._changed.wait()
+                if not self._pending:
+                    return
+                self._writing, self._pending = self._pending, {}
+            try:
+                self._commit(self._writing)
+            except Exception as e:
+                print(f"缓存落盘失败 ({self.path}): {e}")
+            with self._changed:
+                self._writing = {}
+                self._changed.notify_all()
+
+    def _commit(self, entries: dict[tuple[str, str], Any]) -> None:
+        rows = [(namespace, key, json.dumps(entry[0], ensure_ascii=False, separators=(",", ":")), entry[1])
+                for (namespace, key), entry in entries.items() if entry is not _DELETED]
+        deleted = [(namespace, key) for (namespace, key), entry in entries.items() if entry is _DELETED]
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO cache (namespace, key, value, expires_at) VALUES (?, ?, ?, ?)", rows)
+            self._conn.executemany("DELETE FROM cache WHERE namespace = ? AND key = ?", deleted)
+            self._conn.commit()
+
+    def flush(self) -> None:
+        """等待已记入的写入全部提交"""
+        with self._changed:
+            while self._pending or self._writing:
+                self._changed.wait()
+
+    def purge_expired(self) -> int:
+        """删除全部已过期记录，返回删除条数"""
+        with self._lock:
+            cursor = self._conn.execute(
+                "DELETE FROM cache WHERE expires_at IS NOT NULL AND expires_at <= ?", (time.time(),))
+            self._conn.commit()
+        return cursor.rowcount
+
+    def close(self) -> None:
+        self.flush()
+        with self._changed:
+            self._closed = True
+            self._changed.notify_all()
+        self._writer.join()
+        with self._lock:
+            self._conn.close()
+
+
+class TTLCache:
+    """带过期时间与LRU淘汰的内存缓存，可选落盘到 SQLiteStore
+
+    - 每条记录有独立的过期时间，set 时可覆盖默认TTL
+    - 超过 maxsize 时淘汰最久未使用的记录
+    - 配置了 store 时写穿到磁盘（由 store 的后台线程提交），内存未命中会回读磁盘，重启后无需重新请求上游；
+      在事件循环中应使用 aget，回读磁盘放到线程中执行
+    - 通过 stats() 暴露命中/未命中计数
+
+    注意：返回值与缓存共享同一对象，调用方不应原地修改。
+    """
+
+    def __init__(self, name: str, maxsize: int = 1024, ttl: float = 300, store: SQLiteStore | None = None):
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.store = store
+        self._data: OrderedDict[Hashable, tuple[Any, float | None]] = OrderedDict()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable, default: Any = MISSING) -> Any:
+        value = self._get_memory(key)
+        if value is not MISSING:
+            return value
+        stored = self.store.get(self.name, _encode_key(key)) if self.store is not None else None
+        return self._from_store(key, stored, default)
+
+    async def aget(self, key: Hashable, default: Any = MISSING) -> Any:
+        """与 get 相同，内存未命中时在线程中回读磁盘，不阻塞事件循环"""
+        value = self._get_memory(key)
+        if value is not MISSING:
+            return value
+        stored = None
+        if self.store is not None:
+            stored = await asyncio.to_thread(self.store.get, self.name, _encode_key(key))
+        return self._from_store(key, stored, default)
+
+    def _get_memory(self, key: Hashable) -> Any:
+        entry = self._data.get(key)
+        if entry is not None:
+            value, expires_at = entry
+            if expires_at is None or expires_at > time.time():
+                self._data.move_to_end(key)
+                self.hits += 1
+                return value
+            del self._data[key]
+        return MISSING
+
+    def _from_store(self, key: Hashable, stored: tuple[Any, float | None] | None, default: Any) -> Any:
+        if stored is not None:
+            value, expires_at = stored
+            self._put(key, value, expires_at)
+            self.hits += 1
+            self.disk_hits += 1
+            return value
+        self.misses += 1
+        return default
+
+    def set(self, key: Hashable, value: Any, ttl: float | None = None) -> None:
+        """写入缓存
+
+        Args:
+            key (Hashable): 缓存键
+            value (Any): 缓存值，落盘时需可JSON序列化
+            ttl (float, optional): 过期秒数，默认使用构造时的TTL；小于等于0表示永不过期
+        """
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = time.time() + ttl if ttl and ttl > 0 else None
+        self._put(key, value, expires_at)
+        if self.store is not None:
+            self.store.set(self.name, _encode_key(key), value, expires_at)
+
+    def set_many(self, items: dict[Hashable, Any], ttl: float | None = None) -> None:
+        """批量写入，落盘时只提交一次事务"""
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = time.time() + ttl if ttl and ttl > 0 else None
+        for key, value in items.items():
+            self._put(key, value, expires_at)
+        if self.store is not None:
+            self.store.set_many(self.name, [(_encode_key(key), value, expires_at) for key, value in items.items()])
+
+    def delete(self, key: Hashable) -> None:
+        self._data.pop(key, None)
+        if self.store is not None:
+            self.store.delete(self.name, _encode_key(key))
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    def _put(self, key: Hashable, value: Any, expires_at: float | None) -> None:
+        self._data[key] = (value, expires_at)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def __contains__(self, key: Hashable) -> bool:
+        entry = self._data.get(key)
+        return entry is not None and (entry[1] is None or entry[1] > time.time())
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> dict[str, Any]:
+        """命中/未命中统计"""
+        total = self.hits + self.misses
+        return {
+            "name": self.name,
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+        }
@@ -0,0 +1,128 @@
+import asyncio
+import os
+import time
+
+from typing import Any
+from dotenv import load_dotenv
+from utils.hotel_catalog import hotel_catalog, MIN_LAST_UPDATE_TIME
+from utils.hotel_content import fetch_hotel_details
+from utils.jsonstream import abatched
+from utils.metrics import metrics
+from utils.request import GetStream
+
+
+load_dotenv('.env')
+
+# 目录同步配置，仅在设置了 HOTEL_CATALOG_PATH 时生效
+HOTEL_CATALOG_COUNTRIES = [code.strip() for code in os.environ.get("HOTEL_CATALOG_COUNTRIES", "CN").split(",") if code.strip()]
+HOTEL_CATALOG_LANGUAGES = [lang.strip() for lang in os.environ.get("HOTEL_CATALOG_LANGUAGES", "en-US,zh-CN").split(",") if lang.strip()]
+HOTEL_CATALOG_SYNC_INTERVAL = float(os.environ.get("HOTEL_CATALOG_SYNC_INTERVAL", "3600"))
+# 超过该时长做一次全量同步，清理已下架的酒店
+HOTEL_CATALOG_FULL_SYNC_INTERVAL = float(os.environ.get("HOTEL_CATALOG_FULL_SYNC_INTERVAL", str(7 * 24 * 3600)))
+HOTEL_CATALOG_SYNC_DETAILS = os.environ.get("HOTEL_CATALOG_SYNC_DETAILS", "true").lower() == "true"
+# 每批写入的酒店ID数量（同时也是拉取详情的批次）
+HOTEL_CATALOG_BATCH_SIZE = int(os.environ.get("HOTEL_CATALOG_BATCH_SIZE", "1000"))
+
+_sync_task: asyncio.Task | None = None
+
+
+async def sync_country(country_code: str, languages: list[str] | None = None, full: bool = False) -> dict[str, Any]:
+    """同步一个国家的酒店ID列表与酒店详情到本地目录
+
+    有水位且距上次全量不足 HOTEL_CATALOG_FULL_SYNC_INTERVAL 时，用 lastUpdateTime 只拉取变更的酒店；
+    否则全量同步并删除本轮未出现的酒店。水位取本轮开始时间，同步中途失败不会推进水位。
+
+    Args:
+        country_code (str): 国家代码
+        languages (list[str], optional): 需要同步详情的语言，默认 HOTEL_CATALOG_LANGUAGES
+        full (bool): 强制全量同步
+
+    Returns:
+        dict: 同步结果 {"country_code", "mode", "hotels", "details", "removed", "seconds"}
+    """
+    if hotel_catalog is None:
+        raise RuntimeError("未配置 HOTEL_CATALOG_PATH，本地酒店目录未启用")
+
+    languages = languages or HOTEL_CATALOG_LANGUAGES
+    state = await asyncio.to_thread(hotel_catalog.get_state, country_code)
+    started = time.time()
+    high_water_mark = int(started)
+    sync_id = time.time_ns()
+
+    delta = (not full and state is not None
+             and started - state["full_synced_at"] < HOTEL_CATALOG_FULL_SYNC_INTERVAL)
+    params = {"countryCode": country_code, "language": languages[0]}
+    if delta:
+        params["lastUpdateTime"] = str(max(state["high_water_mark"], MIN_LAST_UPDATE_TIME))
+
+    result: dict[str, Any] = {"country_code": country_code, "mode": "delta" if delta else "full",
+                              "hotels": 0, "details": 0, "removed": 0}
+
+    async for batch in abatched(GetStream("content", '/api/v1/hotel/list', params=params), HOTEL_CATALOG_BATCH_SIZE):
+        await asyncio.to_thread(hotel_catalog.upsert_hotel_ids, country_code, batch, high_water_mark, sync_id)
+        result["hotels"] += len(batch)
+        if not HOTEL_CATALOG_SYNC_DETAILS:
+            continue
+        for language in languages:
+            hotels, stats = await fetch_hotel_details(batch, language, refresh=True)
+            await asyncio.to_thread(hotel_catalog.upsert_details, hotels, language)
+            result["details"] += len(hotels)
+            if delta and stats["failed_batches"] == 0:
+                # 变更列表中查不到详情的酒店视为已不可售，删除旧详情
+                returned = {hotel["id"] for hotel in hotels}
+                gone = [hotel_id for hotel_id in batch if hotel_id not in returned]
+                if gone:
+                    await asyncio.to_thread(hotel_catalog.delete_details, gone, language)
+
+    if delta:
+        await asyncio.to_thread(hotel_catalog.finish_delta_sync, country_code, high_water_mark)
+    else:
+        result["removed"] = await asyncio.to_thread(hotel_catalog.finish_full_sync, country_code, sync_id, high_water_mark)
+
+    result["seconds"] = round(time.time() - started, 3)
+    metrics.inc("catalog_sync_hotels", result["hotels"], country=country_code, mode=result["mode"])
+    metrics.observe("catalog_sync_seconds", result["seconds"], mode=result["mode"])
+    return result
+
+
+async def sync_all(countries: list[str] | None = None) -> list[dict[str, Any]]:
+    """依次同步所有配置的国家，单个国家失败不影响其他国家"""
+    results = []
+    for country_code in countries or HOTEL_CATALOG_COUNTRIES:
+        try:
+            result = await sync_country(country_code)
+            print(f"酒店目录同步完成: {result}")
+            results.append(result)
+        except Exception as e:
+            metrics.inc("catalog_sync_failed", country=country_code)
+            print(f"酒店目录同步失败 ({country_code}): {e}")
+    return results
+
+
+async def _sync_loop() -> None:
+    while True:
+        await sync_all()
+        await asyncio.sleep(HOTEL_CATALOG_SYNC_INTERVAL)
+
+
+def start_catalog_sync() -> asyncio.Task | None:
+    """启动后台目录同步任务，未启用本地目录时返回 None"""
+    global _sync_task
+    if hotel_catalog is None or not HOTEL_CATALOG_COUNTRIES:
+        return None
+    if _sync_task is None or _sync_task.done():
+        _sync_task = asyncio.create_task(_sync_loop())
+    return _sync_task
+
+
+async def stop_catalog_sync() -> None:
+    """停止后台目录同步任务"""
+    global _sync_task
+    if _sync_task is None:
+        return
+    _sync_task.cancel()
+    try:
+        await _sync_task
+    except asyncio.CancelledError:
+        pass
+    _sync_task = None
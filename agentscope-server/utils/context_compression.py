@@ -0,0 +1,366 @@
+import asyncio
+import hashlib
+import json
+import os
+import re
+
+from collections import OrderedDict
+from typing import Any
+from dotenv import load_dotenv
+
+from agentscope.formatter import DashScopeChatFormatter
+from agentscope.message import Msg, ToolResultBlock
+from agentscope.model import ChatModelBase, ChatResponse
+from utils.instrumentation import InstrumentedDashScopeChatFormatter
+from utils.metrics import metrics
+from utils.prompt_cache import FORMATTER_CACHE_SIZE
+from utils.render import estimate_tokens
+
+
+load_dotenv('.env')
+
+# 最近 CONTEXT_KEEP_TURNS 轮对话（含当前轮）原样发送；再往前的 CONTEXT_DIGEST_TURNS 轮把工具结果替换为摘要；
+# 更早的轮次折叠进滚动对话摘要（未配置摘要模型时同样只做工具结果摘要）
+CONTEXT_KEEP_TURNS = int(os.environ.get("CONTEXT_KEEP_TURNS", "2"))
+CONTEXT_DIGEST_TURNS = int(os.environ.get("CONTEXT_DIGEST_TURNS", "4"))
+# 不超过该字符数的工具结果不压缩，摘要本身也截断到该长度
+CONTEXT_DIGEST_CHARS = int(os.environ.get("CONTEXT_DIGEST_CHARS", "400"))
+# 生成滚动摘要的模型，为空时不生成摘要
+CONTEXT_SUMMARY_MODEL = os.environ.get("CONTEXT_SUMMARY_MODEL", "qwen-turbo")
+# 内存中保留的摘要条数
+CONTEXT_SUMMARY_MAX = int(os.environ.get("CONTEXT_SUMMARY_MAX", "1024"))
+
+metrics.define_histogram("context_tokens", (500, 1000, 2000, 4000, 8000, 16000, 32000, 64000, 128000))
+
+# 工具结果中需要保留的业务字段：酒店、报价参考号、订单、日期与价格
+_DIGEST_FIELDS = (
+    "HotelID", "HotelName", "ReferenceNo", "BookingID", "ClientReference", "ConfirmationCode", "RatePlanID",
+    "CheckIn", "CheckOut", "CheckInDate", "CheckOutDate", "TotalPrice", "LowestPrice", "Price", "Currency", "Status",
+)
+# 取值不以 { 或 [ 开头：嵌套对象由 _NESTED_PATTERN 取其 Value
+_FIELD_PATTERN = re.compile(r'"?\b(' + "|".join(_DIGEST_FIELDS) + r')"?\s*[:：=]\s*"?([^",{}\[\]\n\t]+)')
+# 紧凑JSON中的嵌套价格：{"LowestPrice":{"Value":123.0,"Currency":"CNY"}}
+_NESTED_PATTERN = re.compile(r'"(' + "|".join(_DIGEST_FIELDS) + r')"\s*:\s*\{[^{}]*?"Value"\s*:\s*"?([^",}]+)')
+# 工具输出的中文文本标签，如 get_lowest_price 的 "酒店名 (ID: 123)"、"最低价格: 123 CNY"
+_LABEL_PATTERNS = (
+    (re.compile(r"\(ID:\s*(\d+)\)"), "HotelID"),
+    (re.compile(r"最低价格:\s*([\d.]+(?:\s+[A-Z]{3})?)"), "LowestPrice"),
+    (re.compile(r"总价:\s*([\d.]+(?:\s+[A-Z]{3})?)"), "TotalPrice"),
+    (re.compile(r"订单参考号:\s*(\S+)"), "ReferenceNo"),
+    (re.compile(r"报价ID:\s*(\S+)"), "QuoteID"),
+    (re.compile(r"道旅订单号:\s*(\S+)"), "BookingID"),
+    (re.compile(r"客户订单号:\s*(\S+)"), "ClientReference"),
+)
+# get_hotel_list 的 "共 N 个酒店ID: [1,2,3]"
+_ID_LIST_PATTERN = re.compile(r"酒店ID[^:：\n]*[:：]\s*\[([\d,\s]+)")
+_MAX_VALUES = 8
+
+_SUMMARY_PROMPT = (
+    "你负责压缩酒店预订助手的对话历史。根据已有摘要和新增的对话，输出一份更新后的中文摘要，"
+    "保留：用户的需求与偏好、目的地与日期、已选定或候选的酒店ID与名称、报价参考号ReferenceNo、订单号、价格与币种、"
+    "尚未完成的事项。只输出摘要本身，不超过300字。"
+)
+
+
+def _tool_output_text(output: Any) -> str:
+    if isinstance(output, str):
+        return output
+    if isinstance(output, list):
+        return "\n".join(block.get("text", "") for block in output if isinstance(block, dict) and block.get("type") == "text")
+    return str(output)
+
+
+def _extract_fields(text: str) -> dict[str, list[str]]:
+    """从工具结果（紧凑JSON、TSV表格或中文文本标签）中提取业务字段的取值，每个字段最多 _MAX_VALUES 个不重复值"""
+    fields: dict[str, list[str]] = {}
+
+    def _add(field: str, value: str) -> None:
+        value = value.strip()[:40]
+        values = fields.setdefault(field, [])
+        if value and value not in values and len(values) < _MAX_VALUES:
+            values.append(value)
+
+    for field, value in _NESTED_PATTERN.findall(text):
+        _add(field, value)
+    for field, value in _FIELD_PATTERN.findall(text):
+        _add(field, value)
+    for pattern, field in _LABEL_PATTERNS:
+        for value in pattern.findall(text):
+            _add(field, value)
+    for ids in _ID_LIST_PATTERN.findall(text):
+        for value in ids.split(","):
+            _add("HotelID", value)
+
+    # render_result 输出的TSV表格："name[N] (TSV):" 之后（可能有一行共同字段）是表头，随后为数据行
+    lines = text.split("\n")
+    index = 0
+    while index < len(lines):
+        if not lines[index].endswith("(TSV):"):
+            index += 1
+            continue
+        index += 1
+        if index < len(lines) and lines[index].startswith("共同字段"):
+            index += 1
+        if index >= len(lines):
+            break
+        columns = lines[index].split("\t")
+        # 嵌套的价格字段展开后为 LowestPrice.Value 之类的列名
+        wanted = [(position, column.removesuffix(".Value")) for position, column in enumerate(columns)
+                  if column.removesuffix(".Value") in _DIGEST_FIELDS]
+        index += 1
+        while index < len(lines) and "\t" in lines[index]:
+            cells = lines[index].split("\t")
+            for position, column in wanted:
+                if position < len(cells):
+                    _add(column, cells[position])
+            index += 1
+    return fields
+
+
+def digest_tool_result(text: str, limit: int = CONTEXT_DIGEST_CHARS) -> str:
+    """把冗长的工具结果压缩为结构化摘要：首行说明 + 酒店ID、ReferenceNo、日期、价格等字段"""
+    if len(text) <= limit:
+        return text
+    first_line = text.split("\n", 1)[0][:80]
+    fields = _extract_fields(text)
+    digest = f"[已压缩，原结果 {len(text)} 字符] {first_line}"
+    if fields:
+        digest += "\n" + "; ".join(f"{field}={','.join(values)}" for field, values in fields.items())
+    return digest[:limit]
+
+
+def _is_turn_start(msg: Msg) -> bool:
+    return msg.role == "user" and not msg.has_content_blocks("tool_result")
+
+
+def _fingerprint(turn: list[Msg]) -> str:
+    """一轮对话的稳定指纹：会话历史每次请求都会重新转换为新的 Msg 对象，不能使用消息ID"""
+    parts = []
+    for msg in turn:
+        parts.append(msg.role)
+        parts.append(msg.get_text_content() or "")
+        for block in msg.get_content_blocks("tool_use"):
+            parts.append(f"{block.get('id')}:{block.get('name')}")
+        for block in msg.get_content_blocks("tool_result"):
+            parts.append(str(block.get("id")))
+    return "\x1f".join(parts)
+
+
+def _msg_tokens(msgs: list[Msg]) -> int:
+    total = 0
+    for msg in msgs:
+        if isinstance(msg.content, str):
+            total += estimate_tokens(msg.content)
+            continue
+        for block in msg.content:
+            if block.get("type") == "tool_result":
+                total += estimate_tokens(_tool_output_text(block.get("output")))
+            elif block.get("type") == "tool_use":
+                total += estimate_tokens(json.dumps(block.get("input", {}), ensure_ascii=False))
+            else:
+                total += estimate_tokens(block.get("text") or block.get("thinking") or "")
+    return total
+
+
+def _digest_msg(msg: Msg, limit: int) -> Msg:
+    """工具结果替换为摘要、丢弃思考过程后的消息副本；不需要改动时返回原消息"""
+    if isinstance(msg.content, str):
+        return msg
+    changed = False
+    blocks = []
+    for block in msg.content:
+        if block.get("type") == "thinking":
+            changed = True
+            continue
+        if block.get("type") == "tool_result":
+            text = _tool_output_text(block.get("output"))
+            digest = digest_tool_result(text, limit)
+            if digest != text:
+                changed = True
+                block = ToolResultBlock(type="tool_result", id=block["id"], name=block.get("name"),
+                                        output=[{"type": "text", "text": digest}])
+        blocks.append(block)
+    if not changed:
+        return msg
+    digested = Msg(msg.name, blocks, msg.role, metadata=msg.metadata, timestamp=msg.timestamp,
+                   invocation_id=msg.invocation_id)
+    # 与原消息区分，格式化缓存按消息ID复用结果
+    digested.id = f"{msg.id}:digest"
+    return digested
+
+
+class ContextCompressor:
+    """压缩每次推理发送给模型的对话上下文，不改动会话历史本身
+
+    - 以用户消息划分对话轮次，最近 keep_turns 轮（含进行中的当前轮）原样保留
+    - 之前的 digest_turns 轮中，冗长的工具结果替换为结构化摘要（酒店ID、ReferenceNo、日期、价格等），
+      工具调用与结果的配对关系不变
+    - 更早的轮次折叠为一条滚动摘要，摘要由 summary_model 在后台异步生成，不阻塞当前推理；
+      摘要尚未生成时这些轮次同样以工具结果摘要的形式发送，新摘要从下一轮开始使用
+    - 每次压缩前后的上下文token估算记入 context_tokens 直方图
+    - 工具结果摘要、摘要消息与每条消息的token估算按消息ID缓存，ReAct 的后续步骤复用同一批对象，
+      下游格式化器的增量缓存因此能够命中
+    """
+
+    def __init__(
+        self,
+        summary_model: ChatModelBase | None = None,
+        keep_turns: int = CONTEXT_KEEP_TURNS,
+        digest_turns: int = CONTEXT_DIGEST_TURNS,
+        digest_chars: int = CONTEXT_DIGEST_CHARS,
+        max_summaries: int = CONTEXT_SUMMARY_MAX,
+        max_cached: int = FORMATTER_CACHE_SIZE,
+    ):
+        self.summary_model = summary_model
+        self.summary_formatter = DashScopeChatFormatter()
+        self.keep_turns = max(keep_turns, 1)
+        self.digest_turns = max(digest_turns, 0)
+        self.digest_chars = digest_chars
+        self.max_summaries = max_summaries
+        self.max_cached = max_cached
+        # 消息ID -> (内容对象, 内容长度, 结果)：工具结果摘要后的消息、token估算
+        self._digests: OrderedDict[str, tuple[Any, int, Msg]] = OrderedDict()
+        self._tokens: OrderedDict[str, tuple[Any, int, int]] = OrderedDict()
+        # 摘要指纹 -> 摘要消息
+        self._summary_msgs: OrderedDict[str, Msg] = OrderedDict()
+        # 折叠轮次的链式指纹 -> 覆盖到该轮为止的摘要
+        self._summaries: OrderedDict[str, str] = OrderedDict()
+        # 当前轮首条用户消息ID -> 该轮采用的摘要指纹
+        self._turn_summaries: OrderedDict[str, str | None] = OrderedDict()
+        self._pending: set[str] = set()
+        self._tasks: set[asyncio.Task] = set()
+
+    def compress(self, msgs: list[Msg]) -> list[Msg]:
+        head = 0
+        while head < len(msgs) and msgs[head].role == "system":
+            head += 1
+        starts = [index for index in range(head, len(msgs)) if _is_turn_start(msgs[index])]
+        if len(starts) <= self.keep_turns:
+            self._record(msgs, msgs)
+            return msgs
+
+        turns = [msgs[start:end] for start, end in zip(starts, starts[1:] + [len(msgs)])]
+        old, recent = turns[:-self.keep_turns], turns[-self.keep_turns:]
+        folded_count = max(len(old) - self.digest_turns, 0) if self.summary_model is not None else 0
+        folded, digested = old[:folded_count], old[folded_count:]
+
+        keys = []
+        chain = ""
+        for turn in folded:
+            chain = hashlib.sha1((chain + _fingerprint(turn)).encode("utf-8")).hexdigest()
+            keys.append(chain)
+        # 同一轮的后续推理步骤沿用该轮第一步采用的摘要：后台摘要在轮中途完成时不切换，
+        # 同一轮内的各次请求互为前缀，能够命中模型的提示词缓存
+        turn_id = recent[-1][0].id
+        if turn_id in self._turn_summaries:
+            pinned = self._turn_summaries[turn_id]
+            covered = keys.index(pinned) if pinned in keys and pinned in self._summaries else -1
+        else:
+            covered = next((index for index in range(len(keys) - 1, -1, -1) if keys[index] in self._summaries), -1)
+            self._turn_summaries[turn_id] = keys[covered] if covered >= 0 else None
+            while len(self._turn_summaries) > self.max_summaries:
+                self._turn_summaries.popitem(last=False)
+        summary = None
+        if covered >= 0:
+            summary = self._summaries[keys[covered]]
+            self._summaries.move_to_end(keys[covered])
+        if covered < len(folded) - 1:
+            self._schedule(keys[-1], summary, folded[covered + 1:])
+
+        compressed = list(msgs[:starts[0]])
+        if summary:
+            compressed.append(self._summary_msg(keys[covered], summary))
+        for turn in folded[covered + 1:] + digested:
+            compressed.extend(self._cached(self._digests, msg, lambda m: _digest_msg(m, self.digest_chars))
+                              for msg in turn)
+        for turn in recent:
+            compressed.extend(turn)
+
+        self._record(msgs, compressed)
+        return compressed
+
+    def _cached(self, cache: OrderedDict[str, tuple[Any, int, Any]], msg: Msg, compute: Any) -> Any:
+        """按消息ID缓存的计算结果，消息内容仍是同一个对象且长度不变时复用"""
+        entry = cache.get(msg.id)
+        if entry is not None and entry[0] is msg.content and entry[1] == len(msg.content):
+            cache.move_to_end(msg.id)
+            return entry[2]
+        value = compute(msg)
+        cache[msg.id] = (msg.content, len(msg.content), value)
+        if len(cache) > self.max_cached:
+            cache.popitem(last=False)
+        return value
+
+    def _summary_msg(self, key: str, summary: str) -> Msg:
+        summary_msg = self._summary_msgs.get(key)
+        if summary_msg is None:
+            summary_msg = self._summary_msgs[key] = Msg("user", f"[此前对话摘要]\n{summary}", "user")
+            summary_msg.id = f"summary:{key}"
+            while len(self._summary_msgs) > self.max_summaries:
+                self._summary_msgs.popitem(last=False)
+        return summary_msg
+
+    def _count_tokens(self, msgs: list[Msg]) -> int:
+        return sum(self._cached(self._tokens, msg, lambda m: _msg_tokens([m])) for msg in msgs)
+
+    def _record(self, original: list[Msg], compressed: list[Msg]) -> None:
+        original_tokens = self._count_tokens(original)
+        compressed_tokens = original_tokens if compressed is original else self._count_tokens(compressed)
+        metrics.observe("context_tokens", original_tokens, stage="original")
+        metrics.observe("context_tokens", compressed_tokens, stage="compressed")
+        metrics.inc("context_tokens_saved", original_tokens - compressed_tokens)
+
+    def _schedule(self, key: str, previous: str | None, turns: list[list[Msg]]) -> None:
+        # 当前轮固定使用较旧的摘要时，已生成的新摘要留到下一轮使用，不重复生成
+        if key in self._pending or key in self._summaries:
+            return
+        self._pending.add(key)
+        task = asyncio.create_task(self._summarize(key, previous, turns))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _summarize(self, key: str, previous: str | None, turns: list[list[Msg]]) -> None:
+        lines = [f"已有摘要: {previous}"] if previous else []
+        for turn in turns:
+            for msg in turn:
+                msg = _digest_msg(msg, self.digest_chars)
+                text = msg.get_text_content() or ""
+                for block in msg.get_content_blocks("tool_use"):
+                    text += f" 调用 {block.get('name')}({json.dumps(block.get('input', {}), ensure_ascii=False)})"
+                for block in msg.get_content_blocks("tool_result"):
+                    text += f" 结果: {_tool_output_text(block.get('output'))}"
+                if text.strip():
+                    lines.append(f"{msg.role}: {text.strip()}")
+        try:
+            prompt = await self.summary_formatter.format([
+                Msg("system", _SUMMARY_PROMPT, "system"),
+                Msg("user", "\n".join(lines), "user"),
+            ])
+            res = await self.summary_model(prompt)
+            if not isinstance(res, ChatResponse):
+                last = None
+                async for chunk in res:
+                    last = chunk
+                res = last
+            summary = "".join(block.get("text", "") for block in (res.content if res else []) if block.get("type") == "text").strip()
+            if summary:
+                self._summaries[key] = summary
+                while len(self._summaries) > self.max_summaries:
+                    self._summaries.popitem(last=False)
+            metrics.inc("context_summaries", status="ok")
+        except Exception as e:
+            print(f"对话摘要生成失败: {e}")
+            metrics.inc("context_summaries", status="error")
+        finally:
+            self._pending.discard(key)
+
+
+class ContextCompressingFormatter(InstrumentedDashScopeChatFormatter):
+    """在格式化前用 ContextCompressor 压缩对话上下文的 DashScope 格式化器"""
+
+    def __init__(self, compressor: ContextCompressor, **kwargs: Any):
+        super().__init__(**kwargs)
+        self.compressor = compressor
+
+    async def format(self, msgs: list[Msg], **kwargs: Any) -> list[dict[str, Any]]:
+        return await super().format(self.compressor.compress(msgs), **kwargs)
@@ -0,0 +1,158 @@
+import asyncio
+import csv
+import os
+import re
+import unicodedata
+
+from typing import Any, Iterable
+from dotenv import load_dotenv
+from utils.cache import SQLiteStore, TTLCache, MISSING
+from utils.metrics import metrics
+
+
+load_dotenv('.env')
+
+# 城市名称 -> 和风天气城市信息 的缓存配置
+# GEOCODE_CACHE_PATH 为空时仅使用内存缓存
+GEOCODE_CACHE_PATH = os.environ.get("GEOCODE_CACHE_PATH", "")
+GEOCODE_CACHE_MAXSIZE = int(os.environ.get("GEOCODE_CACHE_MAXSIZE", "50000"))
+# 城市编码基本不变，默认永不过期（0）；查无此城市的结果缓存 GEOCODE_NEGATIVE_TTL 秒
+GEOCODE_TTL = float(os.environ.get("GEOCODE_TTL", "0"))
+GEOCODE_NEGATIVE_TTL = float(os.environ.get("GEOCODE_NEGATIVE_TTL", str(7 * 24 * 3600)))
+# 启动时预加载的城市列表（和风天气 LocationList 的CSV格式），为空则不预加载
+GEOCODE_PRELOAD_PATH = os.environ.get("GEOCODE_PRELOAD_PATH", "")
+
+geocode_cache = TTLCache(
+    name="geocode",
+    maxsize=GEOCODE_CACHE_MAXSIZE,
+    ttl=GEOCODE_TTL,
+    store=SQLiteStore(GEOCODE_CACHE_PATH) if GEOCODE_CACHE_PATH else None,
+)
+
+# 地名中常见的繁体字 -> 简体字，使繁简写法命中同一条缓存（并非完整的繁简转换表）
+_TRADITIONAL_TO_SIMPLIFIED = str.maketrans(
+    "臺東門廣灣龍華萬爾蘭馬亞倫漢慶陽島瀋蘇鄭濟寧興連烏魯齊濱營運陝貴嶺關鎮縣區鄉紐約風開豐鳳淵澤樂灘嶼義雲長韓國黃羅維薩頓聖滬廈滿",
+    "台东门广湾龙华万尔兰马亚伦汉庆阳岛沈苏郑济宁兴连乌鲁齐滨营运陕贵岭关镇县区乡纽约风开丰凤渊泽乐滩屿义云长韩国黄罗维萨顿圣沪厦满",
+)
+_SEPARATORS = re.compile(r"[\s\-_'’`·・.,，。、/]+")
+
+
+def normalize_location_name(name: str) -> str:
+    """规范化城市名称作为缓存键
+
+    - 全角/半角、大小写统一（NFKC + casefold）
+    - 去掉拉丁字母的变音符号（Zürich -> zurich），不影响日文假名等其他文字
+    - 常见繁体地名用字转为简体（臺北 -> 台北）
+    - 空白与连字符等分隔符统一为单个空格，去掉中文名称末尾的"市"（北京市 -> 北京）
+    """
+    text = unicodedata.normalize("NFKC", name).casefold()
+    chars: list[str] = []
+    for ch in unicodedata.normalize("NFD", text):
+        # 只去掉拉丁字母（U+0250 之前）上的组合符号
+        if unicodedata.combining(ch) and chars and chars[-1] < "\u0250":
+            continue
+        chars.append(ch)
+    text = unicodedata.normalize("NFC", "".join(chars)).translate(_TRADITIONAL_TO_SIMPLIFIED)
+    text = _SEPARATORS.sub(" ", text).strip()
+    if len(text) > 2 and text.endswith("市"):
+        text = text[:-1]
+    return text
+
+
+def city_aliases(city: dict[str, Any]) -> set[str]:
+    """城市记录的所有别名（规范化后），包括中文名与英文名"""
+    names = [city.get('name'), city.get('name_en'), *city.get('aliases', ())]
+    return {key for key in (normalize_location_name(name) for name in names if name) if key}
+
+
+async def get_cached_city(location_name: str) -> Any:
+    """查询缓存：命中返回城市信息，已知查无此城市返回 None，未缓存返回 MISSING"""
+    key = normalize_location_name(location_name)
+    city = await geocode_cache.aget(key)
+    if city is MISSING:
+        metrics.inc("geocode_lookups", source="miss")
+    else:
+        metrics.inc("geocode_lookups", source="hit" if city is not None else "negative")
+    return city
+
+
+def remember_city(location_name: str, city: dict[str, Any] | None) -> None:
+    """缓存查询结果
+
+    查到城市时同时写入查询词与城市的中英文名称，之后用任一写法查询都能命中；
+    city 为 None 表示上游确认查无此城市，按 GEOCODE_NEGATIVE_TTL 短期缓存。
+    """
+    key = normalize_location_name(location_name)
+    if city is None:
+        geocode_cache.set(key, None, ttl=GEOCODE_NEGATIVE_TTL)
+        return
+    entries = {alias: city for alias in city_aliases(city)}
+    entries[key] = city
+    geocode_cache.set_many(entries)
+
+
+def _city_entries(cities: Iterable[dict[str, Any]]) -> dict[str, dict[str, Any]]:
+    """城市记录 -> {别名: 城市}，不访问缓存，可在线程中执行"""
+    entries: dict[str, dict[str, Any]] = {}
+    for city in cities:
+        record = {key: value for key, value in city.items() if key != 'aliases'}
+        for alias in city_aliases(city):
+            # 重名时保留先出现的城市（LocationList 按行政级别排序，地级市在前）
+            entries.setdefault(alias, record)
+    return entries
+
+
+def preload_cities(cities: Iterable[dict[str, Any]]) -> int:
+    """批量预加载城市记录（需包含 id、name，可选 name_en、aliases 等），返回写入的别名数"""
+    entries = _city_entries(cities)
+    if entries:
+        geocode_cache.set_many(entries)
+    return len(entries)
+
+
+def _read_location_list(path: str) -> list[dict[str, Any]]:
+    """读取和风天气 LocationList CSV（如 China-City-List-latest.csv），跳过表头前的版本说明行"""
+    with open(path, newline='', encoding='utf-8-sig') as f:
+        lines = f.readlines()
+    start = next((i for i, line in enumerate(lines) if line.startswith('Location_ID')), 0)
+
+    cities = []
+    for row in csv.DictReader(lines[start:]):
+        if not row.get('Location_ID'):
+            continue
+        cities.append({
+            'id': row['Location_ID'],
+            'name': row.get('Location_Name_ZH') or row.get('Location_Name_EN', ''),
+            'name_en': row.get('Location_Name_EN', ''),
+            'country': row.get('Country_Region_ZH', ''),
+            'adm1': row.get('Adm1_Name_ZH', ''),
+            'adm2': row.get('Adm2_Name_ZH', ''),
+            'lat': row.get('Latitude', ''),
+            'lon': row.get('Longitude', ''),
+        })
+    return cities
+
+
+async def preload_city_list(path: str = GEOCODE_PRELOAD_PATH) -> int:
+    """从城市列表文件预加载缓存；文件未变化且已落盘时跳过，返回写入的别名数
+
+    文件解析与别名表构建在线程中进行，写入缓存回到事件循环中执行（缓存不是线程安全的）。
+    """
+    if not path:
+        return 0
+    marker = ('__preload__', os.path.abspath(path))
+    mtime = os.path.getmtime(path)
+    if geocode_cache.store is not None and await geocode_cache.aget(marker) == mtime:
+        return 0
+    entries = await asyncio.to_thread(lambda: _city_entries(_read_location_list(path)))
+    if entries:
+        geocode_cache.set_many(entries)
+    count = len(entries)
+    geocode_cache.set(marker, mtime, ttl=0)
+    print(f"城市编码预加载完成: {path}, {count} 个名称")
+    return count
+
+
+def get_geocode_cache_stats() -> dict[str, Any]:
+    """城市编码缓存的命中/未命中统计"""
+    return geocode_cache.stats()
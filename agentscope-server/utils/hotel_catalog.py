@@ -0,0 +1,417 @@
+import json
+import math
+import os
+import sqlite3
+import threading
+import time
+
+from typing import Any, Iterable
+from dotenv import load_dotenv
+
+
+load_dotenv('.env')
+
+# 本地酒店目录（酒店ID列表 + 投影后的酒店详情）
+# HOTEL_CATALOG_PATH 为空时不启用，所有查询直接走API
+HOTEL_CATALOG_PATH = os.environ.get("HOTEL_CATALOG_PATH", "")
+# 水位超过该时长未推进（同步停滞）时不再信任本地酒店列表，回退到API
+HOTEL_CATALOG_MAX_AGE = float(os.environ.get("HOTEL_CATALOG_MAX_AGE", str(24 * 3600)))
+
+# DIDA要求 lastUpdateTime 不小于 2024-12-01
+MIN_LAST_UPDATE_TIME = 1732982400
+
+_SCHEMA = (
+    # 国家 -> 酒店ID；updated_at 为最近一次在全量/增量列表中出现的同步时间，sync_id 用于全量同步后清理已下架酒店
+    "CREATE TABLE IF NOT EXISTS hotels ("
+    " country_code TEXT NOT NULL,"
+    " hotel_id INTEGER NOT NULL,"
+    " updated_at INTEGER NOT NULL,"
+    " sync_id INTEGER NOT NULL,"
+    " PRIMARY KEY (country_code, hotel_id))",
+    "CREATE INDEX IF NOT EXISTS idx_hotels_updated ON hotels (country_code, updated_at)",
+    # 酒店详情，常用字段单独成列便于检索，完整记录以JSON保存
+    "CREATE TABLE IF NOT EXISTS hotel_details ("
+    " hotel_id INTEGER NOT NULL,"
+    " language TEXT NOT NULL,"
+    " country_code TEXT,"
+    " destination_code TEXT,"
+    " destination_name TEXT,"
+    " name TEXT,"
+    " address TEXT,"
+    " latitude REAL,"
+    " longitude REAL,"
+    " star_rating REAL,"
+    " category TEXT,"
+    " brand TEXT,"
+    " data TEXT NOT NULL,"
+    " fetched_at REAL NOT NULL,"
+    " PRIMARY KEY (hotel_id, language))",
+    "CREATE INDEX IF NOT EXISTS idx_details_star ON hotel_details (language, star_rating)",
+    # 每个国家的同步水位
+    "CREATE TABLE IF NOT EXISTS sync_state ("
+    " country_code TEXT PRIMARY KEY,"
+    " high_water_mark INTEGER NOT NULL,"
+    " full_synced_at INTEGER NOT NULL,"
+    " hotel_count INTEGER NOT NULL,"
+    " last_run_at REAL NOT NULL)",
+)
+
+# 检索索引：名称/地址/目的地的全文索引（trigram分词，中英文均可做子串匹配）与经纬度R*Tree索引，
+# 均以 hotel_details 的 rowid 关联，由触发器随详情写入自动维护
+_INDEX_SCHEMA = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS hotel_fts USING fts5("
+    " name, address, destination_name,"
+    " content='hotel_details', content_rowid='rowid', tokenize='trigram')",
+    "CREATE VIRTUAL TABLE IF NOT EXISTS hotel_geo USING rtree(id, min_lat, max_lat, min_lon, max_lon)",
+    "CREATE TRIGGER IF NOT EXISTS hotel_details_ai AFTER INSERT ON hotel_details BEGIN"
+    " INSERT INTO hotel_fts (rowid, name, address, destination_name) VALUES (new.rowid, new.name, new.address, new.destination_name);"
+    " INSERT INTO hotel_geo SELECT new.rowid, new.latitude, new.latitude, new.longitude, new.longitude"
+    "  WHERE new.latitude IS NOT NULL AND new.longitude IS NOT NULL;"
+    " END",
+    "CREATE TRIGGER IF NOT EXISTS hotel_details_ad AFTER DELETE ON hotel_details BEGIN"
+    " INSERT INTO hotel_fts (hotel_fts, rowid, name, address, destination_name) VALUES ('delete', old.rowid, old.name, old.address, old.destination_name);"
+    " DELETE FROM hotel_geo WHERE id = old.rowid;"
+    " END",
+    "CREATE TRIGGER IF NOT EXISTS hotel_details_au AFTER UPDATE ON hotel_details BEGIN"
+    " INSERT INTO hotel_fts (hotel_fts, rowid, name, address, destination_name) VALUES ('delete', old.rowid, old.name, old.address, old.destination_name);"
+    " INSERT INTO hotel_fts (rowid, name, address, destination_name) VALUES (new.rowid, new.name, new.address, new.destination_name);"
+    " DELETE FROM hotel_geo WHERE id = old.rowid;"
+    " INSERT INTO hotel_geo SELECT new.rowid, new.latitude, new.latitude, new.longitude, new.longitude"
+    "  WHERE new.latitude IS NOT NULL AND new.longitude IS NOT NULL;"
+    " END",
+)
+
+# trigram 分词要求检索词至少3个字符，更短的检索词退化为 LIKE 匹配
+_FTS_MIN_QUERY_LENGTH = 3
+_EARTH_RADIUS_KM = 6371.0088
+DEFAULT_SEARCH_RADIUS_KM = 5.0
+
+
+def _brand_name(hotel: dict[str, Any]) -> str | None:
+    brand = hotel.get("brand")
+    if isinstance(brand, dict):
+        return brand.get("name")
+    return brand
+
+
+def _haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    d_phi = phi2 - phi1
+    d_lambda = math.radians(lon2 - lon1)
+    a = math.sin(d_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    return 2 * _EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+def _radius_bbox(latitude: float, longitude: float, radius_km: float) -> tuple[float, float, float, float]:
+    """半径对应的经纬度外接矩形 (min_lat, min_lon, max_lat, max_lon)，用于R*Tree预筛选"""
+    d_lat = math.degrees(radius_km / _EARTH_RADIUS_KM)
+    d_lon = d_lat / max(math.cos(math.radians(latitude)), 1e-6)
+    return latitude - d_lat, longitude - d_lon, latitude + d_lat, longitude + d_lon
+
+
+def _fts_phrase(query: str) -> str:
+    """把用户输入转为 FTS5 短语查询，多个词之间为 AND"""
+    terms = [term.replace('"', '""') for term in query.split()]
+    return " AND ".join(f'"{term}"' for term in terms)
+
+
+def _detail_row(hotel: dict[str, Any], language: str, now: float) -> tuple:
+    location = hotel.get("location") or {}
+    coordinate = location.get("coordinate") or {}
+    return (
+        hotel["id"],
+        language,
+        (location.get("country") or {}).get("code"),
+        (location.get("destination") or {}).get("code"),
+        hotel.get("name"),
+        location.get("address"),
+        coordinate.get("latitude"),
+        coordinate.get("longitude"),
+        hotel.get("starRating"),
+        (hotel.get("category") or {}).get("name"),
+        json.dumps(hotel, ensure_ascii=False, separators=(",", ":")),
+        now,
+        (location.get("destination") or {}).get("name"),
+        _brand_name(hotel),
+    )
+
+
+class HotelCatalog:
+    """基于SQLite的本地酒店目录镜像
+
+    由后台同步任务（utils.catalog_sync）写入，get_hotel_list / get_hotel_details 优先从这里读取。
+    所有方法都是同步的，批量写入请通过 asyncio.to_thread 调用，避免阻塞事件循环。
+    """
+
+    def __init__(self, path: str):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        for statement in _SCHEMA + _INDEX_SCHEMA:
+            self._conn.execute(statement)
+        self._conn.commit()
+
+    # ---- 同步水位 ----
+
+    def get_state(self, country_code: str) -> dict[str, Any] | None:
+        """读取国家的同步状态，未同步过时返回 None"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT high_water_mark, full_synced_at, hotel_count, last_run_at FROM sync_state WHERE country_code = ?",
+                (country_code,),
+            ).fetchone()
+        if row is None:
+            return None
+        return {
+            "country_code": country_code,
+            "high_water_mark": row[0],
+            "full_synced_at": row[1],
+            "hotel_count": row[2],
+            "last_run_at": row[3],
+        }
+
+    def get_fresh_state(self, country_code: str) -> dict[str, Any] | None:
+        """读取同步状态，未同步过或水位超过 HOTEL_CATALOG_MAX_AGE 时返回 None"""
+        state = self.get_state(country_code)
+        if state is None or time.time() - state["high_water_mark"] > HOTEL_CATALOG_MAX_AGE:
+            return None
+        return state
+
+    def _save_state(self, country_code: str, high_water_mark: int, full_synced_at: int) -> None:
+        count = self._conn.execute("SELECT COUNT(*) FROM hotels WHERE country_code = ?", (country_code,)).fetchone()[0]
+        self._conn.execute(
+            "INSERT OR REPLACE INTO sync_state (country_code, high_water_mark, full_synced_at, hotel_count, last_run_at)"
+            " VALUES (?, ?, ?, ?, ?)",
+            (country_code, high_water_mark, full_synced_at, count, time.time()),
+        )
+
+    # ---- 酒店ID列表 ----
+
+    def upsert_hotel_ids(self, country_code: str, hotel_ids: Iterable[int], updated_at: int, sync_id: int) -> None:
+        with self._lock:
+            self._conn.executemany(
+                "INSERT INTO hotels (country_code, hotel_id, updated_at, sync_id) VALUES (?, ?, ?, ?)"
+                " ON CONFLICT (country_code, hotel_id) DO UPDATE SET updated_at = excluded.updated_at, sync_id = excluded.sync_id",
+                ((country_code, hotel_id, updated_at, sync_id) for hotel_id in hotel_ids),
+            )
+            self._conn.commit()
+
+    def finish_full_sync(self, country_code: str, sync_id: int, high_water_mark: int) -> int:
+        """全量同步完成：删除本轮未出现的酒店并推进水位，返回删除条数"""
+        with self._lock:
+            cursor = self._conn.execute(
+                "DELETE FROM hotels WHERE country_code = ? AND sync_id != ?", (country_code, sync_id))
+            self._save_state(country_code, high_water_mark, high_water_mark)
+            self._conn.commit()
+        return cursor.rowcount
+
+    def finish_delta_sync(self, country_code: str, high_water_mark: int) -> None:
+        """增量同步完成：推进水位"""
+        state = self.get_state(country_code)
+        full_synced_at = state["full_synced_at"] if state else high_water_mark
+        with self._lock:
+            self._save_state(country_code, high_water_mark, full_synced_at)
+            self._conn.commit()
+
+    def count_hotel_ids(self, country_code: str, since: int | None = None) -> int:
+        with self._lock:
+            if since is None:
+                row = self._conn.execute("SELECT COUNT(*) FROM hotels WHERE country_code = ?", (country_code,)).fetchone()
+            else:
+                row = self._conn.execute(
+                    "SELECT COUNT(*) FROM hotels WHERE country_code = ? AND updated_at > ?", (country_code, since)).fetchone()
+        return row[0]
+
+    def list_hotel_ids(self, country_code: str, since: int | None = None, limit: int | None = None) -> list[int]:
+        """按ID顺序返回国家下的酒店ID，since 不为空时只返回该时间之后有变更的酒店"""
+        sql = "SELECT hotel_id FROM hotels WHERE country_code = ?"
+        args: list[Any] = [country_code]
+        if since is not None:
+            sql += " AND updated_at > ?"
+            args.append(since)
+        sql += " ORDER BY hotel_id"
+        if limit is not None:
+            sql += " LIMIT ?"
+            args.append(limit)
+        with self._lock:
+            return [row[0] for row in self._conn.execute(sql, args)]
+
+    # ---- 酒店详情 ----
+
+    def upsert_details(self, hotels: Iterable[dict[str, Any]], language: str) -> None:
+        now = time.time()
+        rows = [_detail_row(hotel, language, now) for hotel in hotels if hotel.get("id") is not None]
+        if not rows:
+            return
+        with self._lock:
+            # 使用 UPSERT 而不是 INSERT OR REPLACE，保持 rowid 不变并触发索引的更新触发器
+            self._conn.executemany(
+                "INSERT INTO hotel_details (hotel_id, language, country_code, destination_code, name, address,"
+                " latitude, longitude, star_rating, category, data, fetched_at, destination_name, brand)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+                " ON CONFLICT (hotel_id, language) DO UPDATE SET"
+                " country_code = excluded.country_code, destination_code = excluded.destination_code,"
+                " name = excluded.name, address = excluded.address, latitude = excluded.latitude,"
+                " longitude = excluded.longitude, star_rating = excluded.star_rating, category = excluded.category,"
+                " data = excluded.data, fetched_at = excluded.fetched_at,"
+                " destination_name = excluded.destination_name, brand = excluded.brand",
+                rows,
+            )
+            self._conn.commit()
+
+    def delete_details(self, hotel_ids: Iterable[int], language: str) -> None:
+        with self._lock:
+            self._conn.executemany(
+                "DELETE FROM hotel_details WHERE hotel_id = ? AND language = ?",
+                ((hotel_id, language) for hotel_id in hotel_ids),
+            )
+            self._conn.commit()
+
+    def get_details(self, hotel_ids: list[int], language: str) -> dict[int, dict[str, Any]]:
+        """批量读取酒店详情，返回 {hotel_id: 详情}，不存在的ID不会出现在结果中"""
+        found: dict[int, dict[str, Any]] = {}
+        # SQLite 单条语句的参数个数有限，按批查询
+        for start in range(0, len(hotel_ids), 500):
+            chunk = hotel_ids[start:start + 500]
+            placeholders = ",".join("?" * len(chunk))
+            with self._lock:
+                rows = self._conn.execute(
+                    f"SELECT hotel_id, data FROM hotel_details WHERE language = ? AND hotel_id IN ({placeholders})",
+                    (language, *chunk),
+                ).fetchall()
+            for hotel_id, data in rows:
+                found[hotel_id] = json.loads(data)
+        return found
+
+    def search(
+        self,
+        language: str,
+        query: str | None = None,
+        latitude: float | None = None,
+        longitude: float | None = None,
+        radius_km: float | None = None,
+        bbox: tuple[float, float, float, float] | None = None,
+        min_star: float | None = None,
+        max_star: float | None = None,
+        brand: str | None = None,
+        country_code: str | None = None,
+        destination_code: str | None = None,
+        limit: int = 20,
+    ) -> list[dict[str, Any]]:
+        """在本地目录中检索酒店，返回按相关度/距离排序的精简记录
+
+        - query: 名称、地址、目的地名称的全文检索，按 bm25 相关度排序
+        - latitude/longitude + radius_km: 半径检索（默认 DEFAULT_SEARCH_RADIUS_KM），按距离排序（与 query 同时使用时相关度只用于同距离排序）
+        - bbox: (min_lat, min_lon, max_lat, max_lon) 矩形检索
+        - min_star/max_star/brand/country_code/destination_code: 过滤条件，brand 同时匹配品牌与类别名称
+        """
+        joins: list[str] = []
+        where = ["d.language = ?"]
+        args: list[Any] = []
+        order = "d.hotel_id"
+        order_args: list[Any] = []
+        select_rank = "0"
+
+        if query and query.strip():
+            terms = query.split()
+            long_terms = [term for term in terms if len(term) >= _FTS_MIN_QUERY_LENGTH]
+            if long_terms:
+                joins.append("JOIN hotel_fts f ON f.rowid = d.rowid")
+                where.append("hotel_fts MATCH ?")
+                args.append(_fts_phrase(" ".join(long_terms)))
+                select_rank = "bm25(hotel_fts)"
+                order = "rank"
+            for term in terms:
+                if len(term) < _FTS_MIN_QUERY_LENGTH:
+                    where.append("(d.name LIKE ? OR d.address LIKE ? OR d.destination_name LIKE ?)")
+                    args.extend([f"%{term}%"] * 3)
+
+        center = latitude is not None and longitude is not None
+        if center:
+            radius_km = radius_km or DEFAULT_SEARCH_RADIUS_KM
+            bbox = _radius_bbox(latitude, longitude, radius_km)
+        if bbox is not None:
+            min_lat, min_lon, max_lat, max_lon = bbox
+            joins.append("JOIN hotel_geo g ON g.id = d.rowid")
+            where.append("g.min_lat >= ? AND g.max_lat <= ? AND g.min_lon >= ? AND g.max_lon <= ?")
+            args.extend([min_lat, max_lat, min_lon, max_lon])
+        if center:
+            # 候选按近似距离（经度差按纬度缩放后的平方和）排序，截取候选时保留离中心最近的酒店
+            order = "(d.latitude - ?) * (d.latitude - ?) + (d.longitude - ?) * (d.longitude - ?) * ?"
+            order_args = [latitude, latitude, longitude, longitude, math.cos(math.radians(latitude)) ** 2]
+
+        if min_star is not None:
+            where.append("d.star_rating >= ?")
+            args.append(min_star)
+        if max_star is not None:
+            where.append("d.star_rating <= ?")
+            args.append(max_star)
+        if brand:
+            where.append("(d.brand LIKE ? OR d.category LIKE ?)")
+            args.extend([f"%{brand}%"] * 2)
+        if country_code:
+            where.append("d.country_code = ?")
+            args.append(country_code)
+        if destination_code:
+            where.append("d.destination_code = ?")
+            args.append(destination_code)
+
+        sql = (
+            f"SELECT d.hotel_id, d.name, d.address, d.destination_name, d.star_rating, d.brand, d.category,"
+            f" d.latitude, d.longitude, {select_rank} AS rank"
+            f" FROM hotel_details d {' '.join(joins)} WHERE {' AND '.join(where)} ORDER BY {order}"
+        )
+        # 有中心点时需要在Python中算精确距离再排序，先多取候选
+        sql_limit = max(limit, 2000) if center else limit
+        sql += " LIMIT ?"
+        args.extend(order_args)
+        args.append(sql_limit)
+
+        params = [language, *args]
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+
+        results = []
+        for hotel_id, name, address, destination_name, star_rating, brand_name, category, lat, lon, rank in rows:
+            item: dict[str, Any] = {
+                "id": hotel_id,
+                "name": name,
+                "address": address,
+                "destination": destination_name,
+                "starRating": star_rating,
+                "brand": brand_name or category,
+                "latitude": lat,
+                "longitude": lon,
+            }
+            if center:
+                distance = _haversine_km(latitude, longitude, lat, lon)
+                if distance > radius_km:
+                    continue
+                item["distanceKm"] = round(distance, 3)
+            item["_rank"] = rank
+            results.append(item)
+
+        if center:
+            results.sort(key=lambda item: (item["distanceKm"], item["_rank"]))
+        for item in results:
+            del item["_rank"]
+        return results[:limit]
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            hotels = self._conn.execute("SELECT COUNT(*) FROM hotels").fetchone()[0]
+            details = self._conn.execute("SELECT COUNT(*) FROM hotel_details").fetchone()[0]
+            countries = self._conn.execute("SELECT COUNT(*) FROM sync_state").fetchone()[0]
+        return {"path": self.path, "countries": countries, "hotels": hotels, "details": details}
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+hotel_catalog: HotelCatalog | None = HotelCatalog(HOTEL_CATALOG_PATH) if HOTEL_CATALOG_PATH else None
@@ -0,0 +1,107 @@
+import asyncio
+import os
+
+from typing import Any
+from dotenv import load_dotenv
+from utils.batching import chunked, gather_chunks
+from utils.cache import TTLCache, MISSING
+from utils.hotel_catalog import hotel_catalog
+from utils.request import PostItems
+
+
+load_dotenv('.env')
+
+# DIDA酒店详情接口单次最多50个ID
+HOTEL_DETAILS_BATCH_SIZE = 50
+HOTEL_DETAILS_CONCURRENCY = int(os.environ.get("HOTEL_DETAILS_CONCURRENCY", "4"))
+HOTEL_DETAILS_CACHE_TTL = float(os.environ.get("HOTEL_DETAILS_CACHE_TTL", str(24 * 3600)))
+HOTEL_DETAILS_CACHE_MAXSIZE = int(os.environ.get("HOTEL_DETAILS_CACHE_MAXSIZE", "20000"))
+
+# 体积大且对选酒店帮助不大的字段，解析时直接丢弃
+HEAVY_FIELDS = ("policy", "facilities", "images", "rooms", "description", "zipCode")
+
+# 按 (hotelId, language) 缓存投影后的酒店详情
+hotel_detail_cache = TTLCache(
+    name="hotel_details",
+    maxsize=HOTEL_DETAILS_CACHE_MAXSIZE,
+    ttl=HOTEL_DETAILS_CACHE_TTL,
+)
+
+
+async def _fetch_details_chunk(hotel_ids: list[int], language: str) -> list[dict[str, Any]] | None:
+    request_data = {
+        "language": language,
+        "hotelIds": hotel_ids
+    }
+    return await PostItems("content", '/api/v1/hotel/details', params={}, data=request_data,
+                           exclude=HEAVY_FIELDS, coalesce=True)
+
+
+async def fetch_hotel_details(hotel_ids: list[int], language: str = "en-US",
+                              refresh: bool = False) -> tuple[list[dict[str, Any]], dict[str, Any]]:
+    """批量获取酒店详情（已投影，不含 HEAVY_FIELDS）
+
+    依次查内存缓存、本地酒店目录（启用时），只对仍缺失的ID按50个一批并发请求，
+    结果按 hotel_ids 的顺序合并；上游未返回的ID不会出现在结果中。
+
+    Args:
+        hotel_ids (list[int]): 酒店ID列表，不限数量
+        language (str): 语言代码
+        refresh (bool): 跳过缓存和本地目录，全部向上游请求（供目录同步使用）
+
+    Returns:
+        tuple: (酒店详情列表, 统计信息 {"cached", "catalog", "fetched", "batches", "failed_batches",
+                "failed_ids"（失败批次中的酒店ID）})
+    """
+    # 去重并保持顺序
+    unique_ids = list(dict.fromkeys(hotel_ids))
+
+    found: dict[int, dict[str, Any]] = {}
+    missing: list[int] = []
+    for hotel_id in unique_ids:
+        cached = MISSING if refresh else hotel_detail_cache.get((hotel_id, language))
+        if cached is MISSING:
+            missing.append(hotel_id)
+        else:
+            found[hotel_id] = cached
+
+    stats: dict[str, Any] = {"cached": len(found), "catalog": 0, "fetched": 0, "batches": 0, "failed_batches": 0,
+                             "failed_ids": []}
+
+    if missing and hotel_catalog is not None and not refresh:
+        from_catalog = await asyncio.to_thread(hotel_catalog.get_details, missing, language)
+        for hotel_id, hotel in from_catalog.items():
+            hotel_detail_cache.set((hotel_id, language), hotel)
+            found[hotel_id] = hotel
+        stats["catalog"] = len(from_catalog)
+        missing = [hotel_id for hotel_id in missing if hotel_id not in from_catalog]
+
+    if missing:
+        results = await gather_chunks(
+            missing,
+            HOTEL_DETAILS_BATCH_SIZE,
+            lambda chunk: _fetch_details_chunk(chunk, language),
+            concurrency=HOTEL_DETAILS_CONCURRENCY,
+        )
+        stats["batches"] = len(results)
+        fetched: list[dict[str, Any]] = []
+        for chunk, hotels in zip(chunked(missing, HOTEL_DETAILS_BATCH_SIZE), results):
+            if hotels is None:
+                stats["failed_batches"] += 1
+                stats["failed_ids"].extend(chunk)
+                continue
+            for hotel in hotels:
+                hotel_id = hotel.get("id")
+                if hotel_id is None:
+                    continue
+                # 刷新模式只更新已在内存中的记录，避免全量同步冲掉热点缓存
+                if not refresh or (hotel_id, language) in hotel_detail_cache:
+                    hotel_detail_cache.set((hotel_id, language), hotel)
+                found[hotel_id] = hotel
+                fetched.append(hotel)
+        stats["fetched"] = len(fetched)
+        # 未命中的详情回填到本地目录，下次直接命中
+        if fetched and hotel_catalog is not None and not refresh:
+            await asyncio.to_thread(hotel_catalog.upsert_details, fetched, language)
+
+    return [found[hotel_id] for hotel_id in unique_ids if hotel_id in found], stats
@@ -0,0 +1,86 @@
+import asyncio
+import os
+import httpx
+
+from dotenv import load_dotenv
+
+
+load_dotenv('.env')
+
+# 连接池配置（可通过 .env 覆盖）
+HTTP_MAX_CONNECTIONS = int(os.environ.get("HTTP_MAX_CONNECTIONS", "100"))
+HTTP_MAX_KEEPALIVE_CONNECTIONS = int(os.environ.get("HTTP_MAX_KEEPALIVE_CONNECTIONS", "20"))
+HTTP_KEEPALIVE_EXPIRY = float(os.environ.get("HTTP_KEEPALIVE_EXPIRY", "30"))
+HTTP_CONNECT_TIMEOUT = float(os.environ.get("HTTP_CONNECT_TIMEOUT", "5"))
+HTTP_READ_TIMEOUT = float(os.environ.get("HTTP_READ_TIMEOUT", "30"))
+HTTP_WRITE_TIMEOUT = float(os.environ.get("HTTP_WRITE_TIMEOUT", "10"))
+HTTP_POOL_TIMEOUT = float(os.environ.get("HTTP_POOL_TIMEOUT", "10"))
+HTTP2_ENABLED = os.environ.get("HTTP2_ENABLED", "true").lower() == "true"
+
+# HTTP/2 依赖 h2 包（httpx[http2]），未安装时退回 HTTP/1.1 keep-alive
+try:
+    import h2  # noqa: F401
+    _HTTP2_AVAILABLE = True
+except ImportError:
+    _HTTP2_AVAILABLE = False
+
+
+class HttpClientPool:
+    """按主机维护的 httpx.AsyncClient 连接池
+
+    每个上游主机（static-api.didatravel.com、api.didatravel.com、和风天气主机）
+    各自持有一个长连接客户端，同一 ReAct 步骤中的并行工具调用共享 TCP/TLS 连接，
+    且不会阻塞 AgentApp 的事件循环。
+    """
+
+    def __init__(
+        self,
+        max_connections: int = HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections: int = HTTP_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry: float = HTTP_KEEPALIVE_EXPIRY,
+        connect_timeout: float = HTTP_CONNECT_TIMEOUT,
+        read_timeout: float = HTTP_READ_TIMEOUT,
+        write_timeout: float = HTTP_WRITE_TIMEOUT,
+        pool_timeout: float = HTTP_POOL_TIMEOUT,
+        http2: bool = HTTP2_ENABLED,
+    ):
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self.timeout = httpx.Timeout(
+            connect=connect_timeout,
+            read=read_timeout,
+            write=write_timeout,
+            pool=pool_timeout,
+        )
+        self.http2 = http2 and _HTTP2_AVAILABLE
+        self._clients: dict[str, httpx.AsyncClient] = {}
+
+    def get(self, base_url: str) -> httpx.AsyncClient:
+        """获取（必要时创建）指定主机的客户端
+
+        Args:
+            base_url (str): 上游主机地址，例如 https://api.didatravel.com
+        """
+        client = self._clients.get(base_url)
+        if client is None or client.is_closed:
+            client = httpx.AsyncClient(
+                base_url=base_url,
+                limits=self.limits,
+                timeout=self.timeout,
+                http2=self.http2,
+            )
+            self._clients[base_url] = client
+        return client
+
+    async def aclose(self) -> None:
+        """关闭全部客户端，释放连接"""
+        clients = list(self._clients.values())
+        self._clients.clear()
+        await asyncio.gather(*(client.aclose() for client in clients), return_exceptions=True)
+
+
+# 进程级共享连接池
+http_pool = HttpClientPool()
@@ -0,0 +1,185 @@
+import os
+import time
+
+from typing import Any, AsyncGenerator
+from dotenv import load_dotenv
+
+from agentscope.agent import ReActAgent
+from agentscope.message import Msg, ToolUseBlock
+from agentscope.model import ChatResponse
+from agentscope.tool import ToolResponse
+from utils.metrics import metrics
+from utils.prompt_cache import CachedSchemaToolkit, IncrementalDashScopeChatFormatter
+from utils.prompt_prefix import PromptCachingDashScopeChatModel
+from utils.tracing import tracer
+
+
+load_dotenv('.env')
+
+# Prometheus 抓取路径与 http_request_duration_ms 的 service 标签（与 dida-flow Grafana 看板一致）
+METRICS_PATH = os.environ.get("METRICS_PATH", "/metrics")
+OTEL_SERVICE_NAME = os.environ.get("OTEL_SERVICE_NAME", "agentscope-server")
+
+# http_request_duration_ms 以毫秒为单位，SSE 响应会持续整个 ReAct 过程
+metrics.define_histogram("http_request_duration_ms", (10, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 20000, 30000, 60000, 120000))
+
+
+class InstrumentedReActAgent(ReActAgent):
+    """为推理（reasoning）与行动（acting）阶段记录追踪span与 agent_phase_seconds 直方图
+
+    每个工具调用的 acting span 作为当前上下文，工具内部的上游HTTP请求span会挂在其下。
+    """
+
+    async def _reasoning(self) -> Msg:
+        started = time.perf_counter()
+        status = "ok"
+        with tracer.start_as_current_span("reasoning", attributes={"agent.name": self.name}):
+            try:
+                return await super()._reasoning()
+            except BaseException:
+                status = "error"
+                raise
+            finally:
+                metrics.observe("agent_phase_seconds", time.perf_counter() - started, phase="reasoning", status=status)
+
+    async def _acting(self, tool_call: ToolUseBlock) -> Msg | None:
+        started = time.perf_counter()
+        status = "ok"
+        with tracer.start_as_current_span(f"acting {tool_call['name']}", attributes={
+            "agent.name": self.name,
+            "tool.name": tool_call["name"],
+            "tool.call_id": tool_call["id"],
+        }):
+            try:
+                return await super()._acting(tool_call)
+            except BaseException:
+                status = "error"
+                raise
+            finally:
+                metrics.observe("agent_phase_seconds", time.perf_counter() - started, phase="acting", status=status)
+
+
+class InstrumentedToolkit(CachedSchemaToolkit):
+    """记录每次工具调用从开始到最后一个结果分块的耗时（tool_call_seconds 直方图）"""
+
+    async def call_tool_function(self, tool_call: ToolUseBlock) -> AsyncGenerator[ToolResponse, None]:
+        started = time.perf_counter()
+        res = await super().call_tool_function(tool_call)
+        return self._timed(res, tool_call["name"], started)
+
+    @staticmethod
+    async def _timed(res: AsyncGenerator[ToolResponse, None], tool: str, started: float) -> AsyncGenerator[ToolResponse, None]:
+        status = "ok"
+        try:
+            async for chunk in res:
+                yield chunk
+        except BaseException:
+            status = "error"
+            raise
+        finally:
+            metrics.observe("tool_call_seconds", time.perf_counter() - started, tool=tool, status=status)
+
+
+class InstrumentedDashScopeChatModel(PromptCachingDashScopeChatModel):
+    """记录模型调用的首个分块耗时（model_first_chunk_seconds）、总耗时（model_call_seconds）与token用量"""
+
+    async def __call__(self, *args: Any, **kwargs: Any) -> ChatResponse | AsyncGenerator[ChatResponse, None]:
+        started = time.perf_counter()
+        try:
+            res = await super().__call__(*args, **kwargs)
+        except BaseException:
+            metrics.observe("model_call_seconds", time.perf_counter() - started, model=self.model_name, status="error")
+            raise
+        if isinstance(res, ChatResponse):
+            self._record(res, started, "ok")
+            return res
+        return self._timed(res, started)
+
+    async def _timed(self, res: AsyncGenerator[ChatResponse, None], started: float) -> AsyncGenerator[ChatResponse, None]:
+        last = None
+        status = "ok"
+        try:
+            async for chunk in res:
+                if last is None:
+                    metrics.observe("model_first_chunk_seconds", time.perf_counter() - started, model=self.model_name)
+                last = chunk
+                yield chunk
+        except BaseException:
+            status = "error"
+            raise
+        finally:
+            self._record(last, started, status)
+
+    def _record(self, res: ChatResponse | None, started: float, status: str) -> None:
+        metrics.observe("model_call_seconds", time.perf_counter() - started, model=self.model_name, status=status)
+        usage = getattr(res, "usage", None)
+        if usage is not None:
+            metrics.inc("model_tokens", usage.input_tokens, model=self.model_name, type="input")
+            metrics.inc("model_tokens", usage.output_tokens, model=self.model_name, type="output")
+
+
+class InstrumentedDashScopeChatFormatter(IncrementalDashScopeChatFormatter):
+    """记录每次把消息格式化为 DashScope 请求的耗时（formatter_format_seconds 直方图）"""
+
+    async def format(self, *args: Any, **kwargs: Any) -> list[dict[str, Any]]:
+        started = time.perf_counter()
+        try:
+            return await super().format(*args, **kwargs)
+        finally:
+            metrics.observe("formatter_format_seconds", time.perf_counter() - started, formatter=type(self).__name__)
+
+
+class RequestMetricsMiddleware:
+    """ASGI中间件：按路由、方法与状态码记录 http_request_duration_ms 直方图
+
+    耗时统计到响应体发送完毕，SSE 流式响应包含完整的 ReAct 过程。
+    """
+
+    def __init__(self, app: Any, service: str = OTEL_SERVICE_NAME):
+        self.app = app
+        self.service = service
+
+    async def __call__(self, scope: dict[str, Any], receive: Any, send: Any) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status_code = 500
+
+        async def send_with_status(message: dict[str, Any]) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            # 路由匹配后 scope["route"] 为路由对象，使用路由模板避免路径参数或随机404路径导致标签过多
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            metrics.observe("http_request_duration_ms", (time.perf_counter() - started) * 1000,
+                            service=self.service, route=route, method=scope.get("method", ""), code=status_code)
+
+
+async def _metrics_endpoint() -> Any:
+    from fastapi.responses import PlainTextResponse
+
+    return PlainTextResponse(metrics.render_prometheus(), media_type="text/plain; version=0.0.4")
+
+
+def instrument_app(app: Any) -> None:
+    """在 AgentApp 的启动回调中调用：注册 Prometheus 抓取端点，并统计每个HTTP请求的耗时
+
+    AgentApp.run 内部新建 FastAPI 应用且不接受中间件参数，启动回调执行时中间件栈已经构建，
+    因此直接包装已构建的中间件栈。
+
+    Args:
+        app: 启动回调收到的 FastAPI 应用
+    """
+    app.add_api_route(METRICS_PATH, _metrics_endpoint, methods=["GET"], include_in_schema=False)
+    if getattr(app, "middleware_stack", None) is None:
+        app.add_middleware(RequestMetricsMiddleware)
+    else:
+        app.middleware_stack = RequestMetricsMiddleware(app.middleware_stack)
+    print(f"Prometheus 指标端点: {METRICS_PATH}")
@@ -0,0 +1,122 @@
+import io
+import ijson
+
+from typing import Any, AsyncIterable, AsyncIterator, Iterable, Iterator
+from ijson.common import ObjectBuilder
+from utils.cache import MISSING
+
+
+def _is_excluded(path: str, excluded: tuple[str, ...]) -> bool:
+    for prefix in excluded:
+        if path == prefix or path.startswith(prefix + "."):
+            return True
+    return False
+
+
+class ItemProjector:
+    """按 prefix 组装元素的状态机，逐个接收 ijson 事件
+
+    被排除字段的整个子树事件直接跳过，不会构建成 Python 对象。
+    同步解析（project_events）与异步流式解析（aiter_items）共用此逻辑。
+    """
+
+    def __init__(self, prefix: str, exclude: Iterable[str] = ()):
+        self.prefix = prefix
+        self.excluded = tuple(f"{prefix}.{field}" for field in exclude)
+        self._builder: ObjectBuilder | None = None
+
+    def event(self, path: str, event: str, value: Any) -> Any:
+        """处理一个事件，元素组装完成时返回该元素，否则返回 MISSING"""
+        prefix = self.prefix
+        builder = self._builder
+        if builder is None:
+            if path == prefix and event in ("start_map", "start_array"):
+                self._builder = ObjectBuilder()
+                self._builder.event(event, value)
+            elif path == prefix:
+                # 标量元素
+                return value
+            return MISSING
+
+        if path == prefix and event in ("end_map", "end_array"):
+            builder.event(event, value)
+            self._builder = None
+            return builder.value
+
+        if self.excluded:
+            if event == "map_key" and path == prefix and f"{prefix}.{value}" in self.excluded:
+                return MISSING
+            if _is_excluded(path, self.excluded):
+                return MISSING
+
+        builder.event(event, value)
+        return MISSING
+
+
+def project_events(events: Iterable[tuple[str, str, Any]], prefix: str, exclude: Iterable[str] = ()) -> Iterator[Any]:
+    """从 ijson 事件流中逐个构建 prefix 处的元素，并在解析阶段丢弃 exclude 字段
+
+    Args:
+        events (Iterable): ijson.parse 产生的 (path, event, value) 事件
+        prefix (str): 元素路径，例如 'data.item' 表示顶层 data 数组的每个元素
+        exclude (Iterable[str]): 元素内需要丢弃的字段名，例如 ('policy', 'images')
+    """
+    projector = ItemProjector(prefix, exclude)
+    for path, event, value in events:
+        item = projector.event(path, event, value)
+        if item is not MISSING:
+            yield item
+
+
+def iter_items(data: bytes, prefix: str = "data.item", exclude: Iterable[str] = ()) -> Iterator[Any]:
+    """解析JSON字节串，按 prefix 逐个产出元素（可选字段投影）
+
+    Args:
+        data (bytes): 响应体
+        prefix (str): 元素路径，默认为顶层 data 数组的元素
+        exclude (Iterable[str]): 解析时丢弃的字段名
+    """
+    events = ijson.parse(io.BytesIO(data), use_float=True)
+    return project_events(events, prefix, exclude)
+
+
+async def aiter_items(chunks: AsyncIterable[bytes], prefix: str = "data.item", exclude: Iterable[str] = ()) -> AsyncIterator[Any]:
+    """增量解析异步字节流（如 httpx 的 response.aiter_bytes()），按 prefix 逐个产出元素
+
+    每收到一个数据块就推送给解析器，内存中只保留当前数据块和正在组装的元素，
+    不会持有完整响应体。
+
+    Args:
+        chunks (AsyncIterable[bytes]): 响应体数据块
+        prefix (str): 元素路径，默认为顶层 data 数组的元素
+        exclude (Iterable[str]): 解析时丢弃的字段名
+    """
+    events = ijson.sendable_list()
+    parser = ijson.parse_coro(events, use_float=True)
+    projector = ItemProjector(prefix, exclude)
+
+    async for chunk in chunks:
+        parser.send(chunk)
+        for path, event, value in events:
+            item = projector.event(path, event, value)
+            if item is not MISSING:
+                yield item
+        del events[:]
+
+    parser.close()
+    for path, event, value in events:
+        item = projector.event(path, event, value)
+        if item is not MISSING:
+            yield item
+
+
+async def abatched(items: AsyncIterable[Any], size: int) -> AsyncIterator[list[Any]]:
+    """将异步元素流按 size 分组，便于批量写入本地存储"""
+    batch: list[Any] = []
+    async for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
@@ -0,0 +1,120 @@
+import bisect
+import re
+import threading
+
+from typing import Any
+
+
+# 直方图默认分桶（秒），覆盖上游请求、工具调用与模型调用的常见耗时
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+def _label_key(labels: dict[str, Any]) -> tuple[tuple[str, str], ...]:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _prom_name(name: str) -> str:
+    return re.sub(r"[^a-zA-Z0-9_:]", "_", name)
+
+
+def _prom_labels(labels: tuple[tuple[str, str], ...], extra: tuple[tuple[str, str], ...] = ()) -> str:
+    pairs = [(_prom_name(k), v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+             for k, v in (*labels, *extra)]
+    return "{" + ",".join(f'{k}="{v}"' for k, v in pairs) + "}" if pairs else ""
+
+
+def _prom_value(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metrics:
+    """进程内指标注册表（计数器 / 仪表 / 直方图摘要）
+
+    各模块通过全局实例 metrics 上报，snapshot() 汇总为可JSON序列化的字典，
+    便于在日志或管理接口中查看；render_prometheus() 输出 Prometheus 文本格式供抓取。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: dict[str, dict[tuple, float]] = {}
+        self._gauges: dict[str, dict[tuple, float]] = {}
+        self._histograms: dict[str, dict[tuple, dict[str, Any]]] = {}
+        self._buckets: dict[str, tuple[float, ...]] = {}
+
+    def define_histogram(self, name: str, buckets: tuple[float, ...]) -> None:
+        """为直方图指定分桶上界（单位与观测值一致），未指定时使用 DEFAULT_BUCKETS"""
+        with self._lock:
+            self._buckets[name] = tuple(sorted(buckets))
+
+    def inc(self, name: str, value: float = 1, /, **labels: Any) -> None:
+        """计数器累加"""
+        key = _label_key(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def set_gauge(self, name: str, value: float, /, **labels: Any) -> None:
+        """设置仪表当前值"""
+        with self._lock:
+            self._gauges.setdefault(name, {})[_label_key(labels)] = value
+
+    def observe(self, name: str, value: float, /, **labels: Any) -> None:
+        """记录一次观测值（如耗时秒数）"""
+        key = _label_key(labels)
+        with self._lock:
+            bounds = self._buckets.get(name, DEFAULT_BUCKETS)
+            series = self._histograms.setdefault(name, {})
+            summary = series.get(key)
+            if summary is None:
+                summary = series[key] = {"count": 0, "sum": 0.0, "min": value, "max": value, "buckets": [0] * len(bounds)}
+            summary["count"] += 1
+            summary["sum"] += value
+            summary["min"] = min(summary["min"], value)
+            summary["max"] = max(summary["max"], value)
+            index = bisect.bisect_left(bounds, value)
+            if index < len(bounds):
+                summary["buckets"][index] += 1
+
+    def snapshot(self) -> dict[str, Any]:
+        """导出全部指标"""
+
+        def _flatten(series: dict[tuple, Any]) -> list[dict[str, Any]]:
+            return [{"labels": dict(key), "value": value} for key, value in series.items()]
+
+        with self._lock:
+            return {
+                "counters": {name: _flatten(series) for name, series in self._counters.items()},
+                "gauges": {name: _flatten(series) for name, series in self._gauges.items()},
+                "histograms": {name: _flatten({k: {**v, "buckets": list(v["buckets"])} for k, v in series.items()})
+                               for name, series in self._histograms.items()},
+            }
+
+    def render_prometheus(self) -> str:
+        """按 Prometheus 文本格式导出全部指标：计数器加 _total 后缀，直方图输出累计分桶、_sum 与 _count"""
+        lines: list[str] = []
+        with self._lock:
+            for name, series in self._counters.items():
+                metric = _prom_name(name) if name.endswith("_total") else _prom_name(name) + "_total"
+                lines.append(f"# TYPE {metric} counter")
+                lines.extend(f"{metric}{_prom_labels(key)} {_prom_value(value)}" for key, value in series.items())
+            for name, series in self._gauges.items():
+                metric = _prom_name(name)
+                lines.append(f"# TYPE {metric} gauge")
+                lines.extend(f"{metric}{_prom_labels(key)} {_prom_value(value)}" for key, value in series.items())
+            for name, series in self._histograms.items():
+                metric = _prom_name(name)
+                bounds = self._buckets.get(name, DEFAULT_BUCKETS)
+                lines.append(f"# TYPE {metric} histogram")
+                for key, summary in series.items():
+                    cumulative = 0
+                    for bound, count in zip(bounds, summary["buckets"]):
+                        cumulative += count
+                        lines.append(f"{metric}_bucket{_prom_labels(key, (('le', _prom_value(bound)),))} {cumulative}")
+                    lines.append(f"{metric}_bucket{_prom_labels(key, (('le', '+Inf'),))} {summary['count']}")
+                    lines.append(f"{metric}_sum{_prom_labels(key)} {_prom_value(summary['sum'])}")
+                    lines.append(f"{metric}_count{_prom_labels(key)} {summary['count']}")
+        return "\n".join(lines) + "\n"
+
+
+# 进程级共享指标
+metrics = Metrics()
@@ -0,0 +1,127 @@
+import copy
+import os
+
+from collections import OrderedDict
+from typing import Any
+from dotenv import load_dotenv
+
+from agentscope.formatter import DashScopeChatFormatter
+from agentscope.message import Msg
+from agentscope.tool import Toolkit
+from utils.metrics import metrics
+
+
+load_dotenv('.env')
+
+# 增量格式化缓存的消息条数（按消息ID，所有请求共享）
+FORMATTER_CACHE_SIZE = int(os.environ.get("FORMATTER_CACHE_SIZE", "4096"))
+
+
+class CachedSchemaToolkit(Toolkit):
+    """缓存 get_json_schemas() 结果的工具集
+
+    - 注册/移除工具、增删分组、设置扩展模型时 schema_version 递增，缓存按 (版本, 激活的分组) 保存，
+      工具路由在几种分组组合间切换时不需要重新生成
+    - 每个请求对工具集做的深拷贝共享已注册的工具函数与schema缓存，只复制分组的激活状态
+    - 注册了元工具 reset_equipped_tools 时其schema随分组变化，不做缓存
+    """
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.schema_version = 0
+        self._schema_cache: dict[tuple[int, tuple[str, ...]], list[dict]] = {}
+
+    def _bump(self) -> None:
+        self.schema_version += 1
+        self._schema_cache = {}
+
+    def register_tool_function(self, *args: Any, **kwargs: Any) -> None:
+        super().register_tool_function(*args, **kwargs)
+        self._bump()
+
+    def remove_tool_function(self, tool_name: str) -> None:
+        super().remove_tool_function(tool_name)
+        self._bump()
+
+    def create_tool_group(self, *args: Any, **kwargs: Any) -> None:
+        super().create_tool_group(*args, **kwargs)
+        self._bump()
+
+    def remove_tool_groups(self, group_names: str | list[str]) -> None:
+        super().remove_tool_groups(group_names)
+        self._bump()
+
+    def set_extended_model(self, *args: Any, **kwargs: Any) -> None:
+        super().set_extended_model(*args, **kwargs)
+        self._bump()
+
+    def clear(self) -> None:
+        super().clear()
+        self._bump()
+
+    def load_state_dict(self, state_dict: dict, strict: bool = True) -> None:
+        super().load_state_dict(state_dict, strict)
+        self._bump()
+
+    def get_json_schemas(self) -> list[dict]:
+        if "reset_equipped_tools" in self.tools:
+            return super().get_json_schemas()
+        key = (self.schema_version, tuple(name for name, group in self.groups.items() if group.active))
+        schemas = self._schema_cache.get(key)
+        if schemas is None:
+            schemas = self._schema_cache[key] = super().get_json_schemas()
+            metrics.inc("toolkit_schema_cache", result="miss")
+        else:
+            metrics.inc("toolkit_schema_cache", result="hit")
+        return list(schemas)
+
+    def __deepcopy__(self, memo: dict) -> "CachedSchemaToolkit":
+        clone = self.__class__.__new__(self.__class__)
+        memo[id(self)] = clone
+        for key, value in self.__dict__.items():
+            if key in ("tools", "_schema_cache"):
+                # 工具函数与生成的schema在注册后不再修改，副本之间共享
+                object.__setattr__(clone, key, dict(value))
+            else:
+                object.__setattr__(clone, key, copy.deepcopy(value, memo))
+        return clone
+
+
+class IncrementalDashScopeChatFormatter(DashScopeChatFormatter):
+    """按消息ID缓存格式化结果的 DashScope 格式化器
+
+    DashScopeChatFormatter 对每条消息的格式化互不依赖，ReAct 的每一步只新增少量消息，
+    因此已格式化过的消息直接复用，只格式化新增部分，也省去父类对整段历史的深拷贝。
+    缓存命中要求消息内容仍是同一个对象且长度不变（智能体只在消息写入记忆前修改内容）。
+    配置了 token_counter 与 max_tokens 时需要整体截断，退回父类的完整格式化。
+    """
+
+    def __init__(self, max_cached: int = FORMATTER_CACHE_SIZE, **kwargs: Any):
+        super().__init__(**kwargs)
+        self.max_cached = max_cached
+        self._formatted: OrderedDict[str, tuple[Any, int, list[dict[str, Any]]]] = OrderedDict()
+
+    async def format(self, msgs: list[Msg], **kwargs: Any) -> list[dict[str, Any]]:
+        if self.token_counter is not None and self.max_tokens is not None:
+            return await super().format(msgs, **kwargs)
+
+        self.assert_list_of_msgs(msgs)
+        formatted: list[dict[str, Any]] = []
+        hits = 0
+        for msg in msgs:
+            entry = self._formatted.get(msg.id)
+            if entry is not None and entry[0] is msg.content and entry[1] == len(msg.content):
+                self._formatted.move_to_end(msg.id)
+                hits += 1
+                items = entry[2]
+            else:
+                items = await self._format([msg])
+                self._formatted[msg.id] = (msg.content, len(msg.content), items)
+                if len(self._formatted) > self.max_cached:
+                    self._formatted.popitem(last=False)
+            # 返回浅拷贝，调用方（如模型对 content 的调整）不会改到缓存
+            formatted.extend(dict(item) for item in items)
+
+        metrics.inc("formatter_cache", hits, result="hit")
+        metrics.inc("formatter_cache", len(msgs) - hits, result="miss")
+        return formatted
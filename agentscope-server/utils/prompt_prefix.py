@@ -0,0 +1,161 @@
+import hashlib
+import json
+import os
+
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, AsyncGenerator
+from dotenv import load_dotenv
+
+from agentscope.model import ChatResponse, DashScopeChatModel
+from agentscope_runtime.engine.schemas.agent_schemas import ContentType, Message, TextContent
+from agentscope_runtime.engine.services.context_manager import ContextComposer
+from utils.metrics import metrics
+
+
+load_dotenv('.env')
+
+# 提示词前缀缓存方式：
+# - implicit: 只保证前缀字节稳定，依赖模型的隐式缓存（默认，不产生缓存创建费用）
+# - explicit: 在系统提示词上加 DashScope 显式缓存标记 cache_control；本轮已有工具调用时再标记当前用户消息
+# - off: 不做处理
+PROMPT_CACHE_MODE = os.environ.get("PROMPT_CACHE_MODE", "implicit").lower()
+
+metrics.define_histogram("model_cache_hit_ratio", (0.1, 0.25, 0.5, 0.75, 0.9, 1.0))
+
+_CACHE_CONTROL = {"type": "ephemeral"}
+# 记录最近出现过的前缀指纹数量，新指纹意味着服务端缓存未命中
+_MAX_PREFIXES = 64
+
+
+class StablePrefixContextComposer(ContextComposer):
+    """把记忆检索结果放在当前用户消息里，而不是插到会话历史最前面
+
+    运行时默认的 ContextComposer 把检索到的记忆放在历史之前，每次问题不同、记忆不同，
+    紧跟系统提示词之后的内容每轮都在变，提示词缓存只能命中系统提示词。这里改为把记忆附在
+    本次输入的副本上（会话存储中的原始输入不变），历史部分在各轮之间保持为稳定前缀。
+    """
+
+    @staticmethod
+    async def compose(request_input, session, memory_service=None, session_history_service=None, rag_service=None):
+        await ContextComposer.compose(request_input=request_input, session=session,
+                                      session_history_service=session_history_service, rag_service=rag_service)
+        if memory_service is None or not session.messages:
+            return
+
+        memories: list[Message] = await memory_service.search_memory(user_id=session.user_id, messages=request_input,
+                                                                     filters={"top_k": 5})
+        await memory_service.add_memory(user_id=session.user_id, messages=request_input, session_id=session.id)
+        texts = [content.text for memory in memories for content in (memory.content or [])
+                 if content.type == ContentType.TEXT and content.text]
+        if not texts:
+            return
+
+        current = session.messages[-1]
+        note = TextContent(type=ContentType.TEXT, text="[相关历史记录]\n" + "\n".join(texts))
+        session.messages[-1] = current.model_copy(update={"content": [note, *(current.content or [])]})
+
+
+def _with_cache_control(message: dict[str, Any]) -> dict[str, Any]:
+    content = message.get("content")
+    if isinstance(content, str):
+        blocks = [{"type": "text", "text": content, "cache_control": _CACHE_CONTROL}]
+    elif isinstance(content, list) and content and isinstance(content[-1], dict):
+        blocks = [*content[:-1], {**content[-1], "cache_control": _CACHE_CONTROL}]
+    else:
+        return message
+    return {**message, "content": blocks}
+
+
+def _usage_value(usage: Any, *path: str) -> int:
+    value = usage
+    for key in path:
+        if not value:
+            return 0
+        value = value.get(key) if isinstance(value, dict) else getattr(value, key, None)
+    return int(value or 0)
+
+
+class PromptCachingDashScopeChatModel(DashScopeChatModel):
+    """让请求的静态前缀字节稳定并利用 DashScope 上下文缓存的模型
+
+    - 消息排列为：系统提示词 → （工具定义由服务端模板放在系统提示词之后）→ 滚动对话摘要 → 历史 → 当前轮；
+      系统消息统一放到最前面，工具按注册顺序发送
+    - explicit 模式在最后一条系统消息上加 cache_control，这是所有请求共享的前缀；显式缓存的创建按高于普通输入的
+      价格计费，只有本轮已经进入工具调用（最后一条用户消息之后还有消息）、预计还有多个 ReAct 步骤时，
+      才在最后一条用户消息上再加标记，让后续步骤命中到当前问题为止的前缀
+    - 每次调用的缓存命中token数记入 model_cached_tokens、model_cache_creation_tokens 与 model_cache_hit_ratio，
+      前缀指纹是否出现过记入 prompt_prefix{result=seen|new}
+    """
+
+    def __init__(self, *args: Any, cache_mode: str = PROMPT_CACHE_MODE, **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        self.cache_mode = cache_mode
+        self._prefixes: OrderedDict[str, None] = OrderedDict()
+
+    def _arrange(self, messages: list[dict[str, Any]]) -> list[dict[str, Any]]:
+        system = [message for message in messages if message.get("role") == "system"]
+        rest = [message for message in messages if message.get("role") != "system"]
+        if self.cache_mode != "explicit":
+            return system + rest
+        if system:
+            system[-1] = _with_cache_control(system[-1])
+        last_user = next((index for index in range(len(rest) - 1, -1, -1) if rest[index].get("role") == "user"), None)
+        if last_user is not None and last_user < len(rest) - 1:
+            rest[last_user] = _with_cache_control(rest[last_user])
+        return system + rest
+
+    def _track_prefix(self, messages: list[dict[str, Any]], tools: list[dict] | None) -> None:
+        system = [message for message in messages if message.get("role") == "system"]
+        fingerprint = hashlib.sha1(json.dumps([system, tools or []], ensure_ascii=False).encode("utf-8")).hexdigest()
+        if fingerprint in self._prefixes:
+            self._prefixes.move_to_end(fingerprint)
+            metrics.inc("prompt_prefix", model=self.model_name, result="seen")
+            return
+        self._prefixes[fingerprint] = None
+        if len(self._prefixes) > _MAX_PREFIXES:
+            self._prefixes.popitem(last=False)
+        metrics.inc("prompt_prefix", model=self.model_name, result="new")
+
+    async def __call__(self, messages: list[dict[str, Any]], tools: list[dict] | None = None, *args: Any,
+                       **kwargs: Any) -> ChatResponse | AsyncGenerator[ChatResponse, None]:
+        if self.cache_mode != "off":
+            messages = self._arrange(messages)
+            self._track_prefix(messages, tools)
+        return await super().__call__(messages, tools, *args, **kwargs)
+
+    def _record_cache(self, usage: Any) -> None:
+        if not usage:
+            return
+        input_tokens = _usage_value(usage, "input_tokens")
+        cached = _usage_value(usage, "prompt_tokens_details", "cached_tokens")
+        created = _usage_value(usage, "prompt_tokens_details", "cache_creation_input_tokens")
+        metrics.inc("model_cached_tokens", cached, model=self.model_name)
+        metrics.inc("model_cache_creation_tokens", created, model=self.model_name)
+        if input_tokens:
+            metrics.observe("model_cache_hit_ratio", cached / input_tokens, model=self.model_name)
+
+    async def _parse_dashscope_stream_response(self, start_datetime: datetime, response: Any,
+                                               structured_model: Any = None) -> AsyncGenerator[ChatResponse, Any]:
+        last_usage = None
+
+        async def _peek() -> AsyncGenerator[Any, None]:
+            nonlocal last_usage
+            # 流式响应每个分块都带累计的 usage，取最后一个
+            if hasattr(response, "__aiter__"):
+                async for chunk in response:
+                    last_usage = getattr(chunk, "usage", None) or last_usage
+                    yield chunk
+            else:
+                for chunk in response:
+                    last_usage = getattr(chunk, "usage", None) or last_usage
+                    yield chunk
+
+        async for parsed in super()._parse_dashscope_stream_response(start_datetime, _peek(), structured_model):
+            yield parsed
+        self._record_cache(last_usage)
+
+    async def _parse_dashscope_generation_response(self, start_datetime: datetime, response: Any,
+                                                   structured_model: Any = None) -> ChatResponse:
+        self._record_cache(getattr(response, "usage", None))
+        return await super()._parse_dashscope_generation_response(start_datetime, response, structured_model)
@@ -0,0 +1,109 @@
+import os
+import time
+
+from datetime import datetime
+from typing import Any
+from dotenv import load_dotenv
+from utils.cache import SQLiteStore, TTLCache, MISSING
+from utils.metrics import metrics
+from utils.request import GetQWeather
+
+
+load_dotenv('.env')
+
+# 和风天气数据缓存配置
+# QWEATHER_CACHE_PATH 为空时仅使用内存缓存
+QWEATHER_CACHE_PATH = os.environ.get("QWEATHER_CACHE_PATH", "")
+QWEATHER_CACHE_MAXSIZE = int(os.environ.get("QWEATHER_CACHE_MAXSIZE", "20000"))
+# 按上游更新时间推算出的剩余有效期过短时，至少缓存该秒数，避免刚过期的数据被反复请求
+QWEATHER_CACHE_MIN_TTL = float(os.environ.get("QWEATHER_CACHE_MIN_TTL", "60"))
+
+# 各端点的更新周期（秒），按前缀匹配，先匹配先生效；0 表示永不过期
+QWEATHER_TTLS: list[tuple[str, float]] = [
+    ('/v7/minutely/', 5 * 60),
+    ('/v7/warning/', 5 * 60),
+    ('/v7/weather/now', 10 * 60),
+    ('/v7/weather/24h', 3600),
+    ('/v7/weather/72h', 3600),
+    ('/v7/weather/168h', 3600),
+    ('/v7/weather/', 4 * 3600),
+    ('/v7/air/now', 3600),
+    ('/v7/air/', 4 * 3600),
+    ('/v7/indices/', 4 * 3600),
+    ('/v7/astronomy/', 24 * 3600),
+    ('/v7/historical/', 0),
+]
+DEFAULT_QWEATHER_TTL = 10 * 60
+
+qweather_cache = TTLCache(
+    name="qweather",
+    maxsize=QWEATHER_CACHE_MAXSIZE,
+    ttl=DEFAULT_QWEATHER_TTL,
+    store=SQLiteStore(QWEATHER_CACHE_PATH) if QWEATHER_CACHE_PATH else None,
+)
+
+
+def endpoint_ttl(endpoint: str) -> float:
+    """端点对应的更新周期（秒）"""
+    for prefix, ttl in QWEATHER_TTLS:
+        if endpoint.startswith(prefix):
+            return ttl
+    return DEFAULT_QWEATHER_TTL
+
+
+def _parse_update_time(value: Any) -> float | None:
+    """解析 updateTime（如 2026-10-18T10:00+08:00）为时间戳，无法解析时返回 None"""
+    if not isinstance(value, str) or not value:
+        return None
+    try:
+        return datetime.fromisoformat(value).timestamp()
+    except ValueError:
+        return None
+
+
+def cache_ttl(endpoint: str, data: dict[str, Any], now: float | None = None) -> float:
+    """根据端点更新周期与响应中的 updateTime 计算缓存秒数
+
+    上游在 updateTime 之后一个周期内不会发布新数据，因此缓存到 updateTime + 周期为止，
+    所有会话对同一城市在一个刷新窗口内只请求一次上游；缺少 updateTime 时按完整周期缓存。
+    返回 0 表示永不过期。
+    """
+    period = endpoint_ttl(endpoint)
+    if period <= 0:
+        return 0
+    now = time.time() if now is None else now
+    updated_at = _parse_update_time(data.get('updateTime'))
+    if updated_at is None or updated_at > now:
+        return period
+    return max(min(updated_at + period - now, period), QWEATHER_CACHE_MIN_TTL)
+
+
+async def GetQWeatherCached(endpoint: str, params: dict[str, Any]) -> dict[str, Any] | None:
+    """带缓存的和风天气数据查询
+
+    缓存键为 (endpoint, 排序后的参数)，有效期按端点更新周期与 updateTime 计算，
+    请求失败（None）不会写入缓存；并发的未命中请求由 GetQWeather 合并为一次上游调用。
+
+    Args:
+        endpoint (str): API端点路径，例如 '/v7/weather/3d'
+        params (dict): 请求参数
+
+    Returns:
+        dict: API响应数据或None，调用方不应原地修改
+    """
+    key = (endpoint, tuple(sorted((name, str(value)) for name, value in params.items())))
+    cached = await qweather_cache.aget(key)
+    if cached is not MISSING:
+        metrics.inc("qweather_cache", result="hit", endpoint=endpoint)
+        return cached
+
+    metrics.inc("qweather_cache", result="miss", endpoint=endpoint)
+    data = await GetQWeather(endpoint, params)
+    if data is not None:
+        qweather_cache.set(key, data, ttl=cache_ttl(endpoint, data))
+    return data
+
+
+def get_qweather_cache_stats() -> dict[str, Any]:
+    """和风天气数据缓存的命中/未命中统计"""
+    return qweather_cache.stats()
@@ -0,0 +1,192 @@
+import asyncio
+import os
+import time
+
+from typing import Any
+from dotenv import load_dotenv
+from utils.batching import chunked, gather_chunks
+from utils.cache import TTLCache, MISSING
+from utils.metrics import metrics
+from utils.request import Post, ClientID, LicenseKey
+
+
+load_dotenv('.env')
+
+# 价格缓存配置
+# RATE_CACHE_TTL 内视为新鲜；开启 RATE_CACHE_SWR 后，过期但仍在 RATE_CACHE_STALE_TTL 内的价格
+# 会立即返回，同时在后台重新询价
+RATE_CACHE_TTL = float(os.environ.get("RATE_CACHE_TTL", "180"))
+RATE_CACHE_STALE_TTL = float(os.environ.get("RATE_CACHE_STALE_TTL", "600"))
+RATE_CACHE_SWR = os.environ.get("RATE_CACHE_SWR", "false").lower() == "true"
+RATE_CACHE_MAXSIZE = int(os.environ.get("RATE_CACHE_MAXSIZE", "50000"))
+CITY_INDEX_TTL = float(os.environ.get("CITY_INDEX_TTL", str(6 * 3600)))
+RATE_SEARCH_BATCH_SIZE = int(os.environ.get("RATE_SEARCH_BATCH_SIZE", "50"))
+RATE_SEARCH_CONCURRENCY = int(os.environ.get("RATE_SEARCH_CONCURRENCY", "4"))
+# 城市查询中未缓存酒店占比超过该值时改为整城询价
+CITY_REFETCH_RATIO = float(os.environ.get("CITY_REFETCH_RATIO", "0.5"))
+
+# (hotelId, check_in, check_out, nationality, currency) -> (酒店价格条目或None, 询价时间)
+# None 表示该酒店在这组条件下无可售价格（负缓存）
+rate_cache = TTLCache(name="rates", maxsize=RATE_CACHE_MAXSIZE, ttl=max(RATE_CACHE_TTL, RATE_CACHE_STALE_TTL))
+# city_code -> 该城市询价返回过的酒店ID列表
+city_hotel_index = TTLCache(name="city_hotels", maxsize=10000, ttl=CITY_INDEX_TTL)
+
+_refresh_tasks: set[asyncio.Task] = set()
+
+
+def _build_request(check_in_date: str, check_out_date: str, currency: str, nationality: str,
+                   city_code: str | None = None, hotel_ids: list[int] | None = None) -> dict[str, Any]:
+    request_data: Any = {
+        "Header": {
+            "ClientID": ClientID,
+            "LicenseKey": LicenseKey
+        },
+        "CheckInDate": check_in_date,
+        "CheckOutDate": check_out_date,
+        "LowestPriceOnly": True,  # 必须设置为true，表示只返回最低价
+        "Nationality": nationality,
+        "Currency": currency
+    }
+
+    # 添加目的地或酒店ID参数
+    if city_code:
+        request_data["Destination"] = {
+            "CityCode": city_code
+        }
+    elif hotel_ids:
+        request_data["HotelIDList"] = hotel_ids
+    return request_data
+
+
+async def _price_search(request_data: dict[str, Any]) -> dict[str, Any] | None:
+    return await Post("booking", '/api/rate/pricesearch',
+                      params={"$format": "json"}, data=request_data, coalesce=True)
+
+
+def _hotel_list(res: dict[str, Any]) -> list[dict[str, Any]]:
+    return res["Success"].get("PriceDetails", {}).get("HotelList", [])
+
+
+def _store(conditions: tuple, requested_ids: list[int] | None, hotel_list: list[dict[str, Any]]) -> None:
+    """写入价格缓存；按ID询价时，未返回价格的酒店记为无价（负缓存）"""
+    now = time.time()
+    for hotel in hotel_list:
+        hotel_id = hotel.get("HotelID")
+        if hotel_id is not None:
+            rate_cache.set((hotel_id, *conditions), (hotel, now))
+    if requested_ids:
+        returned = {hotel.get("HotelID") for hotel in hotel_list}
+        for hotel_id in requested_ids:
+            if hotel_id not in returned:
+                rate_cache.set((hotel_id, *conditions), (None, now))
+
+
+async def _fetch_by_ids(conditions: tuple, hotel_ids: list[int]) -> tuple[list[dict[str, Any]], list[dict[str, Any] | None]]:
+    """按ID分批并发询价并写入缓存，返回 (价格条目, 失败批次的响应)"""
+    check_in_date, check_out_date, nationality, currency = conditions
+
+    async def _fetch(chunk: list[int]) -> dict[str, Any] | None:
+        return await _price_search(_build_request(check_in_date, check_out_date, currency, nationality, hotel_ids=chunk))
+
+    results = await gather_chunks(hotel_ids, RATE_SEARCH_BATCH_SIZE, _fetch, concurrency=RATE_SEARCH_CONCURRENCY)
+
+    hotels: list[dict[str, Any]] = []
+    errors: list[dict[str, Any] | None] = []
+    for chunk_ids, res in zip(chunked(hotel_ids, RATE_SEARCH_BATCH_SIZE), results):
+        if res is None or "Success" not in res:
+            errors.append(res)
+            continue
+        chunk_hotels = _hotel_list(res)
+        _store(conditions, chunk_ids, chunk_hotels)
+        hotels.extend(chunk_hotels)
+    return hotels, errors
+
+
+def _refresh_in_background(conditions: tuple, hotel_ids: list[int]) -> None:
+    async def _refresh() -> None:
+        try:
+            await _fetch_by_ids(conditions, hotel_ids)
+            metrics.inc("rate_cache_background_refresh")
+        except Exception as e:
+            print(f"后台刷新价格失败: {e}")
+
+    task = asyncio.create_task(_refresh())
+    _refresh_tasks.add(task)
+    task.add_done_callback(_refresh_tasks.discard)
+
+
+async def search_lowest_prices(
+    check_in_date: str,
+    check_out_date: str,
+    currency: str,
+    nationality: str = "CN",
+    city_code: str | None = None,
+    hotel_ids: list[int] | None = None,
+    stale_while_revalidate: bool = RATE_CACHE_SWR,
+) -> tuple[dict[str, Any] | None, dict[str, int]]:
+    """带缓存的最低价查询
+
+    - 按 (hotelId, 入住, 离店, 国籍, 币种) 缓存每家酒店的最低价，只对未缓存的酒店向上游询价
+    - 城市查询通过 city_code -> hotelIds 索引转换为按ID查询，首次查询城市时建立索引
+    - stale_while_revalidate 开启时，过期价格立即返回并在后台刷新
+
+    Returns:
+        tuple: (与上游格式一致的响应 {"Success": {"PriceDetails": {"HotelList": [...]}}} 或错误响应/None,
+                统计信息 {"cached", "stale", "fetched"})
+    """
+    conditions = (check_in_date, check_out_date, nationality, currency)
+    stats = {"cached": 0, "stale": 0, "fetched": 0}
+
+    if city_code:
+        indexed = city_hotel_index.get(city_code)
+        hotel_ids = [] if indexed is MISSING else indexed
+
+    now = time.time()
+    found: dict[int, dict[str, Any] | None] = {}
+    missing: list[int] = []
+    stale: list[int] = []
+    for hotel_id in dict.fromkeys(hotel_ids or []):
+        cached = rate_cache.get((hotel_id, *conditions))
+        if cached is MISSING:
+            missing.append(hotel_id)
+            continue
+        hotel, fetched_at = cached
+        if now - fetched_at < RATE_CACHE_TTL:
+            found[hotel_id] = hotel
+            stats["cached"] += 1
+        elif stale_while_revalidate:
+            found[hotel_id] = hotel
+            stale.append(hotel_id)
+            stats["stale"] += 1
+        else:
+            missing.append(hotel_id)
+
+    if city_code and (not hotel_ids or len(missing) > CITY_REFETCH_RATIO * len(hotel_ids)):
+        # 首次查询该城市，或大部分酒店未缓存：整城询价（比按ID分批更省请求）并刷新索引
+        metrics.inc("rate_cache_hotels", len(missing), result="miss")
+        res = await _price_search(_build_request(check_in_date, check_out_date, currency, nationality, city_code=city_code))
+        if res is None or "Success" not in res:
+            return res, stats
+        hotel_list = _hotel_list(res)
+        _store(conditions, None, hotel_list)
+        city_hotel_index.set(city_code, [hotel.get("HotelID") for hotel in hotel_list if hotel.get("HotelID") is not None])
+        return res, {"cached": 0, "stale": 0, "fetched": len(hotel_list)}
+
+    errors: list[dict[str, Any] | None] = []
+    if missing:
+        fetched, errors = await _fetch_by_ids(conditions, missing)
+        for hotel in fetched:
+            found[hotel.get("HotelID")] = hotel
+        stats["fetched"] = len(fetched)
+    if stale:
+        _refresh_in_background(conditions, stale)
+
+    metrics.inc("rate_cache_hotels", stats["cached"], result="hit")
+    metrics.inc("rate_cache_hotels", stats["stale"], result="stale")
+    metrics.inc("rate_cache_hotels", len(missing), result="miss")
+
+    hotel_list = [hotel for hotel_id in dict.fromkeys(hotel_ids or []) if (hotel := found.get(hotel_id)) is not None]
+    if not hotel_list and errors:
+        # 没有任何可用价格且有批次失败时，返回上游的错误响应（或None）
+        return errors[0], stats
+    return {"Success": {"PriceDetails": {"HotelList": hotel_list}}}, stats
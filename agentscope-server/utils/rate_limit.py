@@ -0,0 +1,157 @@
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+
+from urllib.parse import urlparse
+from dotenv import load_dotenv
+
+from utils.metrics import metrics
+
+
+load_dotenv('.env')
+
+# 每类上游接口的客户端限速：RATE_LIMIT_<CLASS> 为每秒请求数（0 表示不限速），
+# RATE_LIMIT_<CLASS>_BURST 为允许的突发请求数（令牌桶容量）
+RATE_LIMITS = {
+    kind: (float(os.environ.get(f"RATE_LIMIT_{kind.upper()}", default)),
+           float(os.environ.get(f"RATE_LIMIT_{kind.upper()}_BURST", burst)))
+    for kind, default, burst in (("content", "20", "40"), ("booking", "10", "20"), ("qweather", "20", "40"))
+}
+# 多个 worker 进程共享配额时设置为同一个SQLite文件路径；为空时只在进程内限速
+RATE_LIMIT_SHARED_PATH = os.environ.get("RATE_LIMIT_SHARED_PATH", "")
+
+
+class _SharedBuckets:
+    """SQLite中的令牌桶状态，多个进程通过 BEGIN IMMEDIATE 串行地取令牌"""
+
+    def __init__(self, path: str):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=5, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS rate_buckets ("
+            " name TEXT PRIMARY KEY,"
+            " tokens REAL NOT NULL,"
+            " updated_at REAL NOT NULL)"
+        )
+
+    def take(self, name: str, rate: float, burst: float, tokens: float) -> tuple[float, float]:
+        """尝试取 tokens 个令牌，返回 (需要等待的秒数，0表示已取到, 剩余令牌数)"""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                now = time.time()
+                row = self._conn.execute("SELECT tokens, updated_at FROM rate_buckets WHERE name = ?", (name,)).fetchone()
+                available = burst if row is None else min(burst, row[0] + (now - row[1]) * rate)
+                wait = 0.0 if available >= tokens else (tokens - available) / rate
+                if wait == 0.0:
+                    available -= tokens
+                self._conn.execute("INSERT OR REPLACE INTO rate_buckets (name, tokens, updated_at) VALUES (?, ?, ?)",
+                                   (name, available, now))
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return wait, available
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class TokenBucket:
+    """令牌桶限速器
+
+    - 以 rate 个/秒的速度补充令牌，最多积累 burst 个，突发请求在容量内立即放行
+    - 令牌不足时排队等待而不是失败；asyncio.Lock 按到达顺序唤醒，先到的请求先取到令牌
+    - 配置了 shared 时令牌桶状态保存在SQLite中，多个 worker 进程共享同一配额
+    """
+
+    def __init__(self, name: str, rate: float, burst: float, shared: _SharedBuckets | None = None):
+        self.name = name
+        self.rate = rate
+        self.burst = max(burst, 1.0)
+        self.shared = shared
+        self._tokens = self.burst
+        self._updated_at = time.monotonic()
+        self._lock = asyncio.Lock()
+        self.waiting = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.rate > 0
+
+    def _take(self, tokens: float) -> tuple[float, float]:
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated_at) * self.rate)
+        self._updated_at = now
+        if self._tokens >= tokens:
+            self._tokens -= tokens
+            return 0.0, self._tokens
+        return (tokens - self._tokens) / self.rate, self._tokens
+
+    async def acquire(self, tokens: float = 1.0) -> float:
+        """取得令牌后返回，返回排队等待的秒数"""
+        if not self.enabled:
+            return 0.0
+
+        started = time.monotonic()
+        self.waiting += 1
+        metrics.set_gauge("rate_limit_waiting", self.waiting, limiter=self.name)
+        try:
+            async with self._lock:
+                while True:
+                    if self.shared is not None:
+                        wait, available = await asyncio.to_thread(self.shared.take, self.name, self.rate, self.burst, tokens)
+                    else:
+                        wait, available = self._take(tokens)
+                    if wait == 0.0:
+                        break
+                    await asyncio.sleep(wait)
+        finally:
+            self.waiting -= 1
+            metrics.set_gauge("rate_limit_waiting", self.waiting, limiter=self.name)
+
+        waited = time.monotonic() - started
+        metrics.inc("rate_limit_acquired", tokens, limiter=self.name)
+        metrics.observe("rate_limit_wait_seconds", waited, limiter=self.name)
+        # 利用率：令牌桶已被消耗的比例，持续接近1表示请求速率贴近上限
+        metrics.set_gauge("rate_limit_utilization", round(1 - available / self.burst, 4), limiter=self.name)
+        return waited
+
+    def stats(self) -> dict[str, object]:
+        return {"rate": self.rate, "burst": self.burst, "waiting": self.waiting,
+                "tokens": round(self._tokens, 2) if self.shared is None else None}
+
+
+class RateLimiterRegistry:
+    """按接口类别与上游主机维护令牌桶，进程内所有asyncio任务共享"""
+
+    def __init__(self, limits: dict[str, tuple[float, float]] = RATE_LIMITS, shared_path: str = RATE_LIMIT_SHARED_PATH):
+        self.limits = limits
+        self.shared = _SharedBuckets(shared_path) if shared_path else None
+        self._limiters: dict[str, TokenBucket] = {}
+
+    def get(self, kind: str, url: str) -> TokenBucket:
+        """获取接口类别 kind（content/booking/qweather）访问 url 所在主机的令牌桶"""
+        name = f"{kind}@{urlparse(url).netloc or url}"
+        limiter = self._limiters.get(name)
+        if limiter is None:
+            rate, burst = self.limits.get(kind, (0.0, 1.0))
+            limiter = self._limiters[name] = TokenBucket(name, rate, burst, self.shared)
+        return limiter
+
+    def stats(self) -> dict[str, dict[str, object]]:
+        return {name: limiter.stats() for name, limiter in self._limiters.items()}
+
+    def close(self) -> None:
+        if self.shared is not None:
+            self.shared.close()
+
+
+rate_limiters = RateLimiterRegistry()
@@ -0,0 +1,66 @@
+import os
+
+from typing import Any
+from dotenv import load_dotenv
+from utils.cache import SQLiteStore, TTLCache, MISSING
+from utils.request import Get
+
+
+load_dotenv('.env')
+
+# 参考数据缓存配置
+# REFERENCE_CACHE_PATH 为空时仅使用内存缓存
+REFERENCE_CACHE_PATH = os.environ.get("REFERENCE_CACHE_PATH", "")
+REFERENCE_CACHE_MAXSIZE = int(os.environ.get("REFERENCE_CACHE_MAXSIZE", "2048"))
+
+# 各端点的缓存时长（秒），国家/字典几乎不变，目的地偶有新增
+REFERENCE_TTLS: dict[str, float] = {
+    '/api/v1/region/countries': 7 * 24 * 3600,
+    '/api/v1/region/destinations': 24 * 3600,
+    '/api/v1/dictionary/meal-types': 7 * 24 * 3600,
+    '/api/v1/dictionary/bed-types': 7 * 24 * 3600,
+    '/api/v1/dictionary/window-types': 7 * 24 * 3600,
+    '/api/v1/dictionary/smoking-types': 7 * 24 * 3600,
+    '/api/v1/dictionary/view-types': 7 * 24 * 3600,
+}
+DEFAULT_REFERENCE_TTL = 24 * 3600
+
+reference_cache = TTLCache(
+    name="reference",
+    maxsize=REFERENCE_CACHE_MAXSIZE,
+    ttl=DEFAULT_REFERENCE_TTL,
+    store=SQLiteStore(REFERENCE_CACHE_PATH) if REFERENCE_CACHE_PATH else None,
+)
+
+
+async def GetReference(path: str, language: str, countryCode: str | None = None) -> dict[str, Any] | None:
+    """带缓存的DIDA字典/区域数据查询
+
+    缓存键为 (endpoint, language, countryCode)，请求失败（None）不会写入缓存。
+
+    Args:
+        path (str): 端点路径，例如 '/api/v1/dictionary/bed-types'
+        language (str): 语言代码
+        countryCode (str, optional): 国家代码，仅目的地接口需要
+
+    Returns:
+        dict: API响应数据或None，调用方不应原地修改
+    """
+    key = (path, language, countryCode)
+    cached = await reference_cache.aget(key)
+    if cached is not MISSING:
+        return cached
+
+    params = {"language": language}
+    if countryCode is not None:
+        params["countryCode"] = countryCode
+
+    res = await Get("content", path, params=params, coalesce=True)
+    if res is not None:
+        reference_cache.set(key, res, ttl=REFERENCE_TTLS.get(path, DEFAULT_REFERENCE_TTL))
+    return res
+
+
+def get_reference_cache_stats() -> dict[str, Any]:
+    """参考数据缓存的命中/未命中统计"""
+    return reference_cache.stats()
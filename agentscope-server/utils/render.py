@@ -0,0 +1,185 @@
+import json
+import os
+import random
+
+from typing import Any
+from dotenv import load_dotenv
+from utils.metrics import metrics
+
+
+load_dotenv('.env')
+
+# 工具结果的默认token预算，以及按工具覆盖的预算，例如 "get_hotel_details=6000,get_countries=3000"
+TOOL_TOKEN_BUDGET = int(os.environ.get("TOOL_TOKEN_BUDGET", "4000"))
+TOOL_TOKEN_BUDGETS: dict[str, int] = {
+    name.strip(): int(value)
+    for name, _, value in (item.partition("=") for item in os.environ.get("TOOL_TOKEN_BUDGETS", "").split(","))
+    if name.strip() and value.strip()
+}
+
+# 节省量指标需要构建 repr(data) 作为基线，只对该比例的调用计算，计数按比例放大
+RENDER_METRICS_SAMPLE_RATE = float(os.environ.get("RENDER_METRICS_SAMPLE_RATE", "0.05"))
+
+# 对模型无用的追踪类字段，渲染时丢弃
+NOISE_KEYS = frozenset({"traceId", "timestamp", "fxLink", "refer", "sources", "license"})
+
+# 记录数不少于该值的同构记录列表才转为表格，否则直接输出紧凑JSON
+_MIN_TABLE_ROWS = 2
+
+
+def estimate_tokens(text: str) -> int:
+    """粗略估算token数：ASCII约4字符/token，中日韩等非ASCII字符约1字符/token"""
+    non_ascii = sum(1 for ch in text if ord(ch) > 127)
+    return (len(text) - non_ascii + 3) // 4 + non_ascii
+
+
+def _compact_json(value: Any) -> str:
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"), default=str)
+
+
+def _flatten(record: dict[str, Any], prefix: str = "") -> dict[str, Any]:
+    """嵌套对象展开为点号路径，例如 location.coordinate.latitude"""
+    flat: dict[str, Any] = {}
+    for key, value in record.items():
+        if key in NOISE_KEYS:
+            continue
+        path = f"{prefix}{key}"
+        if isinstance(value, dict) and value:
+            flat.update(_flatten(value, path + "."))
+        else:
+            flat[path] = value
+    return flat
+
+
+def _cell(value: Any) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, (list, dict)):
+        return _compact_json(value) if value else ""
+    return str(value).replace("\t", " ").replace("\r", " ").replace("\n", " ")
+
+
+def _is_records(value: Any) -> bool:
+    return (isinstance(value, list) and len(value) >= _MIN_TABLE_ROWS
+            and all(isinstance(item, dict) for item in value))
+
+
+def _table(records: list[dict[str, Any]]) -> tuple[list[str], list[str]]:
+    """同构记录列表转为TSV：返回 (表头与共同字段行, 数据行)
+
+    - 所有记录都为空的列直接丢弃
+    - 记录数不少于3且所有记录取值相同的列提到"共同字段"中，只输出一次（至少保留一列）
+    """
+    rows = [_flatten(record) for record in records]
+    columns: list[str] = []
+    for row in rows:
+        for column in row:
+            if column not in columns:
+                columns.append(column)
+
+    cells = {column: [_cell(row.get(column)) for row in rows] for column in columns}
+    columns = [column for column in columns if any(cells[column])]
+
+    common: dict[str, Any] = {}
+    if len(rows) >= 3:
+        constant = [column for column in columns if all(value == cells[column][0] for value in cells[column])]
+        # 至少保留一列，避免记录完全相同时表格为空
+        if len(constant) == len(columns):
+            constant = constant[1:]
+        for column in constant:
+            common[column] = rows[0].get(column)
+            columns.remove(column)
+
+    head: list[str] = []
+    if common:
+        head.append("共同字段: " + _compact_json(common))
+    head.append("\t".join(columns))
+    body = ["\t".join(cells[column][i] for column in columns) for i in range(len(rows))]
+    return head, body
+
+
+def _render_value(name: str, value: Any, lines: list[str], rows: list[tuple[int, int]]) -> None:
+    if _is_records(value):
+        head, body = _table(value)
+        lines.append(f"{name}[{len(value)}] (TSV):")
+        lines.extend(head)
+        start = len(lines)
+        lines.extend(body)
+        rows.append((start, len(lines)))
+    else:
+        lines.append(f"{name}: {_compact_json(value)}" if name else _compact_json(value))
+
+
+def render_data(data: Any) -> tuple[list[str], list[tuple[int, int]]]:
+    """把工具数据渲染为文本行，返回 (行列表, 各表格数据行的区间)"""
+    lines: list[str] = []
+    rows: list[tuple[int, int]] = []
+    if isinstance(data, dict):
+        scalars = {key: value for key, value in data.items()
+                   if key not in NOISE_KEYS and not _is_records(value)}
+        if scalars:
+            lines.append(_compact_json(scalars))
+        for key, value in data.items():
+            if key not in NOISE_KEYS and _is_records(value):
+                _render_value(key, value, lines, rows)
+    else:
+        _render_value("items" if _is_records(data) else "", data, lines, rows)
+    return lines, rows
+
+
+def _fit_budget(lines: list[str], rows: list[tuple[int, int]], budget: int) -> str:
+    """超出预算时从最后一个表格开始截掉尾部数据行，并注明省略行数"""
+    text = "\n".join(lines)
+    if estimate_tokens(text) <= budget:
+        return text
+
+    lines = list(lines)
+    for start, end in reversed(rows):
+        kept = end - start
+        while kept > 1 and estimate_tokens("\n".join(lines)) > budget:
+            drop = max(1, (kept - 1) // 2)
+            del lines[start + kept - drop:start + kept]
+            kept -= drop
+        omitted = (end - start) - kept
+        if omitted:
+            lines.insert(start + kept, f"... 省略 {omitted} 行（超出token预算 {budget}）")
+        text = "\n".join(lines)
+        if estimate_tokens(text) <= budget:
+            return text
+
+    # 仍然超出预算（例如单个巨大对象），按字符截断
+    while estimate_tokens(text) > budget and len(text) > 200:
+        text = text[:len(text) * 3 // 4]
+    return text + f"\n... 已截断（超出token预算 {budget}）"
+
+
+def render_result(tool: str, data: Any, header: str = "", budget: int | None = None) -> str:
+    """把工具返回的数据渲染为紧凑文本
+
+    同构记录列表输出为TSV表格，其余数据输出为紧凑JSON，并按工具的token预算截断；
+    与直接嵌入 repr(data) 相比节省的字节数与token数按 RENDER_METRICS_SAMPLE_RATE 抽样估算，
+    记入 render_bytes_saved / render_tokens_saved 指标。
+
+    Args:
+        tool (str): 工具名，用于选择token预算和指标标签
+        data (Any): 工具数据（通常是API响应或整理后的记录列表）
+        header (str): 放在数据前的说明文字
+        budget (int, optional): token预算，默认取 TOOL_TOKEN_BUDGETS[tool] 或 TOOL_TOKEN_BUDGET
+    """
+    if budget is None:
+        budget = TOOL_TOKEN_BUDGETS.get(tool, TOOL_TOKEN_BUDGET)
+
+    lines, rows = render_data(data)
+    body = _fit_budget(lines, rows, max(budget - estimate_tokens(header), 1))
+    text = f"{header}\n{body}" if header else body
+
+    tokens = estimate_tokens(text)
+    metrics.observe("render_tokens", tokens, tool=tool)
+    if RENDER_METRICS_SAMPLE_RATE > 0 and random.random() < RENDER_METRICS_SAMPLE_RATE:
+        baseline = f"{header}{data}"
+        scale = 1 / min(RENDER_METRICS_SAMPLE_RATE, 1.0)
+        metrics.inc("render_bytes_saved", round((len(baseline.encode()) - len(text.encode())) * scale), tool=tool)
+        metrics.inc("render_tokens_saved", round((estimate_tokens(baseline) - tokens) * scale), tool=tool)
+    return text
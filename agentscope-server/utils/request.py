@@ -1,12 +1,22 @@
+import asyncio
 import base64
-import requests
+import hashlib
+import httpx
+import ijson
 import json
 import os
 import time
 import jwt
 
-from typing import Any
+from typing import Any, AsyncIterator, Awaitable, Callable, Iterable
 from dotenv import load_dotenv
+from utils.cache import TTLCache, MISSING
+from utils.http_client import http_pool
+from utils.jsonstream import aiter_items, iter_items
+from utils.rate_limit import rate_limiters
+from utils.resilience import breakers, send_with_retry, CircuitOpenError
+from utils.singleflight import SingleFlight, request_key
+from utils.tracing import HttpTimer
 
 
 load_dotenv('.env')
@@ -35,12 +45,63 @@ qweather_headers = {
     'kid': qweather_key_id
 }
 
+# 合并并发的相同只读请求，仅对调用方显式开启 coalesce 的端点生效
+inflight_requests = SingleFlight("upstream")
 
-def Get(type: str, path: str, params: dict[str, Any]) -> dict[str, Any] | None:
+# 带幂等键的变更类请求，成功结果保留时长（秒）
+IDEMPOTENCY_TTL = float(os.environ.get("IDEMPOTENCY_TTL", str(24 * 3600)))
+idempotency_store = TTLCache(name="idempotency", maxsize=10000, ttl=IDEMPOTENCY_TTL)
+
+# 和风天气JWT有效期与提前刷新时间（秒）
+QWEATHER_TOKEN_TTL = int(os.environ.get("QWEATHER_TOKEN_TTL", "900"))
+QWEATHER_TOKEN_REFRESH_MARGIN = int(os.environ.get("QWEATHER_TOKEN_REFRESH_MARGIN", "120"))
+
+
+def _endpoint_kind(url: str) -> str:
+    return "qweather" if url == qweatherapiUrl else "content" if url == contentUrl else "booking"
+
+
+def _instrumented(
+    url: str,
+    method: str,
+    path: str,
+    send: Callable[[dict[str, Any]], Awaitable[httpx.Response]],
+) -> Callable[[], Awaitable[httpx.Response]]:
+    """包装一次发送（包括每次重试）：先从对应接口类别的令牌桶取令牌，超出配额的请求排队等待；
+    发送过程记录为追踪span与分阶段耗时，send 需要把收到的 extensions 传给 httpx"""
+    kind = _endpoint_kind(url)
+    limiter = rate_limiters.get(kind, url)
+
+    async def instrumented_send() -> httpx.Response:
+        await limiter.acquire()
+        with HttpTimer(url, method, path, kind) as timer:
+            response = await send(timer.extensions)
+            timer.status_code = response.status_code
+        return response
+
+    return instrumented_send
+
+
+async def Get(type: str, path: str, params: dict[str, Any], coalesce: bool = False) -> dict[str, Any] | None:
+    """DIDA GET请求
+
+    Args:
+        type (str): "content" 或 "booking"
+        path (str): 端点路径
+        params (dict): 查询参数
+        coalesce (bool): 是否合并并发的相同请求，仅适用于只读端点
+    """
     url = contentUrl if type == "content" else bookingUrl
+    if coalesce:
+        return await inflight_requests.do(request_key("GET", url + path, params), lambda: _get(url, path, params))
+    return await _get(url, path, params)
+
+
+async def _get(url: str, path: str, params: dict[str, Any]) -> dict[str, Any] | None:
     try:
-        furl = url + path
-        response = requests.get(furl, params=params, headers=headers)
+        client = http_pool.get(url)
+        response = await send_with_retry(url, _instrumented(url, "GET", path, lambda extensions: client.get(
+            path, params=params, headers=headers, extensions=extensions)), idempotent=True)
         response.raise_for_status()  # 如果状态码不是2xx，会抛出异常
         data = response.json()
 
@@ -50,7 +111,7 @@ def Get(type: str, path: str, params: dict[str, Any]) -> dict[str, Any] | None:
 
         return data
 
-    except requests.exceptions.RequestException as e:
+    except httpx.HTTPError as e:
         print(f"请求失败: {e}")
         return None
     except json.JSONDecodeError as e:
@@ -58,18 +119,216 @@ def Get(type: str, path: str, params: dict[str, Any]) -> dict[str, Any] | None:
         return None
 
 
-def Post(type: str, path: str, params: dict[str, Any], data: dict[str, Any] | None = None) -> dict[str, Any] | None:
+async def GetStream(
+    type: str,
+    path: str,
+    params: dict[str, Any],
+    prefix: str = "data.item",
+    exclude: Iterable[str] = (),
+) -> AsyncIterator[Any]:
+    """DIDA GET请求，边接收边解析，逐个产出 prefix 处的元素
+
+    适用于响应体极大的接口（如国家级酒店ID列表），调用方可以边消费边截断、投影或写入本地存储，
+    全程不持有完整响应体。提前停止迭代会关闭连接，不再读取剩余数据。
+
+    与 Get 不同，请求或解析失败时打印错误并抛出异常（此时可能已产出部分元素，由调用方决定如何处理）。
+
+    Args:
+        type (str): "content" 或 "booking"
+        path (str): 端点路径
+        params (dict): 查询参数
+        prefix (str): 元素路径，默认为顶层 data 数组的元素
+        exclude (Iterable[str]): 需要丢弃的字段名
+    """
+    url = contentUrl if type == "content" else bookingUrl
+    client = http_pool.get(url)
+    # 流式响应可能已产出部分元素，不做自动重试，只经过熔断器
+    breaker = breakers.get(url)
+    if not breaker.allow():
+        print(f"流式请求失败: 上游 {breaker.name} 熔断中")
+        raise CircuitOpenError(f"上游 {breaker.name} 熔断中，暂停请求")
+    # 本次请求是否取得了半开状态的探测名额；记录结果后名额已归还
+    probe = breaker.state == "half_open"
+    try:
+        await rate_limiters.get(_endpoint_kind(url), url).acquire()
+        with HttpTimer(url, "GET", path, _endpoint_kind(url)) as timer:
+            async with client.stream("GET", path, params=params, headers=headers, extensions=timer.extensions) as response:
+                timer.status_code = response.status_code
+                probe = False
+                if response.status_code >= 500:
+                    breaker.record_failure()
+                else:
+                    breaker.record_success()
+                response.raise_for_status()
+                async for item in aiter_items(response.aiter_bytes(), prefix, exclude):
+                    yield item
+    except httpx.HTTPError as e:
+        if isinstance(e, httpx.TransportError):
+            probe = False
+            breaker.record_failure()
+        print(f"流式请求失败: {e}")
+        raise
+    except ijson.JSONError as e:
+        print(f"JSON解析失败: {e}")
+        raise
+    finally:
+        # 本次是探测请求但限流器异常、调用方取消等情况下没有记录结果时，释放探测名额
+        if probe:
+            breaker.release_probe()
+
+
+async def Post(
+    type: str,
+    path: str,
+    params: dict[str, Any],
+    data: dict[str, Any] | None = None,
+    coalesce: bool = False,
+    idempotent: bool = False,
+    idempotency_key: str | None = None,
+) -> dict[str, Any] | None:
+    """DIDA POST请求
+
+    查询类请求（coalesce 或 idempotent）在网络错误与 429/5xx 时按指数退避重试；
+    变更类请求只有提供了 idempotency_key 才会在超时等结果不确定的失败后重试；
+    下单（HotelBookingConfirm）不重试，结果不确定时按 ClientReference 查询已创建的订单。
+
+    Args:
+        type (str): "content" 或 "booking"
+        path (str): 端点路径
+        params (dict): 查询参数
+        data (dict, optional): JSON请求体
+        coalesce (bool): 是否合并并发的相同请求；预订、取消等变更类接口不得开启
+        idempotent (bool): 请求是否可以安全重试，适用于不改变上游状态的查询类接口
+        idempotency_key (str, optional): 变更类请求的幂等键（如 ClientReference、BookingID），
+            相同键的并发请求只执行一次，成功结果在 IDEMPOTENCY_TTL 内直接返回，不会重复提交
+    """
+    url = contentUrl if type == "content" else bookingUrl
+    if idempotency_key is not None:
+        return await _post_idempotent(url, path, params, data, idempotency_key)
+    if coalesce:
+        return await inflight_requests.do(request_key("POST", url + path, params, data), lambda: _post(url, path, params, data, idempotent=True))
+    return await _post(url, path, params, data, idempotent=idempotent)
+
+
+_BOOKING_CONFIRM_PATH = '/api/booking/HotelBookingConfirm'
+_DUPLICATE_HINTS = ("clientreference", "client reference", "duplicate", "already exist", "重复", "已存在")
+
+
+def _is_duplicate_reference(res: dict[str, Any]) -> bool:
+    """下单接口是否因 ClientReference 已被使用而报错"""
+    error_info = res.get("Error")
+    if not error_info:
+        return False
+    text = f"{error_info.get('Code', '')} {error_info.get('Message', '')}".lower()
+    return any(hint in text for hint in _DUPLICATE_HINTS)
+
+
+async def _find_booking(url: str, data: dict[str, Any]) -> dict[str, Any] | None:
+    """按 ClientReference 查询订单，入住/离店日期与联系人邮箱都与本次下单请求一致时以下单成功的格式返回"""
+    client_reference = data["ClientReference"]
+    search = {"Header": data.get("Header"), "SearchBy": {"BookingInfo": {"ClientReference": client_reference}}}
+    res = await _post(url, '/api/booking/HotelBookingSearch', {"$format": "json"}, search, idempotent=True)
+    email = (data.get("Contact", {}).get("Email") or "").lower()
+    for booking in ((res or {}).get("Success") or {}).get("BookingDetailsList") or []:
+        if booking.get("ClientReference") != client_reference:
+            continue
+        if ((booking.get("CheckInDate") or "").split(" ")[0] != data.get("CheckInDate")
+                or (booking.get("CheckOutDate") or "").split(" ")[0] != data.get("CheckOutDate")):
+            continue
+        booked_email = ((booking.get("Contact") or {}).get("Email") or "").lower()
+        if email and booked_email and booked_email != email:
+            continue
+        return {"Success": {"BookingDetails": booking}}
+    return None
+
+
+async def _post_idempotent(url: str, path: str, params: dict[str, Any], data: dict[str, Any] | None, idempotency_key: str) -> dict[str, Any] | None:
+    key = f"{url}{path}#{idempotency_key}"
+    fingerprint = hashlib.sha256(request_key("POST", url + path, params, data).encode()).hexdigest()
+
+    cached = idempotency_store.get(key)
+    if cached is not MISSING:
+        if cached["fingerprint"] != fingerprint:
+            print(f"幂等键冲突: {idempotency_key} 已用于不同的请求内容")
+            return {"Error": {"Code": "IdempotencyConflict",
+                              "Message": f"幂等键 {idempotency_key} 已用于不同的请求，请更换客户订单号"}}
+        print(f"幂等键 {idempotency_key} 已完成，返回原结果")
+        return cached["response"]
+
+    # 下单请求不盲目重试：首次请求可能已在上游成功，重试只会得到 ClientReference 重复的错误，
+    # 改为在结果不确定或报重复时按 ClientReference 查询订单；同一 BookingID 的取消可以安全重复提交
+    reconcile = path == _BOOKING_CONFIRM_PATH and bool(data and data.get("ClientReference"))
+
+    async def run() -> dict[str, Any] | None:
+        res = await _post(url, path, params, data, idempotent=not reconcile)
+        if reconcile and (res is None or _is_duplicate_reference(res)):
+            found = await _find_booking(url, data)
+            if found is not None:
+                print(f"下单结果不确定，按客户订单号 {data['ClientReference']} 查询到已创建的订单")
+                res = found
+        if res is not None and "Error" not in res:
+            idempotency_store.set(key, {"fingerprint": fingerprint, "response": res})
+        return res
+
+    return await inflight_requests.do(f"IDEMPOTENT {key}", run)
+
+
+async def PostItems(
+    type: str,
+    path: str,
+    params: dict[str, Any],
+    data: dict[str, Any] | None = None,
+    prefix: str = "data.item",
+    exclude: Iterable[str] = (),
+    coalesce: bool = False,
+) -> list[Any] | None:
+    """DIDA POST请求，只解析 prefix 处的元素并在解析阶段丢弃 exclude 字段
+
+    适用于响应体较大、只需要部分字段的接口（如酒店详情），被排除的字段不会构建为Python对象。
+
+    Args:
+        type (str): "content" 或 "booking"
+        path (str): 端点路径
+        params (dict): 查询参数
+        data (dict, optional): JSON请求体
+        prefix (str): 元素路径，默认为顶层 data 数组的元素
+        exclude (Iterable[str]): 需要丢弃的字段名
+        coalesce (bool): 是否合并并发的相同请求
+
+    Returns:
+        list: 投影后的元素列表或None
+    """
     url = contentUrl if type == "content" else bookingUrl
+    exclude = tuple(exclude)
+
+    def parse(body: bytes) -> list[Any]:
+        return list(iter_items(body, prefix, exclude))
+
+    if coalesce:
+        key = request_key("POST", url + path, params, {"body": data, "prefix": prefix, "exclude": exclude})
+        return await inflight_requests.do(key, lambda: _post(url, path, params, data, parse, idempotent=True))
+    return await _post(url, path, params, data, parse, idempotent=True)
+
+
+async def _post(
+    url: str,
+    path: str,
+    params: dict[str, Any],
+    data: dict[str, Any] | None,
+    parse: Callable[[bytes], Any] | None = None,
+    idempotent: bool = False,
+) -> Any:
     try:
-        furl = url + path
-        response = requests.post(
-            furl,
+        client = http_pool.get(url)
+        response = await send_with_retry(url, _instrumented(url, "POST", path, lambda extensions: client.post(
+            path,
             params=params,
             json=data,
-            headers=headers
-        )
+            headers=headers,
+            extensions=extensions
+        )), idempotent=idempotent)
         response.raise_for_status()  # 如果状态码不是2xx，会抛出异常
-        response_data = response.json()
+        response_data = response.json() if parse is None else parse(response.content)
 
         # print(f"状态码: {response.status_code}")
         # print(f"响应头: {dict(response.headers)}")
@@ -77,19 +336,25 @@ def Post(type: str, path: str, params: dict[str, Any], data: dict[str, Any] | No
 
         return response_data
 
-    except requests.exceptions.RequestException as e:
+    except httpx.HTTPError as e:
         print(f"POST请求失败: {e}")
         return None
-    except json.JSONDecodeError as e:
+    except (json.JSONDecodeError, ijson.JSONError) as e:
         print(f"JSON解析失败: {e}")
         return None
 
 
-def _generate_qweather_token():
+async def close_clients() -> None:
+    """关闭共享连接池，在服务关闭时调用"""
+    await http_pool.aclose()
+    rate_limiters.close()
+
+
+def _generate_qweather_token(ttl: int = QWEATHER_TOKEN_TTL):
     """生成和风天气JWT token"""
     payload = {
         'iat': int(time.time()) - 30,
-        'exp': int(time.time()) + 900,
+        'exp': int(time.time()) + ttl,
         'sub': qweather_sub_id
     }
     encoded_jwt = jwt.encode(
@@ -97,43 +362,109 @@ def _generate_qweather_token():
     return encoded_jwt
 
 
-def GetQWeather(endpoint: str, params: dict[str, Any]) -> dict[str, Any] | None:
+class QWeatherTokenManager:
+    """和风天气JWT复用与自动刷新
+
+    - 在过期前 refresh_margin 秒内访问时，返回当前token并在后台签发新token
+    - 距离过期不足 hard_margin 秒（或尚未签发）时，加锁同步签发
+    - 并发的工具调用共享同一个token，同一时刻最多只有一次签名
+    """
+
+    def __init__(self, ttl: int = QWEATHER_TOKEN_TTL, refresh_margin: int = QWEATHER_TOKEN_REFRESH_MARGIN, hard_margin: int = 30):
+        self.ttl = ttl
+        self.refresh_margin = refresh_margin
+        self.hard_margin = hard_margin
+        self._token: str | None = None
+        self._expires_at = 0.0
+        self._lock = asyncio.Lock()
+        self._refresh_task: asyncio.Task | None = None
+
+    async def get_token(self) -> str:
+        now = time.time()
+        if self._token is not None and now < self._expires_at - self.hard_margin:
+            if now >= self._expires_at - self.refresh_margin and self._refresh_task is None:
+                self._refresh_task = asyncio.create_task(self._background_refresh())
+            return self._token
+
+        async with self._lock:
+            if self._token is None or time.time() >= self._expires_at - self.hard_margin:
+                self._refresh()
+            return self._token
+
+    def _refresh(self) -> None:
+        issued_at = time.time()
+        self._token = _generate_qweather_token(self.ttl)
+        self._expires_at = issued_at + self.ttl
+
+    async def _background_refresh(self) -> None:
+        try:
+            async with self._lock:
+                if time.time() >= self._expires_at - self.refresh_margin:
+                    self._refresh()
+        except Exception as e:
+            print(f"和风天气JWT后台刷新失败: {e}")
+        finally:
+            self._refresh_task = None
+
+    def invalidate(self) -> None:
+        """丢弃当前token（例如上游返回401时），下次调用重新签发"""
+        self._token = None
+        self._expires_at = 0.0
+
+
+qweather_tokens = QWeatherTokenManager()
+
+
+async def GetQWeather(endpoint: str, params: dict[str, Any], coalesce: bool = True, ok_codes: tuple[str, ...] = ('200',)) -> dict[str, Any] | None:
     """和风天气API请求方法
 
     Args:
         endpoint (str): API端点路径，例如 '/geo/v2/city/lookup'
         params (dict): 请求参数
+        coalesce (bool): 是否合并并发的相同请求，和风天气接口均为只读查询，默认开启
+        ok_codes (tuple[str, ...]): 视为正常返回的业务状态码，例如城市查询需要区分 '404'（查无数据）与请求失败
 
     Returns:
         dict: API响应数据或None
     """
-    token = _generate_qweather_token()
+    if coalesce:
+        key = request_key("GET", qweatherapiUrl + endpoint, params, {"ok_codes": ok_codes})
+        return await inflight_requests.do(key, lambda: _get_qweather(endpoint, params, ok_codes))
+    return await _get_qweather(endpoint, params, ok_codes)
+
+
+async def _get_qweather(endpoint: str, params: dict[str, Any], ok_codes: tuple[str, ...] = ('200',)) -> dict[str, Any] | None:
+    token = await qweather_tokens.get_token()
     qweather_headers_with_auth = {
         'Authorization': f'Bearer {token}'
     }
 
     try:
-        response = requests.get(
-            f"{qweatherapiUrl}{endpoint}",
+        client = http_pool.get(qweatherapiUrl)
+        response = await send_with_retry(qweatherapiUrl, _instrumented(qweatherapiUrl, "GET", endpoint, lambda extensions: client.get(
+            endpoint,
             params=params,
             headers=qweather_headers_with_auth,
-            timeout=10
-        )
+            timeout=10,
+            extensions=extensions
+        )), idempotent=True)
 
         if response.status_code == 200:
             data = response.json()
-            if data['code'] == '200':
+            if data['code'] in ok_codes:
                 return data
             else:
                 print(f"和风天气API返回错误: {data.get('message', '未知错误')}")
                 return None
         else:
+            if response.status_code == 401:
+                qweather_tokens.invalidate()
             print(f"和风天气请求失败，状态码: {response.status_code}")
             return None
 
-    except Exception as e:
-        print(f"和风天气请求发生错误: {e}")
-        return None
     except json.JSONDecodeError as e:
         print(f"JSON解析失败: {e}")
         return None
+    except Exception as e:
+        print(f"和风天气请求发生错误: {e}")
+        return None
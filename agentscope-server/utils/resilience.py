@@ -0,0 +1,190 @@
+import asyncio
+import os
+import random
+import time
+
+from typing import Awaitable, Callable
+from urllib.parse import urlparse
+from dotenv import load_dotenv
+
+import httpx
+
+from utils.metrics import metrics
+
+
+load_dotenv('.env')
+
+# 重试配置：第 n 次重试等待 [0, min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2^n)] 之间的随机时长（full jitter）
+RETRY_MAX_ATTEMPTS = int(os.environ.get("RETRY_MAX_ATTEMPTS", "3"))
+RETRY_BASE_DELAY = float(os.environ.get("RETRY_BASE_DELAY", "0.3"))
+RETRY_MAX_DELAY = float(os.environ.get("RETRY_MAX_DELAY", "5"))
+# 熔断配置：连续失败 BREAKER_FAILURE_THRESHOLD 次后熔断 BREAKER_RESET_TIMEOUT 秒，之后放行一个探测请求
+BREAKER_FAILURE_THRESHOLD = int(os.environ.get("BREAKER_FAILURE_THRESHOLD", "5"))
+BREAKER_RESET_TIMEOUT = float(os.environ.get("BREAKER_RESET_TIMEOUT", "30"))
+
+# 可重试的HTTP状态码（限流与网关错误）
+RETRYABLE_STATUS = frozenset({429, 502, 503, 504})
+
+# 这些异常发生时请求尚未发出，即使是非幂等的变更类请求也可以安全重试
+_NOT_SENT_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+
+
+class CircuitOpenError(httpx.TransportError):
+    """上游主机处于熔断状态，请求未发出即失败"""
+
+
+class CircuitBreaker:
+    """单个上游主机的熔断器
+
+    - closed: 正常放行，连续失败达到阈值后转为 open
+    - open: 直接拒绝请求，reset_timeout 秒后转为 half_open
+    - half_open: 只放行一个探测请求，成功则恢复 closed，失败则重新 open
+    """
+
+    def __init__(self, name: str, failure_threshold: int = BREAKER_FAILURE_THRESHOLD, reset_timeout: float = BREAKER_RESET_TIMEOUT):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probing = False
+
+    def allow(self) -> bool:
+        if self.state == "closed":
+            return True
+        if self.state == "open":
+            if time.monotonic() - self.opened_at < self.reset_timeout:
+                return False
+            self._transition("half_open")
+        if self._probing:
+            return False
+        self._probing = True
+        return True
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self._probing = False
+        if self.state != "closed":
+            self._transition("closed")
+
+    def release_probe(self) -> None:
+        """探测请求未得到结果（被取消、解码失败等）时释放探测名额，下一个请求重新探测
+
+        只能由取得探测名额的请求调用：allow() 返回 True 时熔断器处于 half_open，即表示本次请求就是探测请求。
+        """
+        self._probing = False
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        self._probing = False
+        if self.state == "half_open" or self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+            if self.state != "open":
+                self._transition("open")
+
+    def _transition(self, state: str) -> None:
+        self.state = state
+        metrics.inc("circuit_breaker_transitions", host=self.name, state=state)
+        metrics.set_gauge("circuit_breaker_open", 1 if state == "open" else 0, host=self.name)
+        print(f"熔断器 {self.name} -> {state}")
+
+
+class BreakerRegistry:
+    """按主机维护熔断器"""
+
+    def __init__(self):
+        self._breakers: dict[str, CircuitBreaker] = {}
+
+    def get(self, url: str) -> CircuitBreaker:
+        host = urlparse(url).netloc or url
+        breaker = self._breakers.get(host)
+        if breaker is None:
+            breaker = self._breakers[host] = CircuitBreaker(host)
+        return breaker
+
+    def stats(self) -> dict[str, dict[str, object]]:
+        return {host: {"state": breaker.state, "failures": breaker.failures}
+                for host, breaker in self._breakers.items()}
+
+
+breakers = BreakerRegistry()
+
+
+def backoff_delay(attempt: int, base: float = RETRY_BASE_DELAY, cap: float = RETRY_MAX_DELAY) -> float:
+    """第 attempt 次重试前的等待秒数（指数退避 + full jitter）"""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+def _retry_after(response: httpx.Response) -> float | None:
+    value = response.headers.get("Retry-After")
+    if value is None:
+        return None
+    try:
+        return min(float(value), RETRY_MAX_DELAY)
+    except ValueError:
+        return None
+
+
+async def send_with_retry(
+    url: str,
+    send: Callable[[], Awaitable[httpx.Response]],
+    idempotent: bool,
+    attempts: int = RETRY_MAX_ATTEMPTS,
+) -> httpx.Response:
+    """经过熔断器发送请求，失败时按指数退避重试
+
+    幂等请求在网络错误、超时与 429/502/503/504 时重试；非幂等请求只在请求确定未发出
+    （连接失败、连接池超时）时重试，避免重复下单。熔断中直接抛出 CircuitOpenError。
+    5xx 与网络错误计入熔断器失败，其余响应（包括4xx）视为主机可用。
+
+    Args:
+        url (str): 上游主机地址，用于选择熔断器
+        send (Callable): 无参协程工厂，每次调用发送一次请求
+        idempotent (bool): 请求是否可以安全重试
+        attempts (int): 最多尝试次数
+
+    Returns:
+        httpx.Response: 最后一次的响应（状态码由调用方处理）
+    """
+    breaker = breakers.get(url)
+    attempt = 0
+    while True:
+        if not breaker.allow():
+            metrics.inc("upstream_short_circuited", host=breaker.name)
+            raise CircuitOpenError(f"上游 {breaker.name} 熔断中，暂停请求")
+        probe = breaker.state == "half_open"
+
+        try:
+            response = await send()
+        except httpx.TransportError as e:
+            breaker.record_failure()
+            retryable = idempotent or isinstance(e, _NOT_SENT_ERRORS)
+            attempt += 1
+            if not retryable or attempt >= attempts or breaker.state == "open":
+                raise
+            delay = backoff_delay(attempt)
+            metrics.inc("upstream_retries", host=breaker.name, reason=type(e).__name__)
+            print(f"请求 {breaker.name} 失败（{type(e).__name__}），{delay:.2f}s 后第 {attempt} 次重试")
+            await asyncio.sleep(delay)
+            continue
+        except BaseException:
+            # 既不是网络错误也没有响应，不计入失败，但本次是探测请求时要释放探测名额，否则主机会一直被熔断
+            if probe:
+                breaker.release_probe()
+            raise
+
+        if response.status_code >= 500:
+            breaker.record_failure()
+        else:
+            breaker.record_success()
+
+        attempt += 1
+        if (idempotent and response.status_code in RETRYABLE_STATUS and attempt < attempts
+                and breaker.state != "open"):
+            delay = _retry_after(response) or backoff_delay(attempt)
+            metrics.inc("upstream_retries", host=breaker.name, reason=str(response.status_code))
+            print(f"请求 {breaker.name} 返回 {response.status_code}，{delay:.2f}s 后第 {attempt} 次重试")
+            await asyncio.sleep(delay)
+            continue
+        return response
@@ -0,0 +1,433 @@
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+import zlib
+
+from collections import OrderedDict
+from typing import Any, Optional
+from dotenv import load_dotenv
+
+from agentscope_runtime.engine.schemas.agent_schemas import Message, MessageType, Role
+from agentscope_runtime.engine.services.memory_service import MemoryService
+from agentscope_runtime.engine.services.session_history_service import Session, SessionHistoryService
+from utils.metrics import metrics
+from utils.singleflight import SingleFlight
+
+
+load_dotenv('.env')
+
+# 内存中保留的活跃会话数，超出后最久未访问的会话写入磁盘
+SESSION_HOT_MAX = int(os.environ.get("SESSION_HOT_MAX", "512"))
+# 每个会话保留的最大消息数与字节数（按消息JSON计），超出时从最早的一轮对话开始丢弃
+SESSION_MAX_MESSAGES = int(os.environ.get("SESSION_MAX_MESSAGES", "200"))
+SESSION_MAX_BYTES = int(os.environ.get("SESSION_MAX_BYTES", "262144"))
+# 冷会话落盘的SQLite文件；为空时冷会话直接丢弃（只保留内存中的活跃会话）
+SESSION_STORE_PATH = os.environ.get("SESSION_STORE_PATH", ".cache/sessions.sqlite")
+# 磁盘上超过该秒数未更新的会话在启动时清理，0 表示不清理
+SESSION_TTL = int(os.environ.get("SESSION_TTL", "604800"))
+
+
+def _message_size(message: Message) -> int:
+    return len(message.model_dump_json(exclude_none=True).encode("utf-8"))
+
+
+def _is_turn_start(message: Message) -> bool:
+    """用户消息是一轮对话的开始，裁剪时从这里切开，避免留下没有调用的工具结果"""
+    return message.type == MessageType.MESSAGE and message.role == Role.USER
+
+
+class _HotSession:
+    __slots__ = ("messages", "sizes", "bytes", "dirty", "updated_at")
+
+    def __init__(self, messages: list[Message] | None = None, updated_at: float | None = None):
+        self.messages = messages or []
+        self.sizes = [_message_size(message) for message in self.messages]
+        self.bytes = sum(self.sizes)
+        self.dirty = False
+        self.updated_at = updated_at or time.time()
+
+
+class _SessionDiskStore:
+    """冷会话的磁盘存储：每个会话一行，消息列表以 zlib 压缩的JSON保存"""
+
+    def __init__(self, path: str):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS sessions ("
+            " user_id TEXT NOT NULL,"
+            " session_id TEXT NOT NULL,"
+            " data BLOB NOT NULL,"
+            " messages INTEGER NOT NULL,"
+            " updated_at REAL NOT NULL,"
+            " PRIMARY KEY (user_id, session_id))"
+        )
+        self._conn.commit()
+
+    def load(self, user_id: str, session_id: str) -> tuple[list[Message], float] | None:
+        with self._lock:
+            row = self._conn.execute("SELECT data, updated_at FROM sessions WHERE user_id = ? AND session_id = ?",
+                                     (user_id, session_id)).fetchone()
+        if row is None:
+            return None
+        return [Message.model_validate(item) for item in json.loads(zlib.decompress(row[0]))], row[1]
+
+    def save(self, user_id: str, session_id: str, messages: list[Message], updated_at: float) -> tuple[int, int]:
+        """写入会话，返回 (写入后的压缩字节数, 写入前的压缩字节数，新会话为-1)"""
+        payload = json.dumps([message.model_dump(mode="json", exclude_none=True) for message in messages],
+                             ensure_ascii=False, separators=(",", ":"))
+        data = zlib.compress(payload.encode("utf-8"), 6)
+        with self._lock:
+            row = self._conn.execute("SELECT length(data) FROM sessions WHERE user_id = ? AND session_id = ?",
+                                     (user_id, session_id)).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO sessions (user_id, session_id, data, messages, updated_at) VALUES (?, ?, ?, ?, ?)",
+                (user_id, session_id, data, len(messages), updated_at))
+            self._conn.commit()
+        return len(data), row[0] if row is not None else -1
+
+    def delete(self, user_id: str, session_id: str) -> int:
+        """删除会话，返回删除的压缩字节数，不存在时返回-1"""
+        with self._lock:
+            row = self._conn.execute("SELECT length(data) FROM sessions WHERE user_id = ? AND session_id = ?",
+                                     (user_id, session_id)).fetchone()
+            self._conn.execute("DELETE FROM sessions WHERE user_id = ? AND session_id = ?", (user_id, session_id))
+            self._conn.commit()
+        return row[0] if row is not None else -1
+
+    def session_ids(self, user_id: str) -> list[str]:
+        with self._lock:
+            rows = self._conn.execute("SELECT session_id FROM sessions WHERE user_id = ? ORDER BY updated_at DESC",
+                                      (user_id,)).fetchall()
+        return [row[0] for row in rows]
+
+    def purge(self, before: float) -> int:
+        with self._lock:
+            deleted = self._conn.execute("DELETE FROM sessions WHERE updated_at < ?", (before,)).rowcount
+            self._conn.commit()
+        return deleted
+
+    def totals(self) -> tuple[int, int]:
+        """返回 (会话数, 压缩字节数)"""
+        with self._lock:
+            count, size = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(length(data)), 0) FROM sessions").fetchone()
+        return count, size
+
+
+class SessionStore(SessionHistoryService):
+    """按 user_id/session_id 划分的会话历史存储，内存占用有上限
+
+    - 最近访问的 hot_max 个会话保存在内存（LRU），超出后最久未访问的会话压缩写入SQLite，再次访问时读回
+    - 每个会话最多保留 max_messages 条消息、max_bytes 字节，超出时按整轮对话从最早的开始丢弃
+    - 不同会话之间没有锁，并发请求互不阻塞；返回给请求的会话是消息列表的副本
+    - 读盘、写盘（含压缩与序列化）都在线程中执行，淘汰的会话由后台任务写入，不阻塞事件循环
+    - 聚合用量上报为 session_store_sessions / session_store_bytes / session_store_messages 指标
+    """
+
+    def __init__(
+        self,
+        hot_max: int = SESSION_HOT_MAX,
+        max_messages: int = SESSION_MAX_MESSAGES,
+        max_bytes: int = SESSION_MAX_BYTES,
+        path: str = SESSION_STORE_PATH,
+        ttl: int = SESSION_TTL,
+    ):
+        self.hot_max = max(hot_max, 1)
+        self.max_messages = max_messages
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.disk = _SessionDiskStore(path) if path else None
+        self._hot: OrderedDict[tuple[str, str], _HotSession] = OrderedDict()
+        # user_id -> 该用户在内存中的会话ID，供按用户检索历史使用
+        self._user_sessions: dict[str, set[str]] = {}
+        self._hot_bytes = 0
+        self._hot_messages = 0
+        self._disk_sessions, self._disk_bytes = self.disk.totals() if self.disk is not None else (0, 0)
+        self.evictions = 0
+        self.trimmed = 0
+        # 正在后台写盘的淘汰会话，写完之前再次访问直接取回内存中的对象
+        self._spilling: dict[tuple[str, str], tuple[_HotSession, asyncio.Task]] = {}
+        self._loads = SingleFlight("session_load")
+
+    async def start(self) -> None:
+        if self.disk is not None and self.ttl > 0:
+            purged = self.disk.purge(time.time() - self.ttl)
+            if purged:
+                print(f"清理过期会话: {purged} 个")
+            self._disk_sessions, self._disk_bytes = self.disk.totals()
+        self._report()
+
+    async def stop(self) -> None:
+        """等待后台写盘完成，并把内存中有改动的会话写入磁盘"""
+        if self.disk is None:
+            return
+        for (user_id, session_id), hot in list(self._hot.items()):
+            if hot.dirty:
+                self._spill(user_id, session_id, hot)
+        await asyncio.gather(*(task for _, task in list(self._spilling.values())), return_exceptions=True)
+
+    async def health(self) -> bool:
+        return True
+
+    def _report(self) -> None:
+        metrics.set_gauge("session_store_sessions", len(self._hot), tier="hot")
+        metrics.set_gauge("session_store_bytes", self._hot_bytes, tier="hot")
+        metrics.set_gauge("session_store_messages", self._hot_messages, tier="hot")
+        metrics.set_gauge("session_store_sessions", self._disk_sessions, tier="disk")
+        metrics.set_gauge("session_store_bytes", self._disk_bytes, tier="disk")
+
+    def _spill(self, user_id: str, session_id: str, hot: _HotSession) -> None:
+        """在后台任务中把会话的当前内容写入磁盘；同一会话的写入按顺序进行"""
+        key = (user_id, session_id)
+        previous = self._spilling.get(key)
+        # 写入的是当前消息列表的快照，之后的改动会重新标记 dirty
+        task = asyncio.create_task(self._write(key, list(hot.messages), hot.updated_at,
+                                               previous[1] if previous is not None else None))
+        hot.dirty = False
+        self._spilling[key] = (hot, task)
+
+    async def _write(self, key: tuple[str, str], messages: list[Message], updated_at: float,
+                     previous: asyncio.Task | None) -> None:
+        try:
+            if previous is not None:
+                await asyncio.gather(previous, return_exceptions=True)
+            size, before = await asyncio.to_thread(self.disk.save, *key, messages, updated_at)
+            if before < 0:
+                self._disk_sessions += 1
+                before = 0
+            self._disk_bytes += size - before
+            self._report()
+        except Exception as e:
+            print(f"会话 {key[1]} 写入磁盘失败: {e}")
+        finally:
+            entry = self._spilling.get(key)
+            if entry is not None and entry[1] is asyncio.current_task():
+                del self._spilling[key]
+
+    def _read(self, user_id: str, session_id: str) -> _HotSession | None:
+        """从磁盘读回会话（解压、反序列化与计算消息大小），在线程中执行"""
+        stored = self.disk.load(user_id, session_id)
+        return _HotSession(*stored) if stored is not None else None
+
+    def _put(self, user_id: str, session_id: str, hot: _HotSession) -> None:
+        self._hot[(user_id, session_id)] = hot
+        self._user_sessions.setdefault(user_id, set()).add(session_id)
+        self._hot_bytes += hot.bytes
+        self._hot_messages += len(hot.messages)
+        while len(self._hot) > self.hot_max:
+            (old_user, old_session), old = self._hot.popitem(last=False)
+            self._drop_hot(old_user, old_session, old)
+            if old.dirty and self.disk is not None:
+                self._spill(old_user, old_session, old)
+            self.evictions += 1
+            metrics.inc("session_store_evictions")
+
+    def _drop_hot(self, user_id: str, session_id: str, hot: _HotSession) -> None:
+        self._hot_bytes -= hot.bytes
+        self._hot_messages -= len(hot.messages)
+        sessions = self._user_sessions.get(user_id)
+        if sessions is not None:
+            sessions.discard(session_id)
+            if not sessions:
+                del self._user_sessions[user_id]
+
+    async def _load(self, user_id: str, session_id: str) -> _HotSession:
+        """取得会话的内存副本，不在内存中时从磁盘读回或新建"""
+        key = (user_id, session_id)
+        hot = self._hot.get(key)
+        if hot is not None:
+            self._hot.move_to_end(key)
+            return hot
+        spilling = self._spilling.get(key)
+        if spilling is not None:
+            hot = spilling[0]
+        else:
+            stored = None
+            if self.disk is not None:
+                stored = await self._loads.do(f"{user_id}\x1f{session_id}",
+                                              lambda: asyncio.to_thread(self._read, user_id, session_id))
+            # 读盘期间同一会话的其他请求可能已经载入
+            hot = self._hot.get(key)
+            if hot is not None:
+                self._hot.move_to_end(key)
+                return hot
+            hot = stored if stored is not None else _HotSession()
+        self._put(user_id, session_id, hot)
+        return hot
+
+    def _trim(self, hot: _HotSession) -> None:
+        total, count = hot.bytes, len(hot.messages)
+        cut = 0
+        while cut < count - 1 and (count - cut > self.max_messages or total > self.max_bytes):
+            total -= hot.sizes[cut]
+            cut += 1
+        if cut == 0:
+            return
+        # 保留的部分从一轮对话的开始切开
+        start = next((index for index in range(cut, count) if _is_turn_start(hot.messages[index])), cut)
+        removed_bytes = sum(hot.sizes[:start])
+        del hot.messages[:start]
+        del hot.sizes[:start]
+        hot.bytes -= removed_bytes
+        self._hot_bytes -= removed_bytes
+        self._hot_messages -= start
+        self.trimmed += start
+        metrics.inc("session_store_trimmed_messages", start)
+
+    @staticmethod
+    def _snapshot(user_id: str, session_id: str, hot: _HotSession) -> Session:
+        # 消息对象在存储中不再修改，列表浅拷贝即可，避免每个请求深拷贝整段历史
+        return Session(id=session_id, user_id=user_id, messages=list(hot.messages))
+
+    async def create_session(self, user_id: str, session_id: Optional[str] = None) -> Session:
+        session_id = session_id.strip() if session_id and session_id.strip() else str(uuid.uuid4())
+        hot = await self._load(user_id, session_id)
+        self._report()
+        return self._snapshot(user_id, session_id, hot)
+
+    async def get_session(self, user_id: str, session_id: str) -> Session | None:
+        # 与运行时默认实现一致：会话不存在时自动创建
+        return await self.create_session(user_id, session_id)
+
+    async def delete_session(self, user_id: str, session_id: str) -> None:
+        hot = self._hot.pop((user_id, session_id), None)
+        if hot is not None:
+            self._drop_hot(user_id, session_id, hot)
+        if self.disk is not None:
+            # 先等待该会话的后台写盘，避免删除后又被写回
+            spilling = self._spilling.pop((user_id, session_id), None)
+            if spilling is not None:
+                await asyncio.gather(spilling[1], return_exceptions=True)
+            size = await asyncio.to_thread(self.disk.delete, user_id, session_id)
+            if size >= 0:
+                self._disk_sessions -= 1
+                self._disk_bytes -= size
+        self._report()
+
+    async def list_sessions(self, user_id: str) -> list[Session]:
+        """列出用户的会话（不含消息历史）"""
+        session_ids = list(self._user_sessions.get(user_id, ()))
+        if self.disk is not None:
+            stored = await asyncio.to_thread(self.disk.session_ids, user_id)
+            session_ids += [session_id for session_id in stored if session_id not in session_ids]
+        return [Session(id=session_id, user_id=user_id, messages=[]) for session_id in session_ids]
+
+    async def append_message(
+        self,
+        session: Session,
+        message: Message | list[Message] | dict[str, Any] | list[dict[str, Any]],
+    ) -> None:
+        if not isinstance(message, list):
+            message = [message]
+        norm_message = [msg if isinstance(msg, Message) else Message.model_validate(msg)
+                        for msg in message if msg is not None]
+        session.messages.extend(norm_message)
+
+        hot = await self._load(session.user_id, session.id)
+        for msg in norm_message:
+            size = _message_size(msg)
+            hot.messages.append(msg)
+            hot.sizes.append(size)
+            hot.bytes += size
+            self._hot_bytes += size
+        self._hot_messages += len(norm_message)
+        hot.dirty = True
+        hot.updated_at = time.time()
+        self._trim(hot)
+        self._report()
+
+    def search(self, user_id: str, keywords: set[str], exclude: set[str], top_k: int | None = None) -> list[Message]:
+        """在用户内存中的会话里按关键词检索文本消息，exclude 为要跳过的消息ID"""
+        matched = []
+        for session_id in self._user_sessions.get(user_id, ()):
+            hot = self._hot.get((user_id, session_id))
+            if hot is None:
+                continue
+            for msg in hot.messages:
+                if msg.id in exclude:
+                    continue
+                text = _message_text(msg).lower()
+                if text and any(keyword in text for keyword in keywords):
+                    matched.append(msg)
+        return matched[-top_k:] if top_k else matched
+
+    def user_messages(self, user_id: str) -> list[Message]:
+        """用户内存中所有会话的消息，按会话ID排序"""
+        messages = []
+        for session_id in sorted(self._user_sessions.get(user_id, ())):
+            messages.extend(self._hot[(user_id, session_id)].messages)
+        return messages
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "hot_sessions": len(self._hot),
+            "hot_messages": self._hot_messages,
+            "hot_bytes": self._hot_bytes,
+            "disk_sessions": self._disk_sessions,
+            "disk_bytes": self._disk_bytes,
+            "evictions": self.evictions,
+            "trimmed_messages": self.trimmed,
+        }
+
+
+def _message_text(message: Message) -> str:
+    if message.type == MessageType.MESSAGE:
+        for content in message.content or []:
+            if content.type == "text":
+                return content.text or ""
+    return ""
+
+
+class SessionStoreMemoryService(MemoryService):
+    """直接在 SessionStore 的会话历史上做关键词检索的记忆服务
+
+    运行时默认的 InMemoryMemoryService 会把每条消息再复制一份且永不释放；
+    这里不另存消息，检索范围是该用户内存中的会话，用量随 SessionStore 一起受限。
+    """
+
+    def __init__(self, store: SessionStore):
+        self.store = store
+
+    async def start(self) -> None:
+        pass
+
+    async def stop(self) -> None:
+        pass
+
+    async def health(self) -> bool:
+        return True
+
+    async def add_memory(self, user_id: str, messages: list, session_id: Optional[str] = None) -> None:
+        # 消息已由 SessionStore.append_message 保存
+        pass
+
+    async def search_memory(self, user_id: str, messages: list, filters: Optional[dict[str, Any]] = None) -> list:
+        if not messages:
+            return []
+        query = _message_text(messages[-1])
+        if not query:
+            return []
+        top_k = filters.get("top_k") if filters and isinstance(filters.get("top_k"), int) else None
+        # 本次请求的输入在检索前已写入会话历史，排除掉避免把问题本身当作记忆
+        exclude = {msg.id for msg in messages if isinstance(msg, Message)}
+        return self.store.search(user_id, set(query.lower().split()), exclude, top_k)
+
+    async def list_memory(self, user_id: str, filters: Optional[dict[str, Any]] = None) -> list:
+        page_num = filters.get("page_num", 1) if filters else 1
+        page_size = filters.get("page_size", 10) if filters else 10
+        all_messages = self.store.user_messages(user_id)
+        start_index = (page_num - 1) * page_size
+        return all_messages[start_index:start_index + page_size]
+
+    async def delete_memory(self, user_id: str, session_id: Optional[str] = None) -> None:
+        session_ids = [session_id] if session_id else [session.id for session in await self.store.list_sessions(user_id)]
+        for sid in session_ids:
+            await self.store.delete_session(user_id, sid)
@@ -0,0 +1,81 @@
+import asyncio
+import json
+
+from typing import Any, Awaitable, Callable, TypeVar
+from utils.metrics import metrics
+
+
+T = TypeVar("T")
+
+
+def request_key(method: str, url: str, params: dict[str, Any] | None = None, body: Any = None) -> str:
+    """生成请求的规范化键：方法 + 地址 + 排序后的参数与请求体"""
+    return json.dumps(
+        [method.upper(), url, params or {}, body],
+        ensure_ascii=False,
+        sort_keys=True,
+        separators=(",", ":"),
+        default=str,
+    )
+
+
+class SingleFlight:
+    """合并并发的相同请求（single-flight）
+
+    同一个键在飞行中时，后到的调用者不再发起上游请求，而是等待首个调用的结果，
+    所有调用者拿到同一个解析后的对象，因此调用方不应原地修改返回值。
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._inflight: dict[str, asyncio.Future] = {}
+        self.leaders = 0
+        self.shared = 0
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[T]]) -> T:
+        """执行 fn，若相同键的调用正在进行则复用其结果
+
+        Args:
+            key (str): 请求键，通常由 request_key 生成
+            fn (Callable): 无参协程工厂，仅由首个调用者执行
+        """
+        while True:
+            future = self._inflight.get(key)
+            if future is None:
+                break
+            self.shared += 1
+            metrics.inc("singleflight_shared", name=self.name)
+            try:
+                return await asyncio.shield(future)
+            except asyncio.CancelledError:
+                # 首个调用者被取消时重新竞争执行；自身被取消则直接抛出
+                if not future.cancelled():
+                    raise
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        self.leaders += 1
+        metrics.inc("singleflight_leader", name=self.name)
+        try:
+            result = await fn()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            # 没有等待者时避免 "exception was never retrieved" 警告
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            self._inflight.pop(key, None)
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "name": self.name,
+            "inflight": len(self._inflight),
+            "leaders": self.leaders,
+            "shared": self.shared,
+        }
@@ -0,0 +1,165 @@
+import math
+import os
+import re
+
+from typing import Any
+from dotenv import load_dotenv
+
+from agentscope.message import Msg
+from agentscope.tool import Toolkit
+from utils.instrumentation import InstrumentedReActAgent
+from utils.metrics import metrics
+from utils.render import estimate_tokens
+
+
+load_dotenv('.env')
+
+# 按用户意图只向模型暴露相关的工具分组；关闭后每次推理都发送全部工具
+TOOL_ROUTING_ENABLED = os.environ.get("TOOL_ROUTING_ENABLED", "true").lower() in ("1", "true", "yes")
+# 最佳分组得分低于该值时认为意图不明确，回退到全部工具；三个分组时只出现在一个分组中的检索词 IDF 约为 0.98，
+# 默认值让一个明确的意图词（如"下雨"、"预订"）即可路由
+TOOL_ROUTING_MIN_SCORE = float(os.environ.get("TOOL_ROUTING_MIN_SCORE", "0.9"))
+# 得分不低于最佳分组该比例的分组一并暴露
+TOOL_ROUTING_RATIO = float(os.environ.get("TOOL_ROUTING_RATIO", "0.4"))
+# 当前消息意图不明确时，向前合并的用户消息条数
+TOOL_ROUTING_LOOKBACK = int(os.environ.get("TOOL_ROUTING_LOOKBACK", "2"))
+
+# 工具分组及其描述，描述参与路由打分：除业务范围外，列出用户提问时常用的意图词
+TOOL_GROUP_DESCRIPTIONS = {
+    "content": "旅游内容：国家、城市、目的地、找酒店、搜索附近的酒店、推荐住哪、酒店列表、酒店详情、酒店介绍、"
+               "酒店名称地址检索、位置交通、四星五星等星级、品牌、设施图片、有没有早餐泳池停车、"
+               "早餐床型窗型吸烟景观等数据字典",
+    "booking": "酒店预订：查价比价、多少钱、最低价、便宜、价格日历、有没有房、房型价格计划、价格确认、"
+               "预订订房、下单预订、帮我订、入住离店、订单查询、我的订单、订单状态、导出对账、取消订单、退订退款",
+    "weather": "天气：实时天气、温度气温、冷不冷热不热、下雨下雪、降雨、带伞、刮风、晴天阴天、天气预报、逐小时、"
+               "分钟级降水、空气质量、雾霾、生活指数、穿衣、天气预警、台风暴雨、日出日落、月相、历史天气",
+}
+
+_CJK = re.compile(r"[一-鿿]+")
+_WORD = re.compile(r"[a-z][a-z0-9_]+")
+
+
+def _terms(text: str) -> set[str]:
+    """检索词：中文取相邻两字，英文取单词（小写）"""
+    text = text.lower()
+    terms = set(_WORD.findall(text))
+    for run in _CJK.findall(text):
+        if len(run) == 1:
+            terms.add(run)
+        terms.update(run[index:index + 2] for index in range(len(run) - 1))
+    return terms
+
+
+class ToolRouter:
+    """按用户意图选择每次推理暴露给模型的工具分组
+
+    索引由各分组的描述与组内工具的描述（即 tools.json 中的 description）构建，
+    查询与分组的匹配度为共同检索词的 IDF 之和；"basic" 分组中的工具始终可用。
+    意图不明确（最佳得分低于 min_score）时回退到全部工具。
+    """
+
+    def __init__(self, min_score: float = TOOL_ROUTING_MIN_SCORE, ratio: float = TOOL_ROUTING_RATIO,
+                 lookback: int = TOOL_ROUTING_LOOKBACK):
+        self.min_score = min_score
+        self.ratio = ratio
+        self.lookback = max(lookback, 1)
+        # 工具集合 -> (分组 -> 检索词集合, 检索词 -> IDF)；每个请求的 toolkit 是副本，但注册的工具相同
+        self._indexes: dict[tuple[str, ...], tuple[dict[str, set[str]], dict[str, float]]] = {}
+
+    def _index(self, toolkit: Toolkit) -> tuple[dict[str, set[str]], dict[str, float]]:
+        key = tuple(sorted(toolkit.tools))
+        index = self._indexes.get(key)
+        if index is not None:
+            return index
+
+        docs: dict[str, set[str]] = {name: _terms(group.description) for name, group in toolkit.groups.items()}
+        for tool in toolkit.tools.values():
+            if tool.group in docs:
+                docs[tool.group] |= _terms(tool.json_schema["function"].get("description", ""))
+        frequency: dict[str, int] = {}
+        for terms in docs.values():
+            for term in terms:
+                frequency[term] = frequency.get(term, 0) + 1
+        idf = {term: math.log((len(docs) + 1) / (count + 0.5)) for term, count in frequency.items()}
+        index = self._indexes[key] = (docs, idf)
+        return index
+
+    def score(self, toolkit: Toolkit, query: str) -> dict[str, float]:
+        docs, idf = self._index(toolkit)
+        terms = _terms(query)
+        return {name: sum(idf[term] for term in terms & doc_terms) for name, doc_terms in docs.items()}
+
+    def select(self, toolkit: Toolkit, queries: list[str], used_tools: set[str]) -> list[str] | None:
+        """返回应当激活的分组；意图不明确时返回 None 表示使用全部工具
+
+        Args:
+            toolkit: 工具集
+            queries: 用户消息，最近的在前；当前消息意图不明确时逐条向前合并
+            used_tools: 本轮已经调用过的工具，其所在分组保持激活
+        """
+        scores: dict[str, float] = {}
+        text = ""
+        for query in queries[:self.lookback]:
+            text = f"{query}\n{text}"
+            scores = self.score(toolkit, text)
+            if scores and max(scores.values()) >= self.min_score:
+                break
+
+        best = max(scores.values(), default=0.0)
+        if best < self.min_score:
+            return None
+        selected = {name for name, value in scores.items() if value >= best * self.ratio}
+        selected |= {toolkit.tools[name].group for name in used_tools
+                     if name in toolkit.tools and toolkit.tools[name].group != "basic"}
+        return sorted(selected)
+
+    def apply(self, toolkit: Toolkit, msgs: list[Msg]) -> list[str] | None:
+        """根据对话记录设置 toolkit 中各分组的激活状态，返回激活的分组（None 为全部）"""
+        if not toolkit.groups:
+            return None
+
+        queries: list[str] = []
+        used_tools: set[str] = set()
+        in_current_turn = True
+        for msg in reversed(msgs):
+            if in_current_turn:
+                used_tools.update(block["name"] for block in msg.get_content_blocks("tool_use"))
+            if msg.role == "user" and not msg.has_content_blocks("tool_result"):
+                text = msg.get_text_content()
+                if text:
+                    queries.append(text)
+                    in_current_turn = False
+                    if len(queries) >= self.lookback:
+                        break
+
+        selected = self.select(toolkit, queries, used_tools)
+        all_groups = list(toolkit.groups)
+        if selected is None:
+            toolkit.update_tool_groups(all_groups, True)
+            metrics.inc("tool_routing", groups="all")
+        else:
+            toolkit.update_tool_groups([name for name in all_groups if name not in selected], False)
+            toolkit.update_tool_groups(selected, True)
+            metrics.inc("tool_routing", groups="+".join(selected) or "basic")
+        return selected
+
+
+tool_router = ToolRouter()
+
+
+def _schema_tokens(schemas: list[dict[str, Any]]) -> int:
+    return sum(estimate_tokens(str(schema)) for schema in schemas)
+
+
+class ToolRoutingReActAgent(InstrumentedReActAgent):
+    """每次推理前按对话意图激活相关的工具分组，只把这些分组的工具schema发送给模型
+
+    每个请求构建智能体时 toolkit 已是独立副本，修改分组激活状态不影响其他会话。
+    """
+
+    async def _reasoning(self) -> Msg:
+        if TOOL_ROUTING_ENABLED:
+            selected = tool_router.apply(self.toolkit, await self.memory.get_memory())
+            metrics.observe("tool_schema_tokens", _schema_tokens(self.toolkit.get_json_schemas()),
+                            routed="all" if selected is None else "subset")
+        return await super()._reasoning()
@@ -0,0 +1,95 @@
+import os
+import time
+
+from typing import Any
+from urllib.parse import urlparse
+from dotenv import load_dotenv
+from opentelemetry import trace
+
+from utils.metrics import metrics
+
+
+load_dotenv('.env')
+
+# OTLP/HTTP 追踪上报地址。dida-flow/metrics/otel 中的 collector 在 4318 端口接收 OTLP/HTTP，
+# 例如 OTEL_EXPORTER_OTLP_ENDPOINT=http://otel-collector:4318；都未设置时沿用 AgentScope Studio 的追踪地址
+OTEL_TRACES_ENDPOINT = os.environ.get("OTEL_EXPORTER_OTLP_TRACES_ENDPOINT") or (
+    os.environ["OTEL_EXPORTER_OTLP_ENDPOINT"].rstrip("/") + "/v1/traces"
+    if os.environ.get("OTEL_EXPORTER_OTLP_ENDPOINT") else None)
+
+# agentscope.init 配置追踪后才会设置全局 TracerProvider，此前的 span 为空操作
+tracer = trace.get_tracer("agentscope-server")
+
+
+class HttpTimer:
+    """记录一次上游HTTP请求的分阶段耗时，并上报为追踪span与 upstream_http_seconds 直方图
+
+    通过 httpx 的 trace 扩展接收 httpcore 连接事件，阶段包括：
+    - connect: 建立TCP连接（httpcore 不单独暴露DNS解析，DNS耗时包含在内）
+    - tls: TLS握手
+    - ttfb: 开始发送请求到收到响应头
+    - body: 收到响应头到读完响应体
+    复用连接时没有 connect/tls 阶段。span 不设置为当前上下文，可以安全地跨越异步生成器的 yield。
+
+    用法:
+        with HttpTimer(url, "GET", path) as timer:
+            response = await client.get(path, extensions=timer.extensions)
+            timer.status_code = response.status_code
+    """
+
+    def __init__(self, url: str, method: str, path: str, kind: str = ""):
+        self.host = urlparse(url).netloc or url
+        self.method = method
+        self.path = path
+        self.kind = kind
+        self.status_code: int | None = None
+        self.extensions = {"trace": self._trace}
+        self._events: dict[str, float] = {}
+        self._started = 0.0
+        self._span: trace.Span | None = None
+
+    async def _trace(self, event_name: str, info: dict[str, Any]) -> None:
+        # 事件名形如 connection.connect_tcp.started、http11.receive_response_headers.complete
+        self._events.setdefault(event_name.split(".", 1)[-1], time.perf_counter())
+
+    def _phase(self, start: str, end: str) -> float | None:
+        started, ended = self._events.get(start), self._events.get(end)
+        return ended - started if started is not None and ended is not None else None
+
+    def __enter__(self) -> "HttpTimer":
+        self._started = time.perf_counter()
+        self._span = tracer.start_span(f"{self.method} {self.path}", kind=trace.SpanKind.CLIENT, attributes={
+            "http.request.method": self.method,
+            "server.address": self.host,
+            "url.path": self.path,
+            "upstream.kind": self.kind,
+        })
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        ended = time.perf_counter()
+        headers_received = self._events.get("receive_response_headers.complete")
+        phases = {
+            "connect": self._phase("connect_tcp.started", "connect_tcp.complete"),
+            "tls": self._phase("start_tls.started", "start_tls.complete"),
+            "ttfb": self._phase("send_request_headers.started", "receive_response_headers.complete"),
+            "body": ended - headers_received if headers_received is not None else None,
+            "total": ended - self._started,
+        }
+        for phase, seconds in phases.items():
+            if seconds is not None:
+                metrics.observe("upstream_http_seconds", seconds, host=self.host, phase=phase)
+
+        span = self._span
+        if span is None:
+            return
+        span.set_attributes({f"http.{phase}_ms": round(seconds * 1000, 2) for phase, seconds in phases.items() if seconds is not None})
+        if self.status_code is not None:
+            span.set_attribute("http.response.status_code", self.status_code)
+        if exc is not None and not isinstance(exc, GeneratorExit):
+            # GeneratorExit 表示流式读取被调用方提前停止，不算失败
+            span.record_exception(exc)
+            span.set_status(trace.Status(trace.StatusCode.ERROR, str(exc)))
+        elif self.status_code is not None and self.status_code >= 500:
+            span.set_status(trace.Status(trace.StatusCode.ERROR, f"HTTP {self.status_code}"))
+        span.end()
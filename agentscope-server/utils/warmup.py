@@ -0,0 +1,109 @@
+import asyncio
+import os
+import time
+
+from typing import Any, Awaitable
+from dotenv import load_dotenv
+from agentscope.tool import Toolkit
+from utils.geocode import preload_city_list
+from utils.metrics import metrics
+from utils.reference_data import GetReference, REFERENCE_TTLS
+from utils.request import qweather_tokens, qweather_private_key
+
+
+load_dotenv('.env')
+
+# 预热配置
+WARMUP_ENABLED = os.environ.get("WARMUP_ENABLED", "true").lower() == "true"
+WARMUP_LANGUAGES = [lang.strip() for lang in os.environ.get("WARMUP_LANGUAGES", "zh-CN,en-US").split(",") if lang.strip()]
+# 按业务量排序的重点市场，预热前 WARMUP_TOP_N 个国家的目的地
+WARMUP_COUNTRIES = [code.strip() for code in os.environ.get("WARMUP_COUNTRIES", "CN,JP,KR,TH,SG,MY,US,GB,FR,AU").split(",") if code.strip()]
+WARMUP_TOP_N = int(os.environ.get("WARMUP_TOP_N", "5"))
+WARMUP_CONCURRENCY = int(os.environ.get("WARMUP_CONCURRENCY", "8"))
+
+DICTIONARY_PATHS = [path for path in REFERENCE_TTLS if path.startswith('/api/v1/dictionary/')]
+
+
+async def warmup(toolkit: Toolkit | None = None) -> dict[str, Any]:
+    """服务启动预热：并发预取参考数据、预加载城市编码、预构建工具JSON Schema、预签和风天气JWT
+
+    预热失败不会阻止服务启动，失败项计入 warmup_failed 指标。
+
+    Args:
+        toolkit (Toolkit, optional): 需要预构建JSON Schema的工具集
+
+    Returns:
+        dict: 预热结果摘要
+    """
+    started = time.perf_counter()
+    semaphore = asyncio.Semaphore(WARMUP_CONCURRENCY)
+
+    jobs: list[tuple[str, Awaitable]] = []
+    for language in WARMUP_LANGUAGES:
+        jobs.append(('/api/v1/region/countries', GetReference('/api/v1/region/countries', language)))
+        for path in DICTIONARY_PATHS:
+            jobs.append((path, GetReference(path, language)))
+        for country_code in WARMUP_COUNTRIES[:WARMUP_TOP_N]:
+            jobs.append(('/api/v1/region/destinations', GetReference('/api/v1/region/destinations', language, countryCode=country_code)))
+
+    total = len(jobs)
+    done = 0
+    failed = 0
+    metrics.set_gauge("warmup_total", total)
+
+    async def _run(path: str, job: Awaitable) -> None:
+        nonlocal done, failed
+        async with semaphore:
+            try:
+                res = await job
+            except Exception as e:
+                print(f"预热请求异常 {path}: {e}")
+                res = None
+        done += 1
+        if res is None:
+            failed += 1
+            metrics.inc("warmup_failed", endpoint=path)
+        metrics.set_gauge("warmup_progress", done / total if total else 1.0)
+
+    # 城市列表文件的解析放到线程中（落盘由缓存的后台写线程完成），与参考数据预取同时进行
+    async def _preload_geocode() -> int:
+        try:
+            return await preload_city_list()
+        except Exception as e:
+            print(f"城市编码预加载失败: {e}")
+            metrics.inc("warmup_failed", endpoint="geocode_preload")
+            return 0
+
+    geocode_names, *_ = await asyncio.gather(_preload_geocode(), *(_run(path, job) for path, job in jobs))
+    prefetch_seconds = time.perf_counter() - started
+
+    # 预构建工具JSON Schema
+    schema_count = 0
+    if toolkit is not None:
+        schema_started = time.perf_counter()
+        schema_count = len(toolkit.get_json_schemas())
+        metrics.observe("warmup_schema_seconds", time.perf_counter() - schema_started)
+
+    # 预签和风天气JWT（首次签名需要加载密钥与加密后端），之后由 qweather_tokens 复用
+    token_ready = False
+    if qweather_private_key:
+        try:
+            await qweather_tokens.get_token()
+            token_ready = True
+        except Exception as e:
+            print(f"和风天气JWT预签失败: {e}")
+
+    duration = time.perf_counter() - started
+    metrics.observe("warmup_duration_seconds", duration)
+    metrics.observe("warmup_prefetch_seconds", prefetch_seconds)
+
+    summary = {
+        "requests": total,
+        "failed": failed,
+        "geocode_names": geocode_names,
+        "schemas": schema_count,
+        "qweather_token": token_ready,
+        "duration_seconds": round(duration, 3),
+    }
+    print(f"🔥 预热完成: {summary}")
+    return summary